@@ -0,0 +1,70 @@
+import config
+
+from token_budget import estimate_tokens, split_into_chunks
+
+# Extracted values that carry no information and lose to any other value
+unknown_values = (None, "", "Unknown", "unknown")
+
+
+def extract_in_chunks(text, extract, merge):
+    """
+    Runs an extraction on text, or on each chunk of it when text is over
+    config.extraction_token_budget, and merges the chunk results.
+
+    Args:
+        text (str): The document text.
+        extract (callable): Extracts a result dict from a piece of text.
+        merge (callable): Merges the non-empty chunk results, in chunk order.
+
+    Returns:
+        dict: The extraction result, or None if every call returned nothing.
+    """
+    budget = config.extraction_token_budget
+    text_tokens = estimate_tokens(text)
+    if budget <= 0 or text_tokens <= budget:
+        return extract(text)
+
+    chunks = split_into_chunks(text, budget)
+    print(f"Extracting from {len(chunks)} chunks of a {text_tokens}-token document")
+    results = [result for result in map(extract, chunks) if result]
+    return merge(results) if results else None
+
+
+def merge_known_fields(results):
+    """
+    Merges field extractions, taking each field from the first chunk that
+    knows it. Résumés and job descriptions lead with their most current
+    information, so earlier chunks win ties.
+    """
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            if merged.get(key) in unknown_values and value not in unknown_values:
+                merged[key] = value
+            merged.setdefault(key, value)
+    return merged
+
+
+def merge_grid_labels(results, prefix):
+    """
+    Merges grid label extractions by majority vote over the level 1 to 3
+    labels, with ties going to the earliest chunk. The free level 4 keywords
+    of every chunk are combined.
+    """
+    levels = [f"{prefix}{level}" for level in (1, 2, 3)]
+    votes = {}
+    for result in results:
+        path = tuple(result.get(level) for level in levels)
+        votes[path] = votes.get(path, 0) + 1
+    # max() keeps the first of equal counts, and dicts keep insertion order
+    best_path = max(votes, key=votes.get)
+
+    tags = {}
+    for result in results:
+        for tag in str(result.get(f"{prefix}4") or "").split(","):
+            if tag.strip():
+                tags.setdefault(tag.strip(), None)
+
+    merged = dict(zip(levels, best_path))
+    merged[f"{prefix}4"] = ", ".join(tags)
+    return merged
@@ -0,0 +1,201 @@
+import argparse
+import config
+import multiprocessing
+import os
+import sys
+
+from pipeline import list_pdf_paths
+from processing import (
+    folder_containing_job_descriptions,
+    folder_containing_resumes,
+    start_processing,
+)
+from progress import format_progress, progress
+from watch_folders import watch_folders
+from work_queue import run_workers, submit_batch
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Match résumés with job descriptions without the window."
+    )
+    parser.add_argument(
+        "--resumes",
+        nargs="+",
+        default=[folder_containing_resumes],
+        help="Résumé PDFs or folders of them (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--job-descriptions",
+        nargs="+",
+        default=[folder_containing_job_descriptions],
+        help="Job description PDFs or folders of them (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output",
+        default=config.output_dir,
+        help="Folder for the scored candidates files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cache",
+        help="Folder for the document store and extraction journals, "
+        "shared by every run pointed at it (default: the output folder)",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        default=config.use_staged_pipeline,
+        help="Parse, extract and score as overlapping stages",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=config.parse_workers,
+        help="PDF parsing processes with --staged (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=config.llm_concurrency,
+        help="Parallel OpenAI extraction calls with --staged (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=config.candidates_to_score_count,
+        help="Only rank the top N candidates of each job (default: all)",
+    )
+    parser.add_argument(
+        "--openai-batch-size",
+        type=int,
+        default=config.openai_batch_size,
+        help="Candidates per OpenAI scoring request (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--scoring-token-budget",
+        type=int,
+        default=config.scoring_batch_token_budget,
+        help="Tokens shared by the résumés of a batched scoring request "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--resume-token-cap",
+        type=int,
+        default=config.scoring_resume_token_cap,
+        help="Tokens of a résumé sent to a scoring prompt, 0 for the full text "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--extraction-token-budget",
+        type=int,
+        default=config.extraction_token_budget,
+        help="Tokens of document text per extraction call, 0 for no limit "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep ingesting the PDFs dropped into the résumé and job "
+        "description folders until interrupted",
+    )
+    parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Add the PDFs to the work queue in the cache folder as one batch, "
+        "for --workers runs on this machine",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Process the work queue in the cache folder with this many worker "
+        "processes until it is empty",
+    )
+    return parser
+
+
+def apply_arguments(args):
+    config.output_dir = args.output
+    config.prompt_savings_report_path = os.path.join(args.output, "prompt_savings.csv")
+
+    cache_dir = args.cache or args.output
+    config.document_store_path = os.path.join(cache_dir, "automatch.db")
+    config.document_text_blob_path = os.path.join(cache_dir, "automatch_texts.blob")
+    config.extraction_journal_dir = os.path.join(cache_dir, "journals")
+    config.work_queue_path = os.path.join(cache_dir, "work_queue.db")
+
+    config.use_staged_pipeline = args.staged
+    config.parse_workers = args.parse_workers
+    config.llm_concurrency = args.llm_concurrency
+    config.candidates_to_score_count = args.top
+    config.openai_batch_size = args.openai_batch_size
+    config.scoring_batch_token_budget = args.scoring_token_budget
+    config.scoring_resume_token_cap = args.resume_token_cap
+    config.extraction_token_budget = args.extraction_token_budget
+
+
+def expand_pdf_paths(parser, paths):
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(list_pdf_paths(path))
+        elif os.path.isfile(path) and path.lower().endswith(".pdf"):
+            pdf_paths.append(path)
+        else:
+            parser.error(f"not a PDF or a folder: {path}")
+    return pdf_paths
+
+
+def main(argv=None):
+    """
+    Runs a batch from the command line.
+
+    Returns:
+        int: The exit status: 0 when every document and candidate was
+        processed, 1 when any failed (or any task of the work queue) or nothing
+        could be scored, 130 when interrupted.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    apply_arguments(args)
+
+    if args.watch:
+        if len(args.resumes) != 1 or len(args.job_descriptions) != 1:
+            parser.error(
+                "--watch takes one résumé folder and one job description folder"
+            )
+        watch_folders(args.resumes[0], args.job_descriptions[0])
+        return 0
+
+    if args.submit or args.workers > 0:
+        if args.submit:
+            batch = submit_batch(
+                expand_pdf_paths(parser, args.resumes),
+                expand_pdf_paths(parser, args.job_descriptions),
+            )
+            if batch is None:
+                return 1
+        if args.workers > 0 and not run_workers(args.workers):
+            return 1
+        return 0
+
+    resume_paths = expand_pdf_paths(parser, args.resumes)
+    job_description_paths = expand_pdf_paths(parser, args.job_descriptions)
+
+    try:
+        completed = start_processing(resume_paths, job_description_paths)
+    except KeyboardInterrupt:
+        print("Interrupted")
+        return 130
+
+    snapshot = progress.snapshot()
+    print(format_progress(snapshot))
+    if not completed or snapshot["failures"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # The PDF parsing process pool needs this in frozen builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1 +1,129 @@
+# Candidates per job ranked with OpenAI (top-N mode): any bucketed candidate that can still
+# reach the top N is sent, whatever its bucket score. 0 sends the candidates with a bucket
+# score of 71 or more instead
 candidates_to_score_count = 0
+
+# Seconds between rewrites of a job's shortlist file while OpenAI scoring is in progress
+partial_results_interval = 30
+
+# Candidates whose BM25 match against the job description is below this fraction of the
+# best match are never sent to OpenAI (0 disables the gate). The BM25 index, and the
+# lexical_score of each match, are only computed while the gate is on. A lexical_score is
+# relative to the résumé pool when it was scored, and is kept as the pool grows
+lexical_gate_threshold = 0.0
+
+# Candidates packed into a single OpenAI scoring request (1 scores candidates one by one)
+openai_batch_size = 1
+
+# Approximate token budget shared by the résumés in one batched scoring request
+scoring_batch_token_budget = 12000
+
+# Best candidates per job kept in the "_shortlist" file, which is also refreshed while
+# scoring is in progress (0 disables the shortlist)
+shortlist_size = 100
+
+# Rows sorted in memory at a time when writing a job's final scored candidates file
+sort_run_size = 10000
+
+# Folder receiving the scored candidates files and the processed CSV exports
+output_dir = "output"
+
+# SQLite database holding processed documents, their labels and scores
+document_store_path = "output/automatch.db"
+
+# Append-only file holding the text of every stored document, read through mmap on demand
+document_text_blob_path = "output/automatch_texts.blob"
+
+# Also export each batch of processed résumés and job descriptions to a timestamped CSV
+export_processed_csv = False
+
+# Candidates loaded and scored at a time, so memory stays flat for very large pools.
+# OpenAI priority ordering then applies per chunk (0 scores the whole pool at once).
+scoring_chunk_size = 0
+
+# Write-ahead journals of completed extractions, so interrupted runs resume where they stopped.
+# Entries are dropped once their documents are in the document store
+extraction_journal_dir = "output/journals"
+
+# Estimated text similarity at which a résumé counts as a near-duplicate of one already
+# processed and reuses its extraction and scores (0 disables near-duplicate detection)
+near_duplicate_threshold = 0.9
+
+# Run parsing, OpenAI extraction and scoring as overlapping stages connected by bounded queues
+use_staged_pipeline = False
+
+# Processes parsing and OCRing PDFs in the staged pipeline (0 uses one per CPU)
+parse_workers = 0
+
+# OpenAI extraction requests in flight at once in the staged pipeline
+llm_concurrency = 4
+
+# Documents each stage of the staged pipeline may run ahead of the next one
+pipeline_queue_size = 16
+
+# Seconds between throughput and queue depth reports from the staged pipeline
+pipeline_report_interval = 10
+
+# Estimated tokens of a résumé sent to an OpenAI scoring prompt. Only its scoring-relevant
+# sections (experience, skills, languages, education...) are kept (0 sends the full text)
+scoring_resume_token_cap = 0
+
+# CSV logging the résumé tokens sent for each scored candidate next to its score
+prompt_savings_report_path = "output/prompt_savings.csv"
+
+# Estimated tokens of document text sent in one extraction call. Longer documents are
+# extracted chunk by chunk and the results merged (0 always sends the whole document)
+extraction_token_budget = 24000
+
+# Assign industry/function labels with the local keyword labeler, without OpenAI, when it is
+# confident. While off, the labeler runs next to OpenAI on every document it is confident
+# about and each run reports how often the two agreed, to decide whether to turn it on
+use_local_labels = False
+
+# Keyword hits the local labeler needs to be confident (0 disables the labeler entirely)
+local_label_min_hits = 3
+
+# How many times more keyword hits the best grid option needs than the runner-up
+local_label_margin = 2.0
+
+# Fraction of locally labeled documents also labeled by OpenAI, to keep measuring agreement
+# while use_local_labels is on
+local_label_audit_rate = 0.1
+
+# How often the results window rereads the scored candidates while it is open, in milliseconds
+results_refresh_interval_ms = 2000
+
+# Seconds between two scans of the watched folders in watch mode. A new file is picked up
+# once it has stayed unchanged for one scan, so it is never read while still being copied
+watch_poll_interval = 2
+
+# Address of the local matching service (python matching_service.py)
+service_host = "127.0.0.1"
+service_port = 8765
+
+# Folder keeping the résumés uploaded to the matching service, named by their hash
+service_upload_dir = "output/uploads"
+
+# Largest résumé PDF the matching service accepts, in bytes
+service_max_upload_bytes = 20 * 1024 * 1024
+
+# Most seconds from launching the application to its window showing, checked by
+# python startup_report.py
+startup_time_budget = 3.0
+
+# SQLite file of the work queue that worker processes on this machine split batches through
+# (python cli.py --submit / --workers). It is in WAL mode, so it can't be shared by machines
+work_queue_path = "output/work_queue.db"
+
+# Seconds a worker holds a task without a heartbeat before another worker may take it over
+work_queue_lease_seconds = 60
+
+# Attempts at a task, failed or timed out, before it is marked as failed
+work_queue_max_attempts = 3
+
+# Seconds an idle worker waits before asking the work queue for a task again
+work_queue_poll_interval = 2
+
+# Résumés scored against a job per work queue task; smaller chunks spread scoring over
+# more workers
+work_queue_score_chunk_size = 200
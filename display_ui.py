@@ -1,7 +1,6 @@
 import config
 import os
 import sys
-import shutil
 from PyQt6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -16,9 +15,12 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
     QApplication,
     QSpinBox,
+    QProgressBar,
 )
 from PyQt6.QtGui import QIcon, QPixmap, QFont, QFontDatabase
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from progress import format_progress, progress
+from results_view import ResultsWindow
 
 
 def resource_path(relative_path):
@@ -27,11 +29,47 @@ def resource_path(relative_path):
     return os.path.join(os.path.abspath("."), relative_path)
 
 
+class ProcessingWorker(QThread):
+    """
+    Runs the processing callback off the UI thread and relays its progress.
+    """
+
+    progress_changed = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        start_processing_callback,
+        resume_paths,
+        job_description_paths,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.start_processing = start_processing_callback
+        self.resume_paths = resume_paths
+        self.job_description_paths = job_description_paths
+
+    def run(self):
+        progress.reset()
+        # Emitted from the processing threads, delivered on the UI thread
+        progress.listener = self.progress_changed.emit
+        try:
+            self.start_processing(self.resume_paths, self.job_description_paths)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            progress.listener = None
+
+
 class DisplayUI(QWidget):
     def __init__(self, start_processing_callback):
         super().__init__()
 
         self.start_processing = start_processing_callback
+        self.worker = None
+        self.results_window = None
+        # Set when the window was closed while processing, to close it once done
+        self.close_requested = False
 
         logo_path = resource_path("assets/grow_logo.png")
         bg_path = resource_path("assets/grow_bg.jpeg")
@@ -45,9 +83,6 @@ class DisplayUI(QWidget):
         else:
             print("Failed to load Russo One font.")
 
-        os.makedirs("resumes", exist_ok=True)
-        os.makedirs("job_descriptions", exist_ok=True)
-
         self.setWindowTitle("Grow Match")
         self.setGeometry(100, 100, 600, 400)
         self.setWindowIcon(QIcon(icon_path))
@@ -236,6 +271,31 @@ class DisplayUI(QWidget):
         self.submit_button.clicked.connect(self.submit_action)
         main_layout.addWidget(self.submit_button)
 
+        # Progress of a running job (Initially Hidden)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setTextVisible(False)
+        main_layout.addWidget(self.progress_bar)
+
+        self.progress_label = QLabel("", self)
+        self.progress_label.setVisible(False)
+        self.progress_label.setWordWrap(True)
+        self.progress_label.setStyleSheet("color: #e7e7e7; font-size: 12px;")
+        main_layout.addWidget(self.progress_label)
+
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.setVisible(False)
+        self.cancel_button.setStyleSheet(button_style)
+        self.cancel_button.setFont(QFont("Russo One", 12))
+        self.cancel_button.clicked.connect(self.cancel_action)
+        main_layout.addWidget(self.cancel_button)
+
+        self.results_button = QPushButton("Results", self)
+        self.results_button.setStyleSheet(button_style)
+        self.results_button.setFont(QFont("Russo One", 12))
+        self.results_button.clicked.connect(self.show_results)
+        main_layout.addWidget(self.results_button)
+
         self.setLayout(main_layout)
 
     def resizeEvent(self, event):
@@ -290,16 +350,6 @@ class DisplayUI(QWidget):
             self.job_desc_entry.setText(f"{len(files)} file(s) selected")
             self.job_desc_entry.setDisabled(True)
 
-    def delete_all_uploaded_files(self):
-        try:
-            for folder in ["resumes", "job_descriptions"]:
-                for file in os.listdir(folder):
-                    file_path = os.path.join(folder, file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to delete files: {str(e)}")
-
     def submit_action(self):
         config.candidates_to_score_count = self.score_top_input.value() or 0
 
@@ -312,21 +362,99 @@ class DisplayUI(QWidget):
             )
             return
 
-        try:
-            for file in self.resume_files:
-                shutil.copy(file, "resumes")
-            for file in self.job_desc_files:
-                shutil.copy(file, "job_descriptions")
-            self.start_processing()
-            self.delete_all_uploaded_files()
+        # Processing can take hours, so it runs on a worker thread. The selected
+        # files are read where they are.
+        self.processing_error = None
+        self.worker = ProcessingWorker(
+            self.start_processing, self.resume_files, self.job_desc_files, self
+        )
+        self.worker.progress_changed.connect(self.show_progress)
+        self.worker.failed.connect(self.on_processing_failed)
+        self.worker.finished.connect(self.on_processing_finished)
+
+        self.submit_button.setEnabled(False)
+        self.submit_button.setText("Processing...")
+        self.browse_resume_button.setEnabled(False)
+        self.browse_job_desc_button.setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.progress_label.setText("Starting...")
+        self.progress_label.setVisible(True)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setText("Cancel")
+        self.cancel_button.setVisible(True)
+        self.worker.start()
+
+    def show_progress(self, snapshot):
+        if snapshot["total"]:
+            self.progress_bar.setRange(0, snapshot["total"])
+            self.progress_bar.setValue(min(snapshot["done"], snapshot["total"]))
+        else:
+            # Busy indicator until a stage knows its size
+            self.progress_bar.setRange(0, 0)
+        self.progress_label.setText(format_progress(snapshot))
+
+    def show_results(self):
+        # Stays open and keeps refreshing while candidates are being scored
+        if self.results_window is None:
+            self.results_window = ResultsWindow(self)
+        self.results_window.refresh()
+        self.results_window.show()
+        self.results_window.raise_()
+        self.results_window.activateWindow()
+
+    def cancel_action(self):
+        # Work in progress finishes and is saved, nothing new is started
+        progress.cancel()
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setText("Cancelling...")
+
+    def on_processing_failed(self, message):
+        self.processing_error = message
+
+    def on_processing_finished(self):
+        if self.close_requested:
+            # closeEvent connected finished to close, which runs next
+            self.worker = None
+            return
+        cancelled = progress.is_cancelled()
+
+        self.submit_button.setEnabled(True)
+        self.submit_button.setText("Start")
+        self.browse_resume_button.setEnabled(True)
+        self.browse_job_desc_button.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.progress_label.setText(format_progress(progress.snapshot()))
+        self.worker = None
+
+        if self.processing_error:
+            QMessageBox.critical(
+                self, "Error", f"An error occurred: {self.processing_error}"
+            )
+        elif cancelled:
+            QMessageBox.information(
+                self,
+                "Cancelled",
+                "Processing cancelled. Results completed before cancelling "
+                "were saved to the output folder.",
+            )
+        else:
             QMessageBox.information(
                 self,
                 "Success",
                 "Processing complete. Please check the output folder for results.",
             )
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
-        finally:
-            self.submit_button.setEnabled(True)
-            self.submit_button.setText("Start")
+    def closeEvent(self, event):
+        if self.worker is not None and self.worker.isRunning():
+            # Let the current work finish so nothing is left half saved, without
+            # blocking the event loop: the window closes once the worker is done
+            event.ignore()
+            if not self.close_requested:
+                self.close_requested = True
+                self.cancel_action()
+                self.cancel_button.setText("Cancelling, closing when done...")
+                self.worker.finished.connect(self.close)
+            return
+        super().closeEvent(event)
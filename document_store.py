@@ -0,0 +1,799 @@
+import config
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+
+from datetime import datetime
+from text_blob import TextBlob
+
+text_columns = {
+    "resume": "resume_text",
+    "job_description": "job_description_text",
+}
+
+label_columns = ["I1", "I2", "I3", "I4", "F1", "F2", "F3", "F4"]
+
+# Columns of a candidate-job match, as computed by score_candidates
+match_columns = [
+    "final_I",
+    "final_F",
+    "bucket",
+    "bucket_score",
+    "openai_score",
+    "rule_based_score",
+    "final_score",
+    "lexical_score",
+    "score_lower_bound",
+    "score_upper_bound",
+]
+
+# Columns of a ranked match row, as listed by load_ranked_matches
+ranked_match_columns = ["filename", "name", *match_columns]
+
+schema = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    filename TEXT,
+    content_hash TEXT NOT NULL,
+    text TEXT,
+    text_offset INTEGER,
+    text_length INTEGER,
+    created_at TEXT NOT NULL,
+    UNIQUE (kind, content_hash)
+);
+CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash);
+
+CREATE TABLE IF NOT EXISTS extracted_fields (
+    document_id INTEGER PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+    fields TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS labels (
+    document_id INTEGER PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+    I1 TEXT, I2 TEXT, I3 TEXT, I4 TEXT,
+    F1 TEXT, F2 TEXT, F3 TEXT, F4 TEXT
+);
+CREATE INDEX IF NOT EXISTS labels_industry ON labels (I1, I2, I3);
+CREATE INDEX IF NOT EXISTS labels_function ON labels (F1, F2, F3);
+
+CREATE TABLE IF NOT EXISTS matches (
+    resume_hash TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    rules_version TEXT NOT NULL,
+    fields_hash TEXT,
+    final_I TEXT,
+    final_F TEXT,
+    bucket TEXT,
+    bucket_score REAL,
+    openai_score REAL,
+    rule_based_score REAL,
+    final_score REAL,
+    lexical_score REAL,
+    score_lower_bound REAL,
+    score_upper_bound REAL,
+    scored_at TEXT NOT NULL,
+    PRIMARY KEY (resume_hash, job_hash)
+);
+CREATE INDEX IF NOT EXISTS matches_ranking ON matches (job_hash, final_score);
+-- Pages through a job's ranked matches without sorting all of them
+CREATE INDEX IF NOT EXISTS matches_ranked_pages
+    ON matches (job_hash, final_score, lexical_score, resume_hash);
+
+CREATE TABLE IF NOT EXISTS openai_scores (
+    resume_hash TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    prompt_variant TEXT NOT NULL,
+    openai_score REAL,
+    scored_at TEXT NOT NULL,
+    PRIMARY KEY (resume_hash, job_hash, prompt_variant)
+);
+
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    content_hash TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+
+-- The document each extracted PDF was stored as, by the hash of the PDF's bytes
+CREATE TABLE IF NOT EXISTS source_files (
+    kind TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    PRIMARY KEY (kind, file_hash)
+);
+"""
+
+
+def get_content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def get_match_hash(document):
+    # Near-duplicate résumés share the matches and scores of their canonical document
+    return document.get("duplicate_of") or document.get("content_hash")
+
+
+def get_fields_hash(document):
+    """
+    Returns a fingerprint of a document's extracted fields and labels, which
+    add_documents replaces in place when the same text is stored again.
+
+    A near-duplicate résumé shares its canonical résumé's matches (see
+    get_match_hash) and has the same fields, so the keys that tell the two
+    apart, content_hash and duplicate_of, are left out: otherwise scoring one
+    of them would make the match stored for the other stale.
+    """
+    excluded_keys = (
+        "document_id",
+        "filename",
+        "content_hash",
+        "duplicate_of",
+        *text_columns.values(),
+    )
+    fields = {
+        key: value
+        for key, value in document.items()
+        if key not in excluded_keys and key not in match_columns
+    }
+    return hashlib.sha256(
+        json.dumps(fields, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+class DocumentStore:
+    """
+    SQLite store for processed résumés and job descriptions, their extracted
+    fields and labels, and the matches of each candidate against each job.
+
+    Documents are rows of the same shape as the old processed CSVs: the filename,
+    the extracted fields, the I/F labels and the text under its text column.
+
+    Texts are kept out of the database in a TextBlob, with their offset and length
+    in the documents table, so loading documents without their text only touches
+    the small structured columns.
+    """
+
+    def __init__(self, path, text_blob_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # The staged pipeline stores documents from a worker thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(schema)
+        self.migrate()
+        self.text_blob = TextBlob(text_blob_path)
+        # Match keys of the résumés ranked matches are restricted to, if any (see
+        # restrict_ranked_matches). Temporary, so each connection has its own.
+        self.connection.execute(
+            "CREATE TEMP TABLE ranked_resumes (resume_hash TEXT PRIMARY KEY)"
+        )
+        self.ranked_resumes_restricted = False
+
+    def migrate(self):
+        # Databases created before texts moved to the blob keep them in documents.text
+        columns = {
+            row["name"]
+            for row in self.connection.execute("PRAGMA table_info(documents)")
+        }
+        for column in ("text_offset", "text_length"):
+            if column not in columns:
+                self.connection.execute(
+                    f"ALTER TABLE documents ADD COLUMN {column} INTEGER"
+                )
+
+        # Matches stored before fields_hash existed never match it, so they are recomputed
+        columns = {
+            row["name"] for row in self.connection.execute("PRAGMA table_info(matches)")
+        }
+        if "fields_hash" not in columns:
+            self.connection.execute("ALTER TABLE matches ADD COLUMN fields_hash TEXT")
+
+        # OpenAI scores stored before prompt variants were recorded keep an empty
+        # variant, which no run asks for, since their prompt settings are unknown
+        columns = {
+            row["name"]
+            for row in self.connection.execute("PRAGMA table_info(openai_scores)")
+        }
+        if "prompt_variant" not in columns:
+            self.connection.execute(
+                "ALTER TABLE openai_scores RENAME TO openai_scores_without_variant"
+            )
+            self.connection.executescript(schema)
+            with self.connection:
+                self.connection.execute(
+                    """
+                    INSERT INTO openai_scores
+                        (resume_hash, job_hash, prompt_variant, openai_score, scored_at)
+                    SELECT resume_hash, job_hash, '', openai_score, scored_at
+                    FROM openai_scores_without_variant
+                    """
+                )
+                self.connection.execute("DROP TABLE openai_scores_without_variant")
+
+    def add_documents(self, kind, documents):
+        """
+        Inserts or updates documents in a single transaction. A document whose
+        text is already stored for this kind replaces the stored fields and labels.
+
+        Returns:
+            list: The document IDs, in the same order as documents.
+        """
+        text_column = text_columns[kind]
+        now = datetime.now().isoformat()
+        document_ids = []
+
+        with self.connection:
+            # Take the write lock before appending texts, so processes sharing the
+            # store never interleave their appends to the text blob
+            self.connection.execute("BEGIN IMMEDIATE")
+            for document in documents:
+                text = document.get(text_column)
+                content_hash = get_content_hash(text)
+                existing = self.connection.execute(
+                    "SELECT id FROM documents WHERE kind = ? AND content_hash = ?",
+                    (kind, content_hash),
+                ).fetchone()
+
+                if existing:
+                    document_id = existing[0]
+                    self.connection.execute(
+                        "UPDATE documents SET filename = ? WHERE id = ?",
+                        (document.get("filename"), document_id),
+                    )
+                else:
+                    text_offset, text_length = self.text_blob.append(text)
+                    document_id = self.connection.execute(
+                        """
+                        INSERT INTO documents
+                            (kind, filename, content_hash, text_offset, text_length, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            kind,
+                            document.get("filename"),
+                            content_hash,
+                            text_offset,
+                            text_length,
+                            now,
+                        ),
+                    ).lastrowid
+                document_ids.append(document_id)
+
+            fields = [
+                (
+                    document_id,
+                    json.dumps(
+                        {
+                            key: value
+                            for key, value in document.items()
+                            if key not in label_columns
+                            and key not in ("filename", text_column)
+                        }
+                    ),
+                )
+                for document_id, document in zip(document_ids, documents)
+            ]
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO extracted_fields (document_id, fields) VALUES (?, ?)",
+                fields,
+            )
+
+            labels = [
+                (document_id, *[document.get(column) for column in label_columns])
+                for document_id, document in zip(document_ids, documents)
+            ]
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO labels (document_id, {', '.join(label_columns)}) "
+                f"VALUES (?, {', '.join('?' for _ in label_columns)})",
+                labels,
+            )
+
+        return document_ids
+
+    def load_documents(self, kind, document_ids=None, include_text=True):
+        """
+        Loads documents as flat dicts, optionally restricted to document_ids.
+        """
+        return [
+            document
+            for chunk in self.iter_documents(kind, document_ids, include_text)
+            for document in chunk
+        ]
+
+    def iter_documents(
+        self, kind, document_ids=None, include_text=True, chunk_size=1000
+    ):
+        """
+        Yields documents as lists of at most chunk_size flat dicts, reading them
+        from a cursor so only one chunk is in memory at a time.
+        """
+        text_select = (
+            "d.text, d.text_offset, d.text_length" if include_text else "NULL AS text"
+        )
+        query = f"""
+            SELECT d.id, d.filename, d.content_hash, {text_select}, f.fields,
+                   {', '.join(f'l.{column}' for column in label_columns)}
+            FROM documents d
+            LEFT JOIN extracted_fields f ON f.document_id = d.id
+            LEFT JOIN labels l ON l.document_id = d.id
+            WHERE d.kind = ?
+        """
+        rows = self.query_by_ids(query, [kind], document_ids, "d.id")
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield [self.row_to_document(kind, row, include_text) for row in chunk]
+
+    def get_field_names(self, kind, document_ids=None):
+        """
+        Returns the columns of the documents of a kind, in the order load_documents
+        produces them, without loading the documents themselves.
+        """
+        field_names = {}
+        query = """
+            SELECT f.fields FROM documents d
+            JOIN extracted_fields f ON f.document_id = d.id
+            WHERE d.kind = ?
+        """
+        for row in self.query_by_ids(query, [kind], document_ids, "d.id"):
+            field_names.update(dict.fromkeys(json.loads(row["fields"])))
+
+        return [
+            "document_id",
+            "filename",
+            "content_hash",
+            *field_names,
+            *label_columns,
+            text_columns[kind],
+        ]
+
+    def find_document_ids(self, kind, document_ids=None, **labels):
+        """
+        Returns the IDs of documents whose labels equal the given values,
+        e.g. find_document_ids("resume", I1="Digital", F1="GTM").
+        """
+        conditions = "".join(
+            f" AND l.{column} = ?" for column in labels if column in label_columns
+        )
+        values = [labels[column] for column in labels if column in label_columns]
+        query = f"""
+            SELECT d.id FROM documents d
+            JOIN labels l ON l.document_id = d.id
+            WHERE d.kind = ?{conditions}
+        """
+        return [
+            row[0]
+            for row in self.query_by_ids(query, [kind, *values], document_ids, "d.id")
+        ]
+
+    def iter_document_ids(self, kind, document_ids=None):
+        """
+        Yields (document ID, content hash) pairs for the documents of a kind.
+        """
+        query = "SELECT d.id, d.content_hash FROM documents d WHERE d.kind = ?"
+        for row in self.query_by_ids(query, [kind], document_ids, "d.id"):
+            yield row[0], row[1]
+
+    def count_documents(self, kind, document_ids=None):
+        return sum(1 for _ in self.iter_document_ids(kind, document_ids))
+
+    def delete_replaced_documents(self, kind, document_ids):
+        """
+        Deletes the documents of a kind stored under the filename of one of
+        document_ids, which are newer versions of the same files.
+
+        Returns:
+            int: The number of documents deleted.
+        """
+        document_ids = list(document_ids)
+        deleted = 0
+        with self.connection:
+            for start in range(0, len(document_ids), 500):
+                chunk = document_ids[start : start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                deleted += self.connection.execute(
+                    f"""
+                    DELETE FROM documents
+                    WHERE kind = ? AND id NOT IN ({placeholders}) AND filename IN (
+                        SELECT filename FROM documents WHERE id IN ({placeholders})
+                    )
+                    """,
+                    [kind, *chunk, *chunk],
+                ).rowcount
+        return deleted
+
+    def find_document_id(self, kind, content_hash):
+        row = self.connection.execute(
+            "SELECT id FROM documents WHERE kind = ? AND content_hash = ?",
+            (kind, content_hash),
+        ).fetchone()
+        return row[0] if row else None
+
+    def iter_texts(self, kind, document_ids=None):
+        """
+        Yields (document ID, text) pairs without loading the other columns.
+        """
+        query = """
+            SELECT d.id, d.text, d.text_offset, d.text_length
+            FROM documents d WHERE d.kind = ?
+        """
+        for row in self.query_by_ids(query, [kind], document_ids, "d.id"):
+            yield row["id"], self.read_text(row)
+
+    def get_text(self, document_id):
+        row = self.connection.execute(
+            "SELECT text, text_offset, text_length FROM documents WHERE id = ?",
+            (document_id,),
+        ).fetchone()
+        return self.read_text(row) if row else None
+
+    def read_text(self, row):
+        if row["text_offset"] is None:
+            return row["text"]
+        return self.text_blob.read(row["text_offset"], row["text_length"])
+
+    def load_matches(self, job_hash, fields_hashes, rules_version):
+        """
+        Returns the stored matches of résumés against a job that were computed
+        with rules_version from the same fields and labels, keyed by résumé
+        content hash. fields_hashes maps each résumé content hash to the
+        get_fields_hash of the résumé.
+        """
+        query = f"""
+            SELECT m.resume_hash, m.fields_hash,
+                   {', '.join(f'm.{column}' for column in match_columns)}
+            FROM matches m WHERE m.job_hash = ? AND m.rules_version = ?
+        """
+        rows = self.query_by_ids(
+            query, [job_hash, rules_version], list(fields_hashes), "m.resume_hash"
+        )
+        return {
+            row["resume_hash"]: {column: row[column] for column in match_columns}
+            for row in rows
+            if row["fields_hash"] == fields_hashes[row["resume_hash"]]
+        }
+
+    def save_matches(self, job_hash, rules_version, candidates):
+        """
+        Saves the matches of a batch of candidates against a job in one transaction.
+        """
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                get_match_hash(candidate),
+                job_hash,
+                rules_version,
+                get_fields_hash(candidate),
+                *[candidate.get(column) for column in match_columns],
+                now,
+            )
+            for candidate in candidates
+        ]
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO matches "
+                f"(resume_hash, job_hash, rules_version, fields_hash, {', '.join(match_columns)}, scored_at) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in match_columns)}, ?)",
+                rows,
+            )
+
+    def list_matched_jobs(self):
+        """
+        Returns the jobs with stored matches as (content hash, company, position)
+        tuples, the most recently scored first.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT m.job_hash, MAX(m.scored_at) AS last_scored_at,
+                   json_extract(f.fields, '$.company') AS company,
+                   json_extract(f.fields, '$.position') AS position
+            FROM matches m
+            JOIN documents d
+                ON d.kind = 'job_description' AND d.content_hash = m.job_hash
+            LEFT JOIN extracted_fields f ON f.document_id = d.id
+            GROUP BY m.job_hash
+            ORDER BY last_scored_at DESC
+            """
+        )
+        return [(row["job_hash"], row["company"], row["position"]) for row in rows]
+
+    def list_match_buckets(self, job_hash):
+        rows = self.connection.execute(
+            "SELECT DISTINCT bucket FROM matches WHERE job_hash = ? ORDER BY bucket",
+            (job_hash,),
+        )
+        return [row[0] for row in rows if row[0]]
+
+    def restrict_ranked_matches(self, document_ids):
+        """
+        Restricts count_ranked_matches and load_ranked_matches to the matches of
+        some résumés, such as the current batch's, on this connection.
+
+        Args:
+            document_ids (list): Document IDs of the résumés, or None to rank
+                the matches of every stored résumé.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM temp.ranked_resumes")
+        self.ranked_resumes_restricted = document_ids is not None
+        if document_ids:
+            self.extend_ranked_matches(document_ids)
+
+    def extend_ranked_matches(self, document_ids):
+        """
+        Adds résumés to the ones restrict_ranked_matches restricted the ranked
+        matches to, as a batch stores them.
+        """
+        # Near-duplicates are ranked through the match of their canonical résumé
+        query = """
+            SELECT COALESCE(json_extract(f.fields, '$.duplicate_of'), d.content_hash)
+            FROM documents d
+            LEFT JOIN extracted_fields f ON f.document_id = d.id
+            WHERE d.kind = 'resume'
+        """
+        rows = self.query_by_ids(query, [], document_ids, "d.id")
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO temp.ranked_resumes (resume_hash) VALUES (?)",
+                [(row[0],) for row in rows],
+            )
+
+    def count_ranked_matches(self, job_hash, bucket=None, min_score=None):
+        conditions, parameters = self.get_ranking_conditions(
+            job_hash, bucket, min_score
+        )
+        return self.connection.execute(
+            f"""
+            SELECT COUNT(*) FROM matches m
+            JOIN documents d ON d.kind = 'resume' AND d.content_hash = m.resume_hash
+            WHERE {conditions}
+            """,
+            parameters,
+        ).fetchone()[0]
+
+    def load_ranked_matches(
+        self,
+        job_hash,
+        offset,
+        limit,
+        sort_column="final_score",
+        descending=True,
+        bucket=None,
+        min_score=None,
+    ):
+        """
+        Loads one page of the stored matches of a job, with the filename and
+        name of each résumé, without reading any other match. Matches of
+        résumés no longer stored are left out, and so are the ones outside
+        restrict_ranked_matches' résumés while it applies.
+
+        Args:
+            job_hash (str): Content hash of the job.
+            offset (int): Rows to skip in the sorted order.
+            limit (int): Rows to load.
+            sort_column (str): One of ranked_match_columns.
+            descending (bool): Whether the highest values come first.
+            bucket (str): Only matches in this bucket, if given.
+            min_score (float): Only matches with at least this final score, if given.
+
+        Returns:
+            list: The matches as dicts of ranked_match_columns.
+        """
+        if sort_column not in ranked_match_columns:
+            raise ValueError(f"Cannot sort matches by {sort_column}")
+
+        conditions, parameters = self.get_ranking_conditions(
+            job_hash, bucket, min_score
+        )
+        direction = "DESC" if descending else "ASC"
+        # Ties break in the same direction, so the default final score order
+        # reads straight from the matches_ranked_pages index
+        order_by = (
+            f"{sort_column} {direction}, lexical_score {direction}, "
+            f"resume_hash {direction}"
+        )
+        if sort_column in match_columns:
+            # Extracted fields are only joined for the rows of the page
+            query = f"""
+                SELECT p.*, json_extract(f.fields, '$.name') AS name
+                FROM (
+                    SELECT d.id, d.filename, m.resume_hash,
+                           {', '.join(f'm.{column}' for column in match_columns)}
+                    FROM matches m
+                    JOIN documents d
+                        ON d.kind = 'resume' AND d.content_hash = m.resume_hash
+                    WHERE {conditions}
+                    ORDER BY {order_by} LIMIT ? OFFSET ?
+                ) p
+                LEFT JOIN extracted_fields f ON f.document_id = p.id
+                ORDER BY {order_by}
+            """
+        else:
+            query = f"""
+                SELECT * FROM (
+                    SELECT d.filename, json_extract(f.fields, '$.name') AS name,
+                           m.resume_hash, {', '.join(f'm.{column}' for column in match_columns)}
+                    FROM matches m
+                    JOIN documents d
+                        ON d.kind = 'resume' AND d.content_hash = m.resume_hash
+                    LEFT JOIN extracted_fields f ON f.document_id = d.id
+                    WHERE {conditions}
+                )
+                ORDER BY {order_by} LIMIT ? OFFSET ?
+            """
+        rows = self.connection.execute(query, [*parameters, limit, offset])
+        return [
+            {column: row[column] for column in ranked_match_columns} for row in rows
+        ]
+
+    def get_ranking_conditions(self, job_hash, bucket, min_score):
+        conditions = ["m.job_hash = ?"]
+        parameters = [job_hash]
+        if bucket:
+            conditions.append("m.bucket = ?")
+            parameters.append(bucket)
+        if min_score is not None:
+            conditions.append("m.final_score >= ?")
+            parameters.append(min_score)
+        if self.ranked_resumes_restricted:
+            conditions.append(
+                "m.resume_hash IN (SELECT resume_hash FROM temp.ranked_resumes)"
+            )
+        return " AND ".join(conditions), parameters
+
+    def load_openai_scores(self, job_hash, resume_hashes, prompt_variant):
+        """
+        Returns the OpenAI scores already paid for with the same prompt variant,
+        keyed by résumé content hash. They do not depend on the scoring rules,
+        so they survive rule changes.
+        """
+        query = """
+            SELECT o.resume_hash, o.openai_score FROM openai_scores o
+            WHERE o.job_hash = ? AND o.prompt_variant = ?
+        """
+        rows = self.query_by_ids(
+            query, [job_hash, prompt_variant], resume_hashes, "o.resume_hash"
+        )
+        return {row["resume_hash"]: row["openai_score"] for row in rows}
+
+    def save_openai_scores(self, job_hash, prompt_variant, openai_scores):
+        """
+        Saves OpenAI scores, given as a dict of résumé content hash to score.
+        """
+        now = datetime.now().isoformat()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO openai_scores "
+                "(resume_hash, job_hash, prompt_variant, openai_score, scored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (resume_hash, job_hash, prompt_variant, openai_score, now)
+                    for resume_hash, openai_score in openai_scores.items()
+                    if openai_score is not None
+                ],
+            )
+
+    def iter_minhash_signatures(self, kind):
+        """
+        Yields (content hash, signature bytes) pairs for the documents of a kind.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT m.content_hash, m.signature FROM minhash_signatures m
+            JOIN documents d ON d.content_hash = m.content_hash
+            WHERE d.kind = ?
+            """,
+            (kind,),
+        )
+        for row in rows:
+            yield row[0], row[1]
+
+    def save_minhash_signatures(self, signatures):
+        """
+        Saves MinHash signatures, given as a dict of content hash to signature bytes.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO minhash_signatures (content_hash, signature) "
+                "VALUES (?, ?)",
+                signatures.items(),
+            )
+
+    def save_source_files(self, kind, document_ids):
+        """
+        Saves the document each PDF was stored as, given as a dict of file hash
+        to document ID.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO source_files (kind, file_hash, document_id) "
+                "VALUES (?, ?, ?)",
+                [
+                    (kind, file_hash, document_id)
+                    for file_hash, document_id in document_ids.items()
+                ],
+            )
+
+    def load_extraction(self, kind, file_hash):
+        """
+        Returns the extraction result stored for a PDF, as it was before
+        add_documents stored it, or None if the PDF was never stored (or its
+        document has since been deleted).
+        """
+        row = self.connection.execute(
+            "SELECT document_id FROM source_files WHERE kind = ? AND file_hash = ?",
+            (kind, file_hash),
+        ).fetchone()
+        documents = self.load_documents(kind, [row[0]]) if row else []
+        if not documents:
+            return None
+        return {
+            key: value
+            for key, value in documents[0].items()
+            if key not in ("document_id", "filename", "content_hash")
+        }
+
+    def export_csv(self, kind, document_ids, output_file):
+        """
+        Writes documents to a CSV file in the layout of the old processed CSVs.
+        """
+        documents = self.load_documents(kind, document_ids)
+        if not documents:
+            return
+
+        fieldnames = set()
+        for document in documents:
+            fieldnames.update(document.keys())
+
+        with open(output_file, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=sorted(fieldnames))
+            writer.writeheader()
+            writer.writerows(documents)
+
+    def query_by_ids(self, query, parameters, document_ids, id_column):
+        """
+        Yields the rows of a query, optionally restricted to the values in
+        document_ids (or any other list of keys matching id_column).
+        """
+        if document_ids is None:
+            yield from self.connection.execute(query, parameters)
+            return
+
+        # Stay under SQLite's limit on the number of bound parameters
+        document_ids = list(document_ids)
+        for start in range(0, len(document_ids), 500):
+            chunk = document_ids[start : start + 500]
+            yield from self.connection.execute(
+                f"{query} AND {id_column} IN ({', '.join('?' for _ in chunk)})",
+                [*parameters, *chunk],
+            )
+
+    def row_to_document(self, kind, row, include_text=True):
+        document = {
+            "document_id": row["id"],
+            "filename": row["filename"],
+            "content_hash": row["content_hash"],
+        }
+        document.update(json.loads(row["fields"] or "{}"))
+        document.update({column: row[column] for column in label_columns})
+        if include_text:
+            document[text_columns[kind]] = self.read_text(row)
+        return document
+
+
+document_store = None
+
+
+def get_document_store():
+    global document_store
+    if document_store is None:
+        document_store = DocumentStore(
+            config.document_store_path, config.document_text_blob_path
+        )
+    return document_store
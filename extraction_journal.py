@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from document_store import get_document_store
+
+# Entries are written as {"file_hash": ..., "result": ...}, so the file hash
+# can be read without parsing the whole line
+entry_prefix_pattern = re.compile(rb'\{"file_hash": "([0-9a-f]+)"')
+
+
+def get_file_hash(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def dedupe_file_paths(file_paths):
+    """
+    Hashes the files, dropping any whose bytes match an earlier one, such as
+    the same PDF selected from two folders.
+
+    Returns:
+        list: (file path, file hash) pairs, in the order of file_paths.
+    """
+    file_hashes = {}
+    for file_path in file_paths:
+        file_hash = get_file_hash(file_path)
+        if file_hash in file_hashes:
+            print(f"Skipping duplicate of {file_hashes[file_hash]}: {file_path}")
+            continue
+        file_hashes[file_hash] = file_path
+    return [(file_path, file_hash) for file_hash, file_path in file_hashes.items()]
+
+
+class ExtractionJournal:
+    """
+    Write-ahead JSONL journal of completed extractions, keyed by file hash.
+
+    Each extraction is appended and fsynced as soon as it finishes, so a crash
+    or an interrupted run only loses the document being processed. A torn last
+    line from a crash mid-write is ignored.
+
+    Only the offset of each entry is held in memory, and an entry is read from
+    the file when asked for. Once the caller has stored an extraction in the
+    DocumentStore it calls commit, which drops the entry from the journal, so
+    the journal only ever holds extractions not stored yet. The extractions of
+    PDFs already stored are found in the DocumentStore instead.
+    """
+
+    def __init__(self, path, kind):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.kind = kind
+        self.offsets = {}
+        # Extraction workers may record from several threads
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            self.load_offsets()
+
+            # Terminate a torn last line so the next record starts on its own line
+            with open(path, "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+
+    def load_offsets(self):
+        offsets = {}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                file_hash = get_entry_file_hash(line)
+                if file_hash is not None:
+                    offsets[file_hash] = offset
+                offset += len(line)
+        self.offsets = offsets
+
+    def get(self, file_hash):
+        """
+        Returns the extraction result recorded for a PDF, from the journal or,
+        once committed, from the DocumentStore, or None if there is none.
+        """
+        with self.lock:
+            entry = self.read_entry(file_hash)
+            if entry is None and file_hash in self.offsets:
+                # Another process sharing the journal may have compacted it
+                self.load_offsets()
+                entry = self.read_entry(file_hash)
+        if entry is not None:
+            return entry["result"]
+        return get_document_store().load_extraction(self.kind, file_hash)
+
+    def read_entry(self, file_hash):
+        offset = self.offsets.get(file_hash)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            line = f.readline()
+        if get_entry_file_hash(line) != file_hash:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            # Torn by a crash mid-write
+            return None
+
+    def record(self, file_hash, result):
+        with self.lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(
+                    (
+                        json.dumps({"file_hash": file_hash, "result": result}) + "\n"
+                    ).encode("utf-8")
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            self.offsets[file_hash] = offset
+
+    def commit(self, document_ids):
+        """
+        Records the documents the caller stored extractions as, and drops
+        their entries from the journal.
+
+        Args:
+            document_ids (dict): File hash -> ID of the stored document.
+        """
+        get_document_store().save_source_files(self.kind, document_ids)
+        with self.lock:
+            if not any(file_hash in self.offsets for file_hash in document_ids):
+                return
+            self.compact(document_ids.keys())
+
+    def compact(self, committed_file_hashes):
+        """
+        Rewrites the journal without the entries of committed_file_hashes.
+        Appends made meanwhile by another process sharing the journal (work
+        queue workers) can be lost; those processes store their extraction
+        themselves, so this only loses a resume point.
+        """
+        temporary_path = f"{self.path}.tmp"
+        offsets = {}
+        try:
+            with open(self.path, "rb") as source, open(temporary_path, "wb") as target:
+                for line in source:
+                    file_hash = get_entry_file_hash(line)
+                    if file_hash is None or file_hash in committed_file_hashes:
+                        continue
+                    try:
+                        json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn by a crash mid-write
+                        continue
+                    offsets[file_hash] = target.tell()
+                    target.write(line)
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            # e.g. the file is open in another process on Windows; the entries
+            # are dropped by a later commit
+            print(f"Could not compact {self.path}: {e}")
+            return
+        self.offsets = offsets
+
+
+def get_entry_file_hash(line):
+    """
+    Returns the file hash of a journal line, read from the start of the line
+    without parsing the result after it, or None if the line is not an entry.
+    """
+    match = entry_prefix_pattern.match(line)
+    return match.group(1).decode("ascii") if match else None
@@ -0,0 +1,292 @@
+import numpy as np
+import re
+import sys
+
+from document_store import get_document_store
+from score_candidates import buckets_table, scores_table
+
+# Label levels compared by determine_bucket, from the broadest to the narrowest
+label_levels = 3
+
+# Bucket names by index; index 0 is "no bucket"
+bucket_names = [""] + list(scores_table)
+
+# Rule-based score adjustments for the candidate's English level,
+# when the company is headquartered in Japan and when it is not
+english_points_japan = {
+    "Native": 5,
+    "Fluent": 4,
+    "Business": 3,
+    "Reading/Writing": 1,
+}
+english_points_global = {
+    "Native": 10,
+    "Fluent": 10,
+    "Reading/Writing": -10,
+    "None": -20,
+}
+
+# Job fields returned with each ranked job
+job_fields = ["document_id", "content_hash", "company", "position", "filename"]
+
+
+def split_tags(text):
+    return {keyword.strip() for keyword in (text or "").split(",")} - {""}
+
+
+class JobIndex:
+    """
+    All stored jobs held as NumPy arrays, so one candidate is bucketed and
+    rule-scored against every job in a single vectorized pass.
+
+    Each I/F label column is encoded as integer codes per job, so a level
+    matches where the candidate's code equals the job's. The I4/F4 tags of
+    every job are bitmasks over a shared tag vocabulary, packed into uint64
+    words, so the tags a candidate shares with each job are a popcount of an
+    AND. The target age and headquarters location are plain arrays.
+
+    The results are the same as apply_bucket, get_rule_based_score and
+    get_shared_tag_count give job by job; both must change together.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+        # Per category ("I", "F"): the label vocabulary of each level and a
+        # (jobs, levels) array of label codes
+        self.label_vocabularies = {}
+        self.label_codes = {}
+        for category in ["I", "F"]:
+            vocabularies = []
+            codes = np.empty((len(jobs), label_levels), dtype=np.int32)
+            for level in range(label_levels):
+                key = f"{category}{level + 1}"
+                vocabulary = {}
+                for position, job_data in enumerate(jobs):
+                    codes[position, level] = vocabulary.setdefault(
+                        job_data.get(key), len(vocabulary)
+                    )
+                vocabularies.append(vocabulary)
+            self.label_vocabularies[category] = vocabularies
+            self.label_codes[category] = codes
+
+        # Per tag category ("i4", "f4"): the tag vocabulary and a (jobs, words)
+        # array of tag bitmasks
+        self.tag_vocabularies = {}
+        self.tag_masks = {}
+        for category in ["i4", "f4"]:
+            job_tags = [split_tags(job_data.get(category)) for job_data in jobs]
+            vocabulary = {}
+            for tags in job_tags:
+                for tag in tags:
+                    vocabulary.setdefault(tag, len(vocabulary))
+            self.tag_vocabularies[category] = vocabulary
+            self.tag_masks[category] = (
+                np.stack([self.pack_tags(tags, vocabulary) for tags in job_tags])
+                if jobs
+                else np.zeros((0, 1), dtype=np.uint64)
+            )
+
+        self.target_ages = np.array(
+            [int(job_data.get("target_age")) for job_data in jobs], dtype=np.int32
+        )
+        self.hq_in_japan = np.array(
+            [job_data.get("company_hq_location") == "Japan" for job_data in jobs],
+            dtype=bool,
+        )
+
+        # Bucket index of every (final F level, final I level), levels 0 to 4
+        self.bucket_lookup = np.zeros((5, 5), dtype=np.int32)
+        for (final_F, final_I), bucket in buckets_table.items():
+            self.bucket_lookup[int(final_F[1]), int(final_I[1])] = bucket_names.index(
+                bucket
+            )
+        self.bucket_max = np.array(
+            [0] + [scores_table[bucket]["max"] for bucket in bucket_names[1:]],
+            dtype=np.int32,
+        )
+        self.perfect_match = bucket_names.index("Perfect Match")
+
+    @staticmethod
+    def pack_tags(tags, vocabulary):
+        bits = np.zeros(max(len(vocabulary), 1), dtype=bool)
+        for tag in tags:
+            position = vocabulary.get(tag)
+            if position is not None:
+                bits[position] = True
+        words = np.packbits(bits, bitorder="little")
+        words = np.pad(words, (0, -len(words) % 8))
+        return words.view(np.uint64)
+
+    def get_final_levels(self, candidate_data, category):
+        """
+        Returns the number of leading label levels each job shares with the
+        candidate, as determine_bucket counts them.
+        """
+        candidate_codes = np.array(
+            [
+                vocabulary.get(candidate_data.get(f"{category}{level + 1}"), -1)
+                for level, vocabulary in enumerate(self.label_vocabularies[category])
+            ],
+            dtype=np.int32,
+        )
+        matches = self.label_codes[category] == candidate_codes
+        # Levels matched before the first mismatch
+        return np.cumprod(matches, axis=1).sum(axis=1)
+
+    def get_shared_tag_counts(self, candidate_data):
+        """
+        Returns how many I4 and F4 tags each job shares with the candidate.
+        """
+        shared_tags = np.zeros(len(self.jobs), dtype=np.int64)
+        for category, vocabulary in self.tag_vocabularies.items():
+            candidate_mask = self.pack_tags(
+                split_tags(candidate_data.get(category)), vocabulary
+            )
+            shared_tags += np.bitwise_count(
+                self.tag_masks[category] & candidate_mask
+            ).sum(axis=1, dtype=np.int64)
+        return shared_tags
+
+    def get_rule_adjustments(self, candidate_data):
+        """
+        Returns what get_rule_based_score adds to the bucket score of the
+        candidate for each job.
+        """
+        adjustment = 0
+        japanese_level = candidate_data.get("japanese_level")
+        if candidate_data.get("country") != "Japan":
+            adjustment -= 40 if japanese_level == "Native" else 90
+
+        candidate_age = int(re.search(r"\d+", candidate_data.get("age")).group())
+        if candidate_age > 60:
+            adjustment -= 20
+        elif candidate_age > 55:
+            adjustment -= 10
+        elif candidate_age > 50:
+            adjustment -= 5
+
+        if candidate_data.get("gender") == "Female":
+            adjustment += 5
+
+        if japanese_level == "Fluent":
+            adjustment -= 5
+        elif japanese_level == "Business":
+            adjustment -= 15
+        elif japanese_level in ("Reading/Writing", "None"):
+            adjustment -= 80
+
+        # -1 point every 3 years beyond +/- 6 years of the job's target age
+        age_difference = np.abs(candidate_age - self.target_ages)
+        age_penalty = np.maximum(age_difference - 6, 0) // 3
+
+        english_level = candidate_data.get("english_level")
+        english_points = np.where(
+            self.hq_in_japan,
+            english_points_japan.get(english_level, 0),
+            english_points_global.get(english_level, 0),
+        )
+        return adjustment - age_penalty + english_points
+
+    def score(self, candidate_data):
+        """
+        Buckets and rule-scores a candidate against every job.
+
+        Args:
+            candidate_data (dict): The candidate's labels and fields.
+
+        Returns:
+            dict: Per job, in the order of self.jobs: "final_I" and "final_F"
+            levels, "bucket" indexes into bucket_names (0 for no bucket),
+            "bucket_score" and "rule_based_score" (both 0 without a bucket),
+            and the number of I4/F4 tags shared with the candidate
+            ("shared_tags").
+        """
+        final_I = self.get_final_levels(candidate_data, "I")
+        final_F = self.get_final_levels(candidate_data, "F")
+        buckets = self.bucket_lookup[final_F, final_I]
+        bucketed = buckets > 0
+
+        # Levels stop at 3, so get_I4_and_F4_points never adds to the bucket's max
+        bucket_scores = np.where(bucketed, self.bucket_max[buckets], 0)
+        buckets = np.where(bucket_scores >= 70, self.perfect_match, buckets)
+
+        # Like the job-by-job scoring, the rules only need a candidate's fields
+        # once it falls into a bucket
+        rule_based_scores = np.zeros(len(self.jobs), dtype=np.int64)
+        if bucketed.any():
+            rule_based_scores = np.where(
+                bucketed,
+                np.maximum(
+                    bucket_scores + self.get_rule_adjustments(candidate_data), 0
+                ),
+                0,
+            )
+        return {
+            "final_I": final_I,
+            "final_F": final_F,
+            "bucket": buckets,
+            "bucket_score": bucket_scores,
+            "rule_based_score": rule_based_scores,
+            "shared_tags": self.get_shared_tag_counts(candidate_data),
+        }
+
+    def top_jobs(self, candidate_data, top_n=10):
+        """
+        Returns the jobs a candidate falls into a bucket of, best rule-based
+        score first, then by bucket score and shared I4/F4 tags.
+
+        Args:
+            candidate_data (dict): The candidate's labels and fields.
+            top_n (int): How many jobs to return (0 for all bucketed jobs).
+
+        Returns:
+            list: Dicts of the job's main fields, its bucket, bucket score,
+            rule-based score and shared I4/F4 tags.
+        """
+        scores = self.score(candidate_data)
+        positions = np.flatnonzero(scores["bucket"] > 0)
+        # Ties keep the order of the jobs
+        order = np.lexsort(
+            (
+                positions,
+                -scores["shared_tags"][positions],
+                -scores["bucket_score"][positions],
+                -scores["rule_based_score"][positions],
+            )
+        )
+        positions = positions[order]
+        if top_n > 0:
+            positions = positions[:top_n]
+
+        return [
+            {
+                **{field: self.jobs[position].get(field) for field in job_fields},
+                "bucket": bucket_names[scores["bucket"][position]],
+                "bucket_score": int(scores["bucket_score"][position]),
+                "rule_based_score": int(scores["rule_based_score"][position]),
+                "shared_tags": int(scores["shared_tags"][position]),
+            }
+            for position in positions
+        ]
+
+
+def open_job_index():
+    """
+    Returns a JobIndex over every stored job description.
+    """
+    return JobIndex(get_document_store().load_documents("job_description"))
+
+
+if __name__ == "__main__":
+    # Usage: python job_index.py <résumé document ID> [how many jobs]
+    store = get_document_store()
+    candidate_data = store.load_documents(
+        "resume", [int(sys.argv[1])], include_text=False
+    )[0]
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for job in open_job_index().top_jobs(candidate_data, top_n):
+        print(
+            f"{job['rule_based_score']:>4}  {job['bucket']:<15} "
+            f"{job['position']} at {job['company']}"
+        )
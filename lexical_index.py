@@ -0,0 +1,136 @@
+import numpy as np
+import re
+import unicodedata
+
+# Japanese and Chinese scripts, which are written without spaces between words:
+# the iteration mark, kana and CJK ideographs (half-width katakana is folded
+# into kana by tokenize)
+cjk_characters = "\u3005\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+
+# A run of CJK characters, or a word of any other script (e.g. "c++", "c#")
+token_pattern = re.compile(
+    rf"[{cjk_characters}]+|[^\W{cjk_characters}](?:[^\W{cjk_characters}]|[+#])*"
+)
+cjk_pattern = re.compile(rf"[{cjk_characters}]")
+
+stop_words = set(
+    "a an and are as at be by for from has in is it of on or that the to was were "
+    "will with".split()
+)
+
+
+def tokenize(text, cjk_gram_size=2):
+    """
+    Splits text into lowercase word tokens, dropping stop words and single characters.
+
+    Runs of CJK characters have no spaces to split words on, so they are split
+    into overlapping character n-grams instead, bigrams by default ("法人営業"
+    gives "法人", "人営" and "営業"), the usual way to index Japanese text
+    without a dictionary. A run shorter than cjk_gram_size is kept as a token.
+    Full-width letters and digits are folded to their ASCII forms first.
+    """
+    if not isinstance(text, str):
+        return []
+    tokens = []
+    for token in token_pattern.findall(unicodedata.normalize("NFKC", text).lower()):
+        if cjk_pattern.match(token):
+            tokens.extend(
+                token[start : start + cjk_gram_size]
+                for start in range(max(len(token) - cjk_gram_size + 1, 1))
+            )
+        elif len(token) > 1 and token not in stop_words:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over a list of documents, held as a sparse inverted index
+    in flat NumPy arrays.
+
+    The postings of term t are doc_ids[term_offsets[t]:term_offsets[t + 1]], with
+    their BM25 weights precomputed in weights, so scoring a query is a single
+    bincount over the concatenated postings of its terms.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.vocabulary = {}
+
+        term_ids = []
+        doc_ids = []
+        term_frequencies = []
+        doc_lengths = []
+
+        # Documents may be a generator, so they are only iterated once
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                term_id = self.vocabulary.setdefault(token, len(self.vocabulary))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            term_ids.extend(counts.keys())
+            doc_ids.extend([doc_id] * len(counts))
+            term_frequencies.extend(counts.values())
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_frequencies = np.asarray(term_frequencies, dtype=np.float64)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        self.document_count = len(doc_lengths)
+
+        # Group postings by term
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        self.doc_ids = doc_ids[order]
+        term_frequencies = term_frequencies[order]
+        document_frequencies = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.term_offsets = np.concatenate(([0], np.cumsum(document_frequencies)))
+
+        average_length = doc_lengths.mean() if self.document_count else 0.0
+        idf = np.log(
+            1
+            + (self.document_count - document_frequencies + 0.5)
+            / (document_frequencies + 0.5)
+        )
+        length_norm = k1 * (
+            1 - b + b * doc_lengths[self.doc_ids] / (average_length or 1)
+        )
+        self.weights = (
+            idf[term_ids]
+            * term_frequencies
+            * (k1 + 1)
+            / (term_frequencies + length_norm)
+        )
+
+    def score(self, query_text):
+        """
+        Returns the BM25 score of every document for the query, as an array
+        aligned with the documents the index was built from.
+        """
+        term_ids = {
+            self.vocabulary[token]
+            for token in tokenize(query_text)
+            if token in self.vocabulary
+        }
+        if not term_ids:
+            return np.zeros(self.document_count)
+
+        postings = [
+            np.arange(self.term_offsets[term_id], self.term_offsets[term_id + 1])
+            for term_id in term_ids
+        ]
+        positions = np.concatenate(postings)
+        return np.bincount(
+            self.doc_ids[positions],
+            weights=self.weights[positions],
+            minlength=self.document_count,
+        )
+
+    def relative_scores(self, query_text):
+        """
+        Returns the BM25 scores scaled so the best matching document gets 1.0.
+        """
+        scores = self.score(query_text)
+        best = scores.max() if len(scores) else 0
+        return scores / best if best > 0 else scores
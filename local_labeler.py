@@ -0,0 +1,183 @@
+import config
+import re
+import threading
+import zlib
+
+from chunked_extraction import extract_in_chunks, merge_grid_labels
+from collections import Counter
+from taxonomy import generate_grid_labels, grids
+
+
+def compile_phrase_pattern(phrases):
+    # Whole words only, so "ux" does not match inside "luxury"
+    return re.compile(
+        "|".join(rf"(?<!\w){re.escape(phrase.lower())}(?!\w)" for phrase in phrases)
+    )
+
+
+leaf_patterns = {
+    grid_name: {
+        leaf: compile_phrase_pattern(phrases)
+        for leaf, phrases in grid["keywords"].items()
+        if phrases
+    }
+    for grid_name, grid in grids.items()
+}
+
+tag_patterns = {
+    grid_name: {
+        row: {tag: compile_phrase_pattern([tag]) for tag in tags}
+        for row, tags in grid.get("tags", {}).items()
+    }
+    for grid_name, grid in grids.items()
+}
+
+
+def predict_grid_labels(grid_name, text):
+    """
+    Labels text with the grid leaf whose keywords clearly dominate it.
+
+    Every keyword counts at most three times, so one repeated phrase cannot
+    decide a label on its own.
+
+    Args:
+        grid_name (str): "industry" or "function".
+        text (str): Résumé or job description text.
+
+    Returns:
+        dict: The four grid labels (e.g. I1 to I4), or None if no leaf reaches
+        config.local_label_min_hits or wins by config.local_label_margin.
+    """
+    lowered = (text or "").lower()
+    leaf_scores = []
+    for leaf, pattern in leaf_patterns[grid_name].items():
+        phrase_counts = Counter(pattern.findall(lowered))
+        score = sum(min(count, 3) for count in phrase_counts.values())
+        if score:
+            leaf_scores.append((score, leaf, phrase_counts))
+
+    if not leaf_scores:
+        return None
+
+    leaf_scores.sort(key=lambda x: x[0], reverse=True)
+    best_score, best_leaf, phrase_counts = leaf_scores[0]
+    runner_up_score = leaf_scores[1][0] if len(leaf_scores) > 1 else 0
+    if (
+        best_score < config.local_label_min_hits
+        or best_score < config.local_label_margin * runner_up_score
+    ):
+        return None
+
+    row_tags = tag_patterns[grid_name].get(best_leaf[:2])
+    if row_tags is not None:
+        tags = [tag for tag, pattern in row_tags.items() if pattern.search(lowered)]
+    else:
+        tags = list(phrase_counts)
+
+    prefix = grids[grid_name]["prefix"]
+    labels = {f"{prefix}{level}": label for level, label in enumerate(best_leaf, 1)}
+    labels[f"{prefix}4"] = ", ".join(tags)
+    return labels
+
+
+class LabelingStats:
+    """
+    Counts how grid labels were assigned, to report the OpenAI calls avoided
+    and how often audited local labels agreed with OpenAI.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Called at the start of each run, so a long-lived process reports per run
+        with self.lock:
+            self.local = 0
+            self.openai = 0
+            self.audited = 0
+            self.agreed = 0
+
+    def record(self, source, agreed=False):
+        with self.lock:
+            if source == "local":
+                self.local += 1
+            elif source == "audit":
+                self.audited += 1
+                self.agreed += int(agreed)
+            else:
+                self.openai += 1
+
+    def report(self):
+        total = self.local + self.openai + self.audited
+        if not total:
+            return
+
+        print(
+            f"Grid labels: {self.local} of {total} assigned locally "
+            f"({self.local / total:.0%} of label calls avoided)"
+        )
+        if self.audited:
+            print(
+                f"Local labels agreed with OpenAI on {self.agreed} of "
+                f"{self.audited} audited labelings ({self.agreed / self.audited:.0%})"
+            )
+
+
+labeling_stats = LabelingStats()
+
+
+def is_audited(text):
+    # Deterministic, so rerunning a document makes the same choice
+    return zlib.crc32((text or "").encode("utf-8")) % 1000 < (
+        config.local_label_audit_rate * 1000
+    )
+
+
+def get_grid_labels(grid_name, text, document_kind):
+    """
+    Returns the grid labels of text, assigned locally when the keyword labeler
+    is confident and config.use_local_labels is on, and by OpenAI otherwise.
+    A sample of confident documents is labeled by both, to keep measuring their
+    agreement. While use_local_labels is off every confident document is, and
+    the OpenAI labels are always the ones returned.
+
+    Args:
+        grid_name (str): "industry" or "function".
+        text (str): Résumé or job description text.
+        document_kind (str): "resume" or "job_description".
+
+    Returns:
+        dict: The four grid labels, or None if OpenAI returned nothing.
+    """
+    local_labels = None
+    if config.local_label_min_hits > 0:
+        local_labels = predict_grid_labels(grid_name, text)
+
+    if local_labels is None:
+        labeling_stats.record("openai")
+        return generate_labels_with_openai(grid_name, text, document_kind)
+
+    if config.use_local_labels and not is_audited(text):
+        labeling_stats.record("local")
+        return local_labels
+
+    openai_labels = generate_labels_with_openai(grid_name, text, document_kind)
+    prefix = grids[grid_name]["prefix"]
+    agreed = openai_labels is not None and all(
+        openai_labels.get(f"{prefix}{level}") == local_labels[f"{prefix}{level}"]
+        for level in (1, 2, 3)
+    )
+    labeling_stats.record("audit", agreed)
+    if not config.use_local_labels:
+        return openai_labels
+    return openai_labels or local_labels
+
+
+def generate_labels_with_openai(grid_name, text, document_kind):
+    prefix = grids[grid_name]["prefix"]
+    return extract_in_chunks(
+        text,
+        lambda chunk: generate_grid_labels(grid_name, chunk, document_kind),
+        lambda results: merge_grid_labels(results, prefix),
+    )
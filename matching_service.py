@@ -0,0 +1,289 @@
+import config
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from document_store import get_document_store, get_match_hash
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from job_index import JobIndex, bucket_names
+from pdf_parser import parse_pdf_to_text
+from process_resumes import extract_candidate_profile, open_resume_journal
+from score_candidates import (
+    get_final_score,
+    get_openai_score,
+    get_prompt_variant,
+    prepare_resume_for_prompt,
+)
+from urllib.parse import parse_qs, urlparse
+
+# Job fields returned with each match
+job_fields = ["document_id", "company", "position", "filename"]
+
+# Candidate fields returned with the matches
+candidate_fields = [
+    "name",
+    "country",
+    "japanese_level",
+    "english_level",
+    "I1",
+    "I2",
+    "I3",
+    "F1",
+    "F2",
+    "F3",
+]
+
+
+class MatchingService:
+    """
+    Scores one résumé at a time against every stored job, with everything a
+    request needs kept warm between requests: the jobs, a process pool with the
+    PDF parsing and OCR libraries already imported, the extraction journal and
+    the stored OpenAI scores.
+
+    Parsing and extraction run outside any lock, so requests overlap there.
+    Store access is serialized, and the OpenAI scores a résumé still needs are
+    requested in parallel, config.llm_concurrency at a time.
+    """
+
+    def __init__(self):
+        self.store = get_document_store()
+        self.store_lock = threading.Lock()
+        self.journal = open_resume_journal()
+        self.parse_executor = ProcessPoolExecutor(
+            max_workers=config.parse_workers or None,
+            initializer=importlib.import_module,
+            initargs=("pdf_parser",),
+        )
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=max(config.llm_concurrency, 1)
+        )
+        self.jobs = []
+        self.job_index = JobIndex([])
+        self.reload_jobs()
+        os.makedirs(config.service_upload_dir, exist_ok=True)
+
+    def reload_jobs(self):
+        with self.store_lock:
+            self.jobs = self.store.load_documents("job_description")
+            self.job_index = JobIndex(self.jobs)
+        return len(self.jobs)
+
+    def match_resume(self, pdf_bytes, top_n):
+        """
+        Extracts a résumé, stores it, and ranks every stored job for it.
+
+        A résumé uploaded before is neither parsed nor extracted again, and
+        OpenAI is only called for the candidate-job pairs never scored before.
+
+        Args:
+            pdf_bytes (bytes): The résumé PDF.
+            top_n (int): How many of the best matches to return (0 for all).
+
+        Returns:
+            dict: The candidate's main fields and its ranked matches.
+        """
+        started_at = time.monotonic()
+        file_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        pdf_path = os.path.join(config.service_upload_dir, f"{file_hash}.pdf")
+        if not os.path.exists(pdf_path):
+            with open(pdf_path, "wb") as f:
+                f.write(pdf_bytes)
+
+        with self.store_lock:
+            # The journal reads extractions already stored from the store
+            candidate_profile = self.journal.get(file_hash)
+        if candidate_profile is None:
+            pdf_text = self.parse_executor.submit(parse_pdf_to_text, pdf_path).result()
+            candidate_profile = extract_candidate_profile(pdf_path, pdf_text)
+            self.journal.record(file_hash, candidate_profile)
+
+        with self.store_lock:
+            document_id = self.store.add_documents("resume", [candidate_profile])[0]
+            self.journal.commit({file_hash: document_id})
+            candidate_data = self.store.load_documents(
+                "resume", [document_id], include_text=False
+            )[0]
+
+        matches = self.score_against_jobs(
+            candidate_data, candidate_profile.get("resume_text")
+        )
+        matches.sort(key=lambda x: x["final_score"] or 0, reverse=True)
+        return {
+            "document_id": document_id,
+            "candidate": {
+                field: candidate_data.get(field) for field in candidate_fields
+            },
+            "matches": matches[:top_n] if top_n > 0 else matches,
+            "elapsed_seconds": round(time.monotonic() - started_at, 3),
+        }
+
+    def score_against_jobs(self, candidate_data, resume_text):
+        """
+        Scores a candidate against every job as the default scoring mode does:
+        bucketed candidates get their rule-based score, and the ones with a
+        bucket score of at least 71 their OpenAI score instead. Buckets and
+        rule-based scores come from one pass over the job index.
+        """
+        job_index = self.job_index
+        scores = job_index.score(candidate_data)
+        matches = []
+        openai_matches = []
+        for position, job_data in enumerate(job_index.jobs):
+            match = {
+                "bucket": bucket_names[scores["bucket"][position]],
+                "bucket_score": int(scores["bucket_score"][position]),
+                "rule_based_score": int(scores["rule_based_score"][position]),
+                "openai_score": None,
+            }
+            match["final_score"] = match["rule_based_score"]
+            if match["bucket"] and match["bucket_score"] >= 71:
+                openai_matches.append((job_data, match))
+            matches.append((job_data, match))
+
+        match_hash = get_match_hash(candidate_data)
+        # Each job is scored in a request of its own
+        prompt_variant = get_prompt_variant(listwise=False)
+        with self.store_lock:
+            stored_scores = {
+                job_data["content_hash"]: self.store.load_openai_scores(
+                    job_data["content_hash"], [match_hash], prompt_variant
+                ).get(match_hash)
+                for job_data, _ in openai_matches
+            }
+
+        missing = [
+            (job_data, match)
+            for job_data, match in openai_matches
+            if stored_scores[job_data["content_hash"]] is None
+        ]
+        if missing:
+            prompt_text = prepare_resume_for_prompt(resume_text)
+            new_scores = list(
+                self.llm_executor.map(
+                    lambda job_match: get_openai_score(prompt_text, job_match[0]),
+                    missing,
+                )
+            )
+            with self.store_lock:
+                for (job_data, _), score in zip(missing, new_scores):
+                    self.store.save_openai_scores(
+                        job_data["content_hash"], prompt_variant, {match_hash: score}
+                    )
+                    stored_scores[job_data["content_hash"]] = score
+
+        for job_data, match in openai_matches:
+            match["openai_score"] = stored_scores[job_data["content_hash"]]
+            match["final_score"] = get_final_score(match, match["openai_score"])
+
+        return [
+            {
+                **{field: job_data.get(field) for field in job_fields},
+                "bucket": match["bucket"],
+                "bucket_score": match["bucket_score"],
+                "rule_based_score": match["rule_based_score"],
+                "openai_score": match["openai_score"],
+                "final_score": match["final_score"],
+            }
+            for job_data, match in matches
+        ]
+
+
+class MatchingRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health        the service is up, and how many jobs it holds
+    GET  /jobs          the jobs résumés are matched against
+    POST /jobs/reload   reread the jobs from the document store
+    POST /match?top=N   body: a résumé PDF; returns its N best matching jobs
+    """
+
+    service = None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok", "jobs": len(self.service.jobs)})
+        elif path == "/jobs":
+            self.send_json(
+                200,
+                [
+                    {field: job_data.get(field) for field in job_fields}
+                    for job_data in self.service.jobs
+                ],
+            )
+        else:
+            self.send_json(404, {"error": f"Unknown path: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/jobs/reload":
+            self.send_json(200, {"jobs": self.service.reload_jobs()})
+            return
+        if url.path != "/match":
+            self.send_json(404, {"error": f"Unknown path: {url.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self.send_json(400, {"error": "Send the résumé PDF as the request body"})
+            return
+        if length > config.service_max_upload_bytes:
+            self.send_json(413, {"error": "The PDF is too large"})
+            return
+
+        try:
+            top_n = int(parse_qs(url.query).get("top", ["10"])[0])
+        except ValueError:
+            self.send_json(400, {"error": "top must be a number"})
+            return
+
+        pdf_bytes = self.rfile.read(length)
+        if not pdf_bytes.startswith(b"%PDF"):
+            self.send_json(400, {"error": "The request body is not a PDF"})
+            return
+
+        try:
+            self.send_json(200, self.service.match_resume(pdf_bytes, top_n))
+        except Exception as e:
+            print(f"Error matching resume: {e}")
+            self.send_json(500, {"error": str(e)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host=None, port=None):
+    """
+    Runs the matching service until interrupted with Ctrl+C.
+    """
+    MatchingRequestHandler.service = MatchingService()
+    server = ThreadingHTTPServer(
+        (host or config.service_host, port or config.service_port),
+        MatchingRequestHandler,
+    )
+    print(
+        f"Matching service on http://{server.server_address[0]}:"
+        f"{server.server_address[1]} with {len(MatchingRequestHandler.service.jobs)} jobs"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped matching service")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    # The PDF parsing process pool needs this in frozen builds
+    multiprocessing.freeze_support()
+    serve()
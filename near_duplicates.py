@@ -0,0 +1,122 @@
+import config
+import numpy as np
+import zlib
+
+from document_store import get_document_store
+from lexical_index import tokenize
+
+# Mersenne prime the permutation hashes are taken modulo
+hash_prime = (1 << 31) - 1
+
+# Texts with fewer distinct shingles than this are never treated as near-duplicates
+min_shingles = 20
+
+
+def get_shingles(text, size=5):
+    """
+    Returns the set of overlapping word sequences of the given size in text.
+    In Japanese and other CJK text every character counts as a word, so its
+    shingles are sequences of size characters.
+    """
+    tokens = tokenize(text, cjk_gram_size=1)
+    return {
+        " ".join(tokens[start : start + size])
+        for start in range(len(tokens) - size + 1)
+    }
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures, whose fraction of equal positions estimates the
+    Jaccard similarity of two texts' shingle sets.
+
+    Every signature position is the minimum of one random permutation
+    (a * x + b) mod hash_prime over the text's shingle hashes. The permutations
+    are fixed by the seed, so signatures stay comparable across runs.
+    """
+
+    def __init__(self, num_permutations=128, seed=1):
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, hash_prime, num_permutations, dtype=np.int64)
+        self.b = generator.integers(0, hash_prime, num_permutations, dtype=np.int64)
+
+    def signature(self, text):
+        """
+        Returns the signature of text, or None if text is too short for its
+        similarity to mean anything (e.g. a failed OCR).
+        """
+        shingles = get_shingles(text)
+        if len(shingles) < min_shingles:
+            return None
+
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) % hash_prime for shingle in shingles),
+            dtype=np.int64,
+            count=len(shingles),
+        )
+        # Both factors are below 2^31, so the products fit in 64 bits
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % hash_prime
+        return permuted.min(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures.
+
+    Signatures are cut into bands and every band is hashed to a bucket, so
+    finding the near-duplicates of a text only compares it against the documents
+    sharing at least one bucket with it instead of against every document.
+    """
+
+    def __init__(self, threshold=0.9, num_permutations=128, bands=32):
+        self.threshold = threshold
+        self.rows_per_band = num_permutations // bands
+        self.bands = bands
+        self.hasher = MinHasher(num_permutations)
+        self.buckets = {}
+        self.signatures = {}
+
+    def band_keys(self, signature):
+        return [
+            (band, signature[start : start + self.rows_per_band].tobytes())
+            for band, start in enumerate(
+                range(0, self.bands * self.rows_per_band, self.rows_per_band)
+            )
+        ]
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def find(self, signature):
+        """
+        Returns the (key, estimated similarity) of the most similar indexed
+        document at or above the threshold, or None if there is none.
+        """
+        candidates = {
+            key
+            for band_key in self.band_keys(signature)
+            for key in self.buckets.get(band_key, [])
+        }
+
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = key, similarity
+        return best
+
+
+def open_near_duplicate_index(kind):
+    """
+    Returns a NearDuplicateIndex over the stored documents of a kind, or None
+    if near-duplicate detection is disabled.
+    """
+    if config.near_duplicate_threshold <= 0:
+        return None
+
+    index = NearDuplicateIndex(config.near_duplicate_threshold)
+    for content_hash, signature in get_document_store().iter_minhash_signatures(kind):
+        index.add(content_hash, np.frombuffer(signature, dtype=np.int64))
+    return index
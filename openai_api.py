@@ -1,8 +1,10 @@
+import json
 import os
 from dotenv import load_dotenv
 
 from openai import OpenAI
 from openai._types import NOT_GIVEN
+from progress import progress
 
 load_dotenv()
 openai_api_key = os.environ.get("OPENAI_API_KEY")
@@ -25,9 +27,13 @@ def call_openai_api(
     user_prompt: str,
     model: str = default_model,
     tools: list[dict] = None,
+    tool_choice: str = None,
 ):
     """
     Send PDF text to OpenAI's ChatCompletion endpoint.
+
+    tool_choice names a tool the model must call, instead of letting it answer
+    in plain text.
     """
     client = get_openai_client()
 
@@ -39,6 +45,11 @@ def call_openai_api(
         ],
         temperature=0.0,
         tools=tools or NOT_GIVEN,
+        tool_choice=(
+            {"type": "function", "function": {"name": tool_choice}}
+            if tool_choice
+            else NOT_GIVEN
+        ),
     )
 
     if not completion or not completion.choices or not completion.choices[0]:
@@ -49,5 +60,40 @@ def call_openai_api(
         token_usage = completion.usage.total_tokens
         with open("./openai_usage.log", "a") as log_file:
             log_file.write(f"{token_usage}\n")
+        progress.add_tokens(token_usage)
 
     return completion.choices[0].message if completion.choices[0].message else None
+
+
+def build_strict_tool(name, description, properties):
+    """
+    Builds a function tool in structured-output strict mode, so the model's
+    arguments always match the schema: every property is required and no
+    other property is allowed.
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def get_tool_arguments(answer):
+    """
+    Returns the parsed arguments of the first tool call in an answer, or None.
+    """
+    if not answer or not answer.tool_calls:
+        return None
+    try:
+        return json.loads(answer.tool_calls[0].function.arguments)
+    except (TypeError, json.JSONDecodeError):
+        return None
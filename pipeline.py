@@ -0,0 +1,310 @@
+import collections
+import config
+import os
+import queue
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from document_store import get_content_hash, get_document_store
+from extraction_journal import dedupe_file_paths
+from local_labeler import labeling_stats
+from near_duplicates import open_near_duplicate_index
+from pdf_parser import parse_pdf_to_text
+from process_job_descriptions import (
+    extract_job_description,
+    open_job_description_journal,
+)
+from process_resumes import (
+    copy_near_duplicate_profile,
+    extract_candidate_profile,
+    open_resume_journal,
+)
+from progress import progress
+from score_candidates import prescore_candidate
+
+# Put on a queue once the stage feeding it has finished
+end_of_stream = object()
+
+
+def list_pdf_paths(folder_path):
+    return [
+        os.path.join(folder_path, filename)
+        for filename in os.listdir(folder_path)
+        if filename.lower().endswith(".pdf")
+    ]
+
+
+class StageStats:
+    """
+    Throughput and queue depth of one pipeline stage.
+    """
+
+    def __init__(self, name, input_queue=None):
+        self.name = name
+        self.input_queue = input_queue
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, started_at, failed=False):
+        with self.lock:
+            self.busy_seconds += time.monotonic() - started_at
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def observe_queue(self):
+        if self.input_queue is not None:
+            self.max_queue_depth = max(self.max_queue_depth, self.input_queue.qsize())
+
+    def summary(self):
+        elapsed_minutes = max(time.monotonic() - self.started_at, 1e-6) / 60
+        queue_depth = self.input_queue.qsize() if self.input_queue is not None else 0
+        return (
+            f"{self.name}: {self.completed} done, {self.failed} failed, "
+            f"{self.completed / elapsed_minutes:.1f}/min, busy {self.busy_seconds:.0f}s, "
+            f"queue {queue_depth} (max {self.max_queue_depth})"
+        )
+
+
+class StagedPipeline:
+    """
+    Processes PDFs of one kind as three overlapping stages connected by bounded
+    queues, so CPU-bound parsing and network-bound OpenAI calls run at the same
+    time:
+
+    1. parse: PDF text and OCR on a process pool (config.parse_workers)
+    2. extract: OpenAI extraction on config.llm_concurrency threads
+    3. store: saves each document as soon as it is extracted and, for résumés,
+       stores its matches against the jobs that don't depend on the rest of the
+       pool (see score_candidates.prescore_candidate)
+
+    A full queue blocks the stage feeding it, so no stage runs more than
+    config.pipeline_queue_size documents ahead of the next one.
+
+    Near-duplicates of résumés that are already stored skip the extract stage
+    and reuse the stored résumé's extraction.
+    """
+
+    def __init__(self, kind, pdf_paths, jobs=None):
+        self.kind = kind
+        self.pdf_paths = pdf_paths
+        self.pdf_files = []
+        self.jobs = jobs or []
+        self.document_ids = []
+        # Matches stored by prescoring; 0 means the per-job pass does all the scoring
+        self.prescored_matches = 0
+        # The parse and store stages both read from the store
+        self.store_lock = threading.Lock()
+
+        if kind == "resume":
+            self.journal = open_resume_journal()
+            self.extract = extract_candidate_profile
+            self.duplicate_index = open_near_duplicate_index("resume")
+        else:
+            self.journal = open_job_description_journal()
+            self.extract = extract_job_description
+            self.duplicate_index = None
+
+        self.parsed_queue = queue.Queue(maxsize=config.pipeline_queue_size)
+        self.extracted_queue = queue.Queue(maxsize=config.pipeline_queue_size)
+        self.stats = [
+            StageStats("parse"),
+            StageStats("extract", self.parsed_queue),
+            StageStats("store", self.extracted_queue),
+        ]
+        self.parse_stats, self.extract_stats, self.store_stats = self.stats
+
+    def run(self):
+        """
+        Runs the pipeline to completion and returns the stored document IDs.
+        """
+        # Files are processed where they are, no copy is made
+        self.pdf_files = dedupe_file_paths(self.pdf_paths)
+        labeling_stats.reset()
+        progress.start_stage(
+            "Résumés" if self.kind == "resume" else "Job descriptions",
+            len(self.pdf_files),
+        )
+        stop_reporting = threading.Event()
+        reporter = threading.Thread(
+            target=self.report_progress, args=(stop_reporting,), daemon=True
+        )
+        parser = threading.Thread(target=self.parse_documents)
+        extractors = [
+            threading.Thread(target=self.extract_documents)
+            for _ in range(max(config.llm_concurrency, 1))
+        ]
+        storer = threading.Thread(target=self.store_documents)
+
+        reporter.start()
+        for thread in [parser, *extractors, storer]:
+            thread.start()
+
+        parser.join()
+        for _ in extractors:
+            self.parsed_queue.put(end_of_stream)
+        for thread in extractors:
+            thread.join()
+        self.extracted_queue.put(end_of_stream)
+        storer.join()
+
+        stop_reporting.set()
+        self.print_progress()
+        labeling_stats.report()
+        return self.document_ids
+
+    def parse_documents(self):
+        in_flight = collections.deque()
+        with ProcessPoolExecutor(max_workers=config.parse_workers or None) as executor:
+            for pdf_path, file_hash in self.pdf_files:
+                if progress.is_cancelled():
+                    # PDFs already being parsed still go through the pipeline
+                    print(f"Pipeline ({self.kind}): cancelled, finishing current work")
+                    break
+                with self.store_lock:
+                    completed_result = self.journal.get(file_hash)
+                if completed_result:
+                    print(f"Skipping already processed PDF: {pdf_path}")
+                    self.put(
+                        self.extracted_queue,
+                        ({**completed_result, "filename": pdf_path}, file_hash, None),
+                        self.store_stats,
+                    )
+                    continue
+
+                in_flight.append(
+                    (
+                        pdf_path,
+                        file_hash,
+                        time.monotonic(),
+                        executor.submit(parse_pdf_to_text, pdf_path),
+                    )
+                )
+                if len(in_flight) >= config.pipeline_queue_size:
+                    self.collect_parsed_document(*in_flight.popleft())
+
+            while in_flight:
+                self.collect_parsed_document(*in_flight.popleft())
+
+    def collect_parsed_document(self, pdf_path, file_hash, started_at, future):
+        try:
+            pdf_text = future.result()
+        except Exception as e:
+            print(f"Error parsing {pdf_path}: {e}")
+            progress.record_failure()
+            self.parse_stats.record(started_at, failed=True)
+            progress.advance()
+            return
+
+        self.parse_stats.record(started_at)
+
+        signature = None
+        if self.duplicate_index is not None:
+            signature = self.duplicate_index.hasher.signature(pdf_text)
+        if signature is not None:
+            with self.store_lock:
+                duplicate = self.duplicate_index.find(signature)
+                result = duplicate and copy_near_duplicate_profile(
+                    pdf_path, pdf_text, duplicate, {}
+                )
+            if result:
+                self.journal.record(file_hash, result)
+                self.put(
+                    self.extracted_queue, (result, file_hash, None), self.store_stats
+                )
+                return
+
+        self.put(
+            self.parsed_queue,
+            (pdf_path, file_hash, pdf_text, signature),
+            self.extract_stats,
+        )
+
+    def extract_documents(self):
+        while True:
+            item = self.parsed_queue.get()
+            if item is end_of_stream:
+                return
+
+            pdf_path, file_hash, pdf_text, signature = item
+            if progress.is_cancelled():
+                # Parsed but not extracted yet, so the next run picks it up
+                continue
+            print(f"Processing PDF: {pdf_path}")
+            started_at = time.monotonic()
+            try:
+                result = self.extract(pdf_path, pdf_text)
+            except Exception as e:
+                print(f"Error calling OpenAI API for {pdf_path}: {e}")
+                progress.record_failure()
+                self.extract_stats.record(started_at, failed=True)
+                progress.advance()
+                continue
+
+            self.journal.record(file_hash, result)
+            self.extract_stats.record(started_at)
+            self.put(
+                self.extracted_queue, (result, file_hash, signature), self.store_stats
+            )
+
+    def store_documents(self):
+        store = get_document_store()
+        while True:
+            item = self.extracted_queue.get()
+            if item is end_of_stream:
+                return
+
+            result, file_hash, signature = item
+            started_at = time.monotonic()
+            try:
+                with self.store_lock:
+                    document_id = store.add_documents(self.kind, [result])[0]
+                    self.journal.commit({file_hash: document_id})
+                    self.document_ids.append(document_id)
+                    if self.kind == "resume":
+                        progress.add_resume_ids([document_id])
+                    if signature is not None:
+                        # Later résumés in this run can now reuse this one's extraction
+                        content_hash = get_content_hash(result.get("resume_text"))
+                        store.save_minhash_signatures(
+                            {content_hash: signature.tobytes()}
+                        )
+                        self.duplicate_index.add(content_hash, signature)
+                    if self.kind == "resume" and self.jobs:
+                        candidate_data = store.load_documents(
+                            "resume", [document_id], include_text=False
+                        )[0]
+                        self.prescored_matches += prescore_candidate(
+                            candidate_data, self.jobs
+                        )
+            except Exception as e:
+                print(f"Error storing {result.get('filename')}: {e}")
+                progress.record_failure()
+                self.store_stats.record(started_at, failed=True)
+                progress.advance()
+                continue
+
+            self.store_stats.record(started_at)
+            progress.advance()
+
+    def put(self, target_queue, item, stats):
+        # Blocks while the queue is full, which is what applies backpressure
+        target_queue.put(item)
+        stats.observe_queue()
+
+    def report_progress(self, stop_reporting):
+        while not stop_reporting.wait(config.pipeline_report_interval):
+            self.print_progress()
+
+    def print_progress(self):
+        print(f"Pipeline ({self.kind}, {len(self.pdf_paths)} PDFs)")
+        for stats in self.stats:
+            print(f"  {stats.summary()}")
+        if self.kind == "resume" and self.jobs:
+            print(f"  prescore: {self.prescored_matches} matches stored")
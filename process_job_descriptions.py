@@ -1,170 +1,170 @@
-import json
+import config
 import os
 from datetime import datetime
-import csv
 
-from openai_api import call_openai_api
-from openai.types.chat import ChatCompletionToolParam
+from chunked_extraction import extract_in_chunks, merge_known_fields
+from document_store import get_document_store
+from extraction_journal import ExtractionJournal, dedupe_file_paths
+from local_labeler import get_grid_labels, labeling_stats
+from openai_api import build_strict_tool, call_openai_api, get_tool_arguments
 from pdf_parser import parse_pdf_to_text
+from progress import progress
+from taxonomy import language_levels
 
 
-def process_job_descriptions(folder_path):
+def process_job_descriptions(pdf_paths):
     """
-    1. Iterates over all PDFs in a folder.
+    1. Iterates over the PDFs at pdf_paths, skipping duplicates and PDFs
+       already extracted before any parsing.
     2. Extracts text from each PDF.
     3. Sends text to OpenAI API.
-    4. Writes candidate profiles to a CSV file.
+    4. Saves the results to the document store and returns their document IDs.
     """
+    # Extracted job descriptions, and the file hash of each
     job_descriptions = []
+    job_description_file_hashes = []
+    labeling_stats.reset()
+
+    # Completed extractions from earlier or interrupted runs
+    journal = open_job_description_journal()
+
+    # Files are processed where they are, no copy is made
+    pdf_files = dedupe_file_paths(pdf_paths)
+    for pdf_path, file_hash in progress.track("Job descriptions", pdf_files):
+        completed_job_description = journal.get(file_hash)
+        if completed_job_description:
+            print(f"Skipping already processed PDF: {pdf_path}")
+            job_descriptions.append({**completed_job_description, "filename": pdf_path})
+            job_description_file_hashes.append(file_hash)
+            continue
+
+        print(f"Processing PDF: {pdf_path}")
+
+        pdf_text = parse_pdf_to_text(pdf_path)
+
+        try:
+            job_description = extract_job_description(pdf_path, pdf_text)
+            job_descriptions.append(job_description)
+            job_description_file_hashes.append(file_hash)
+            journal.record(file_hash, job_description)
+        except Exception as e:
+            print(f"Error calling OpenAI API for {pdf_path}: {e}")
+            progress.record_failure()
+
+    document_ids = get_document_store().add_documents(
+        "job_description", job_descriptions
+    )
+    journal.commit(dict(zip(job_description_file_hashes, document_ids)))
 
-    for filename in os.listdir(folder_path):
-        if filename.lower().endswith(".pdf"):
-            pdf_path = os.path.join(folder_path, filename)
-            print(f"Processing PDF: {pdf_path}")
-
-            pdf_text = parse_pdf_to_text(pdf_path)
-
-            # If PDF text is too large, you may need to chunk it.
-            # For simplicity, we're sending it all at once here.
-            try:
-                job_description = {"filename": pdf_path}
+    if config.export_processed_csv and document_ids:
+        # Create output directory if it doesn't exist
+        output_dir = config.output_dir
+        os.makedirs(output_dir, exist_ok=True)
 
-                general_info = extract_job_general_info(pdf_text)
-                compensation_range = determine_compensation_range(
-                    general_info.get("job_level")
-                )
-                industry_labels = generate_industry_labels(pdf_text)
-                function_labels = generate_function_labels(pdf_text)
+        # Generate timestamp filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(output_dir, f"job_descriptions_{timestamp}.csv")
+        get_document_store().export_csv("job_description", document_ids, output_file)
 
-                job_description.update(
-                    {
-                        **general_info,
-                        **compensation_range,
-                        **industry_labels,
-                        **function_labels,
-                        "job_description_text": pdf_text,
-                    }
-                )
-                job_descriptions.append(job_description)
-            except Exception as e:
-                print(f"Error calling OpenAI API for {filename}: {e}")
+    labeling_stats.report()
+    return document_ids
 
-    # Create output directory if it doesn't exist
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
 
-    # Generate timestamp filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = os.path.join(output_dir, f"job_descriptions_{timestamp}.csv")
+def open_job_description_journal():
+    return ExtractionJournal(
+        os.path.join(config.extraction_journal_dir, "job_descriptions.jsonl"),
+        "job_description",
+    )
 
-    # Write job_descriptions to CSV file
-    if job_descriptions:
-        # Get all unique keys from all dictionaries
-        fieldnames = set()
-        for job in job_descriptions:
-            fieldnames.update(job.keys())
 
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=sorted(fieldnames))
-            writer.writeheader()
-            writer.writerows(job_descriptions)
+def extract_job_description(pdf_path, pdf_text):
+    """
+    Runs every extraction for one job description and returns its data.
+    """
+    # Documents over the extraction token budget are extracted chunk by chunk
+    job_description = {"filename": pdf_path}
 
-    return output_file
+    general_info = extract_in_chunks(
+        pdf_text, extract_job_general_info, merge_known_fields
+    )
+    compensation_range = determine_compensation_range(general_info.get("job_level"))
+    industry_labels = get_grid_labels("industry", pdf_text, "job_description")
+    function_labels = get_grid_labels("function", pdf_text, "job_description")
+
+    job_description.update(
+        {
+            **general_info,
+            **compensation_range,
+            **industry_labels,
+            **function_labels,
+            "job_description_text": pdf_text,
+        }
+    )
+    return job_description
 
 
 def extract_job_general_info(pdf_text):
-    submit_job_general_info_tool: ChatCompletionToolParam = {
-        "type": "function",
-        "function": {
-            "name": "submit_job_general_info",
-            "description": "Submit job's general information",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "company": {
-                        "type": "string",
-                        "description": "The name of the company",
-                    },
-                    "position": {
-                        "type": "string",
-                        "description": "The position of the job description",
-                    },
-                    "country": {
-                        "type": "string",
-                        "description": "The country of the job description",
-                    },
-                    "city": {
-                        "type": "string",
-                        "description": "The city of the job description",
-                    },
-                    "job_level": {
-                        "type": "number",
-                        "enum": [4, 5, 6, 7, 8, 9, 10, 11, 12],
-                        "description": "The level of the job description",
-                    },
-                    "company_size": {
-                        "type": "string",
-                        "enum": ["0-10", "10-50", "50-100", "100+"],
-                        "description": "The company's size",
-                    },
-                    "company_hq_location": {
-                        "type": "string",
-                        "enum": ["Japan", "Global"],
-                        "description": "The company's headquarters location",
-                    },
-                    "employee_count_in_japan": {
-                        "type": "string",
-                        "enum": [
-                            "0-10",
-                            "10-50",
-                            "50-100",
-                            "100+",
-                        ],
-                        "description": "The company's size",
-                    },
-                    "english_level_required": {
-                        "type": "string",
-                        "enum": [
-                            "Native",
-                            "Fluent",
-                            "Business",
-                            "Reading/Writing",
-                            "None",
-                        ],
-                        "description": "The English level required for the job description",
-                    },
-                    "japanese_level_required": {
-                        "type": "string",
-                        "enum": [
-                            "Native",
-                            "Fluent",
-                            "Business",
-                            "Reading/Writing",
-                            "None",
-                        ],
-                        "description": "The Japanese level required for the job description",
-                    },
-                    "target_age": {
-                        "type": "number",
-                        "description": "The target age for the job description",
-                    },
-                },
-                "required": [
-                    "company",
-                    "position",
-                    "country",
-                    "city",
-                    "job_level",
-                    "company_size",
-                    "company_hq_location",
-                    "employee_count_in_japan",
-                    "english_level_required",
-                    "japanese_level_required",
-                    "target_age",
+    submit_job_general_info_tool = build_strict_tool(
+        "submit_job_general_info",
+        "Submit job's general information",
+        {
+            "company": {
+                "type": "string",
+                "description": "The name of the company",
+            },
+            "position": {
+                "type": "string",
+                "description": "The position of the job description",
+            },
+            "country": {
+                "type": "string",
+                "description": "The country of the job description",
+            },
+            "city": {
+                "type": "string",
+                "description": "The city of the job description",
+            },
+            "job_level": {
+                "type": "number",
+                "enum": [4, 5, 6, 7, 8, 9, 10, 11, 12],
+                "description": "The level of the job description",
+            },
+            "company_size": {
+                "type": "string",
+                "enum": ["0-10", "10-50", "50-100", "100+"],
+                "description": "The company's size",
+            },
+            "company_hq_location": {
+                "type": "string",
+                "enum": ["Japan", "Global"],
+                "description": "The company's headquarters location",
+            },
+            "employee_count_in_japan": {
+                "type": "string",
+                "enum": [
+                    "0-10",
+                    "10-50",
+                    "50-100",
+                    "100+",
                 ],
+                "description": "The company's size",
+            },
+            "english_level_required": {
+                "type": "string",
+                "enum": language_levels,
+                "description": "The English level required for the job description",
+            },
+            "japanese_level_required": {
+                "type": "string",
+                "enum": language_levels,
+                "description": "The Japanese level required for the job description",
+            },
+            "target_age": {
+                "type": "number",
+                "description": "The target age for the job description",
             },
         },
-    }
+    )
 
     system_prompt = """
 You are a helpful assistant extracting job information from a job description.
@@ -203,143 +203,9 @@ Return your final result by calling the function 'submit_job_general_info' with
         system_prompt=system_prompt,
         user_prompt=pdf_text,
         tools=[submit_job_general_info_tool],
+        tool_choice="submit_job_general_info",
     )
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
-
-
-def generate_industry_labels(pdf_text):
-    submit_job_industry_labels_tool = {
-        "type": "function",
-        "function": {
-            "name": "submit_job_industry_labels",
-            "description": "Submit job's industry labels",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "I1": {
-                        "type": "string",
-                        "description": "The industry label for I1",
-                    },
-                    "I2": {
-                        "type": "string",
-                        "description": "The industry label for I2",
-                    },
-                    "I3": {
-                        "type": "string",
-                        "description": "The industry label for I3",
-                    },
-                    "I4": {
-                        "type": "string",
-                        "description": "The industry label for I4",
-                    },
-                },
-                "required": ["I1", "I2", "I3", "I4"],
-            },
-        },
-    }
-
-    system_prompt = """
-You are a helpful assistant evaluating information from a job description.
-Use the function 'submit_job_industry_labels' to provide the candidate's:
-Reference the following Industry grid and select the best fit option.
-Select one at a time starting from I1, then selecting one of the options from I2, then from I3. I4 is free space for GPT to tag English keywords for better sorting.
-You cannot change rows. For example,anyone in I2 Cloud must be in SaaS, XaaS, Security, or Consulting for I3.
-I1: Digital; I2: Cloud; I3: SaaS, XaaS, Security, Consulting; I4: Sales, Marketing, Analytics, Network, Security Eng, Design, HR, Finance, Cloud Compute, AI, Data Other[Propose]
-I1: Digital; I2: Platform; I3: e-commerce, Marketplace, AdTech, Subscription, Gaming, FinTech, Web3; I4:Food Delivery, Logistics, EdTech, TravelTech,  Social Media, Chatapps, Payments, Insurtech, Exchange, Blockchain
-I1: Physical; I2: Robotics; I3: Mobility, Space, VR&AR, Smart Cities, Robots, 3D Printing; I4: Autonomus Driving/Robots/Satellites/Launch
-I1: Physical; I2: Semicon; I3: Telco, Data CenterChip Design, Fabrication, Quantum; I4: Licensing, inhouse
-I1: Physical; I2: Energy; I3: Solar, Nuclear, Hydrogen, Batteries, Charging; I4: Materials
-I1: Consulting; I2: Strategy; I3: Strategy, Management; I4: MBB, Big Consutling, Other
-I1: Consulting; I2: Corporate; I3: HR, Accounting, Marketing, Research;
-"""
-
-    answer = call_openai_api(
-        system_prompt=system_prompt,
-        user_prompt=pdf_text,
-        tools=[submit_job_industry_labels_tool],
-    )
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
-
-
-def generate_function_labels(pdf_text):
-    submit_job_function_labels_tool = {
-        "type": "function",
-        "function": {
-            "name": "submit_job_function_labels",
-            "description": "Submit job's function labels",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "F1": {
-                        "type": "string",
-                        "description": "The function label for F1",
-                    },
-                    "F2": {
-                        "type": "string",
-                        "description": "The function label for F2",
-                    },
-                    "F3": {
-                        "type": "string",
-                        "description": "The function label for F3",
-                    },
-                    "F4": {
-                        "type": "string",
-                        "description": "The function label for F4",
-                    },
-                },
-                "required": ["F1", "F2", "F3", "F4"],
-            },
-        },
-    }
-
-    system_prompt = """
-You are a helpful assistant evaluating candidate information from a resume.
-Use the function 'submit_job_function_labels' to provide the candidate's:
-Reference the following Function grid and select the best fit option.
-Select one at a time starting from F1, then selecting one of the options from F2, then from F3. F4 is free space for GPT to tag English keywords for better sorting.
-You cannot change rows. For example,anyone in F2 Sales must be in AE, BDM, CSM, Inside Sales, SE, Partner, Consultant, Other for F3.
-F1: GTM; F2: Sales; F3: AE, BDM, CSM, Inside Sales, SE, Partner, Consultant, Other
-F1: GTM; F2: Marketing; F3: Digital, Field, Community, PR, Comms, Growth, Social, Content
-F1: GTM; F2: Consulting/PS; F3: Delivery, Implementation, Customer Success, TAM, Pre-sales
-F1: GTM; F2: Operations; F3: Strategy, CS, Analytics, Product, Project, Procurement, Supply Chain
-F1: Corporate; F2: Finance & Accounting; F3: FP&A, Compensation, M&A
-F1: Corporate; F2: HR & Admin; F3: HRBP, Recruiting, Office Manager, Onboarding, Training
-F1: Corporate; F2: Legal & Compliance; F3: Legal, Compilance, GR, Policy
-F1: Corporate; F2: Internal IT; F3: IT Support, Onboarding
-F1: Product & Eng; F2: Computer Science; F3: Product, UX, SWE, QA, DevOps
-F1: Product & Eng; F2: Physics; F3: Electrical, Mechanical, Embedded etc.
-"""
-
-    answer = call_openai_api(
-        system_prompt=system_prompt,
-        user_prompt=pdf_text,
-        tools=[submit_job_function_labels_tool],
-    )
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
+    return get_tool_arguments(answer)
 
 
 def determine_compensation_range(job_level):
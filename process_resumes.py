@@ -1,159 +1,235 @@
-import json
+import config
 import os
-import csv
 
+from chunked_extraction import extract_in_chunks, merge_known_fields
 from datetime import datetime
-from openai_api import call_openai_api
-from openai.types.chat import ChatCompletionToolParam
+from document_store import get_content_hash, get_document_store
+from extraction_journal import ExtractionJournal, dedupe_file_paths
+from local_labeler import get_grid_labels, labeling_stats
+from near_duplicates import open_near_duplicate_index
+from openai_api import build_strict_tool, call_openai_api, get_tool_arguments
 from pdf_parser import parse_pdf_to_text
+from progress import progress
+from taxonomy import language_levels
 
 
-def process_resumes(folder_path):
+def process_resumes(pdf_paths):
     """
-    1. Iterates over all PDFs in a folder.
+    1. Iterates over the PDFs at pdf_paths, skipping duplicates and PDFs
+       already extracted before any parsing.
     2. Extracts text from each PDF.
     3. Sends text to OpenAI API.
-    4. Writes candidate profiles to a CSV file.
+    4. Saves the results to the document store and returns their document IDs.
     """
-    # Initialize list to store all resumes
+    # Initialize list to store all resumes, and the file hash of each
     candidate_profiles = []
-
-    for filename in os.listdir(folder_path):
-        if filename.lower().endswith(".pdf"):
-            pdf_path = os.path.join(folder_path, filename)
-            print(f"Processing PDF: {pdf_path}")
-
-            pdf_text = parse_pdf_to_text(pdf_path)
-
-            # If PDF text is too large, you may need to chunk it.
-            # For simplicity, we're sending it all at once here.
-            try:
-                candidate_profile = {"filename": pdf_path}
-
-                general_info = extract_general_info(pdf_text)
-                industry_labels = generate_industry_labels(pdf_text)
-                function_labels = generate_function_labels(pdf_text)
-
-                candidate_profile.update(
-                    {
-                        **general_info,
-                        **industry_labels,
-                        **function_labels,
-                        "resume_text": pdf_text,
-                    }
-                )
+    profile_file_hashes = []
+    labeling_stats.reset()
+
+    # Completed extractions from earlier or interrupted runs
+    journal = open_resume_journal()
+
+    # Résumés already processed, to spot re-uploads and updated copies of them
+    duplicate_index = open_near_duplicate_index("resume")
+    processed_profiles = {}
+    new_signatures = {}
+
+    # Files are processed where they are, no copy is made
+    pdf_files = dedupe_file_paths(pdf_paths)
+    for pdf_path, file_hash in progress.track("Résumés", pdf_files):
+        completed_candidate_profile = journal.get(file_hash)
+        if completed_candidate_profile:
+            print(f"Skipping already processed PDF: {pdf_path}")
+            candidate_profiles.append(
+                {**completed_candidate_profile, "filename": pdf_path}
+            )
+            profile_file_hashes.append(file_hash)
+            continue
+
+        print(f"Processing PDF: {pdf_path}")
+
+        pdf_text = parse_pdf_to_text(pdf_path)
+        content_hash = get_content_hash(pdf_text)
+
+        signature = None
+        if duplicate_index is not None:
+            signature = duplicate_index.hasher.signature(pdf_text)
+        if signature is not None:
+            duplicate = duplicate_index.find(signature)
+            candidate_profile = duplicate and copy_near_duplicate_profile(
+                pdf_path, pdf_text, duplicate, processed_profiles
+            )
+            if candidate_profile:
                 candidate_profiles.append(candidate_profile)
-            except Exception as e:
-                print(f"Error calling OpenAI API for {filename}: {e}")
-
-    # Create output directory if it doesn't exist
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
+                profile_file_hashes.append(file_hash)
+                journal.record(file_hash, candidate_profile)
+                continue
+
+        try:
+            candidate_profile = extract_candidate_profile(pdf_path, pdf_text)
+            candidate_profiles.append(candidate_profile)
+            profile_file_hashes.append(file_hash)
+            journal.record(file_hash, candidate_profile)
+        except Exception as e:
+            print(f"Error calling OpenAI API for {pdf_path}: {e}")
+            progress.record_failure()
+            continue
+
+        processed_profiles[content_hash] = candidate_profile
+        if signature is not None:
+            duplicate_index.add(content_hash, signature)
+            new_signatures[content_hash] = signature.tobytes()
+
+    document_ids = get_document_store().add_documents("resume", candidate_profiles)
+    get_document_store().save_minhash_signatures(new_signatures)
+    journal.commit(dict(zip(profile_file_hashes, document_ids)))
+
+    if config.export_processed_csv and document_ids:
+        # Create output directory if it doesn't exist
+        output_dir = config.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Generate timestamp filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(output_dir, f"resumes_{timestamp}.csv")
+        get_document_store().export_csv("resume", document_ids, output_file)
+
+    labeling_stats.report()
+    return document_ids
+
+
+def open_resume_journal():
+    return ExtractionJournal(
+        os.path.join(config.extraction_journal_dir, "resumes.jsonl"), "resume"
+    )
 
-    # Generate timestamp filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = os.path.join(output_dir, f"resumes_{timestamp}.csv")
 
-    # Write candidate_profiles to CSV file
-    if candidate_profiles:
-        # Get all unique keys from all dictionaries
-        fieldnames = set()
-        for profile in candidate_profiles:
-            fieldnames.update(profile.keys())
+def copy_near_duplicate_profile(pdf_path, pdf_text, duplicate, processed_profiles):
+    """
+    Copies the candidate profile of the résumé that pdf_text nearly duplicates,
+    instead of extracting it again. The copy links to the canonical résumé
+    through duplicate_of, so it also reuses the canonical résumé's scores.
+
+    Args:
+        pdf_path (str): Path of the duplicate PDF.
+        pdf_text (str): Text of the duplicate PDF.
+        duplicate (tuple): Content hash and estimated similarity of the canonical résumé.
+        processed_profiles (dict): Profiles extracted in this run, by content hash.
+
+    Returns:
+        dict: The copied candidate profile, or None if the canonical résumé is gone.
+    """
+    canonical_hash, similarity = duplicate
+    canonical_profile = processed_profiles.get(canonical_hash)
+    if canonical_profile is None:
+        store = get_document_store()
+        document_id = store.find_document_id("resume", canonical_hash)
+        if document_id is None:
+            return None
+        canonical_profile = store.load_documents(
+            "resume", [document_id], include_text=False
+        )[0]
+
+    print(f"Reusing extraction of a {similarity:.0%} similar resume for: {pdf_path}")
+    candidate_profile = {
+        key: value
+        for key, value in canonical_profile.items()
+        if key not in ("document_id", "content_hash", "resume_text")
+    }
+    candidate_profile.update({"filename": pdf_path, "resume_text": pdf_text})
+    if get_content_hash(pdf_text) != canonical_hash:
+        candidate_profile["duplicate_of"] = canonical_hash
+    return candidate_profile
 
-        with open(output_file, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=sorted(fieldnames))
-            writer.writeheader()
-            writer.writerows(candidate_profiles)
 
-    return output_file
+def extract_candidate_profile(pdf_path, pdf_text):
+    """
+    Runs every extraction for one résumé and returns its candidate profile.
+    """
+    # Documents over the extraction token budget are extracted chunk by chunk
+    candidate_profile = {"filename": pdf_path}
+
+    general_info = extract_in_chunks(pdf_text, extract_general_info, merge_known_fields)
+    industry_labels = get_grid_labels("industry", pdf_text, "resume")
+    function_labels = get_grid_labels("function", pdf_text, "resume")
+
+    candidate_profile.update(
+        {
+            **general_info,
+            **industry_labels,
+            **function_labels,
+            "resume_text": pdf_text,
+        }
+    )
+    return candidate_profile
 
 
 def extract_general_info(pdf_text):
-    submit_general_info_tool: ChatCompletionToolParam = {
-        "type": "function",
-        "function": {
-            "name": "submit_general_info",
-            "description": "Submit candidate's general information",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {
-                        "type": "string",
-                        "description": "The name of the candidate",
-                    },
-                    "current_company": {
-                        "type": "string",
-                        "description": "The current company of the candidate",
-                    },
-                    "current_position": {
-                        "type": "string",
-                        "description": "The current position of the candidate",
-                    },
-                    "previous_company_1": {
-                        "type": "string",
-                        "description": "The first previous company of the candidate",
-                    },
-                    "previous_position_1": {
-                        "type": "string",
-                        "description": "The first previous position of the candidate",
-                    },
-                    "previous_company_2": {
-                        "type": "string",
-                        "description": "The second previous company of the candidate",
-                    },
-                    "previous_position_2": {
-                        "type": "string",
-                        "description": "The second previous position of the candidate",
-                    },
-                    "country": {
-                        "type": "string",
-                        "description": "The country of the candidate",
-                    },
-                    "city": {
-                        "type": "string",
-                        "description": "The city of the candidate",
-                    },
-                    "age": {
-                        "type": "string",
-                        "description": "The age of the candidate",
-                    },
-                    "gender": {
-                        "type": "string",
-                        "description": "The gender of the candidate",
-                    },
-                    "japanese_level": {
-                        "type": "string",
-                        "description": "The Japanese level of the candidate",
-                    },
-                    "english_level": {
-                        "type": "string",
-                        "description": "The English level of the candidate",
-                    },
-                    "other_languages": {
-                        "type": "string",
-                        "description": "The other languages of the candidate",
-                    },
-                },
-                "required": [
-                    "name",
-                    "current_company",
-                    "current_position",
-                    "previous_company_1",
-                    "previous_position_1",
-                    "previous_company_2",
-                    "previous_position_2",
-                    "country",
-                    "city",
-                    "age",
-                    "gender",
-                    "japanese_level",
-                    "english_level",
-                    "other_languages",
-                ],
+    submit_general_info_tool = build_strict_tool(
+        "submit_general_info",
+        "Submit candidate's general information",
+        {
+            "name": {
+                "type": "string",
+                "description": "The name of the candidate",
+            },
+            "current_company": {
+                "type": "string",
+                "description": "The current company of the candidate",
+            },
+            "current_position": {
+                "type": "string",
+                "description": "The current position of the candidate",
+            },
+            "previous_company_1": {
+                "type": "string",
+                "description": "The first previous company of the candidate",
+            },
+            "previous_position_1": {
+                "type": "string",
+                "description": "The first previous position of the candidate",
+            },
+            "previous_company_2": {
+                "type": "string",
+                "description": "The second previous company of the candidate",
+            },
+            "previous_position_2": {
+                "type": "string",
+                "description": "The second previous position of the candidate",
+            },
+            "country": {
+                "type": "string",
+                "description": "The country of the candidate",
+            },
+            "city": {
+                "type": "string",
+                "description": "The city of the candidate",
+            },
+            "age": {
+                "type": "string",
+                "description": "The age of the candidate",
+            },
+            "gender": {
+                "type": "string",
+                "enum": ["Male", "Female", "Unknown"],
+                "description": "The gender of the candidate",
+            },
+            "japanese_level": {
+                "type": "string",
+                "enum": [*language_levels, "Unknown"],
+                "description": "The Japanese level of the candidate",
+            },
+            "english_level": {
+                "type": "string",
+                "enum": [*language_levels, "Unknown"],
+                "description": "The English level of the candidate",
+            },
+            "other_languages": {
+                "type": "string",
+                "description": "The other languages of the candidate",
             },
         },
-    }
+    )
 
     system_prompt = f"""
 You are a helpful assistant specialized in extracting candidate information from a resume.
@@ -199,138 +275,12 @@ Instructions:
 - Do not provide any extra text or explanation. 
 - Fill in every argument (never leave any argument out).
 - If multiple possibilities exist, choose the most likely.
-"""
-
-    answer = call_openai_api(system_prompt, pdf_text, tools=[submit_general_info_tool])
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
-
-
-def generate_industry_labels(pdf_text):
-    submit_candidate_industry_labels_tool = {
-        "type": "function",
-        "function": {
-            "name": "submit_position_industry_labels",
-            "description": "Submit industry labels for the candidate",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "I1": {
-                        "type": "string",
-                        "description": "The industry label for I1",
-                    },
-                    "I2": {
-                        "type": "string",
-                        "description": "The industry label for I2",
-                    },
-                    "I3": {
-                        "type": "string",
-                        "description": "The industry label for I3",
-                    },
-                    "I4": {
-                        "type": "string",
-                        "description": "The industry label for I4",
-                    },
-                },
-                "required": ["I1", "I2", "I3", "I4"],
-            },
-        },
-    }
-
-    system_prompt = """
-You are a helpful assistant evaluating candidate information from a resume.
-Use the function 'submit_candidate_industry_labels' to provide the candidate's:
-Reference the following Industry grid and select the best fit option.
-Select one at a time starting from I1, then selecting one of the options from I2, then from I3. I4 is free space for GPT to tag English keywords for better sorting.
-You cannot change rows. For example, anyone in I2 Cloud must be in SaaS, XaaS, Security, or Consulting for I3.
-I1: Digital; I2: Cloud; I3: SaaS, XaaS, Security, Consulting; I4: Sales, Marketing, Analytics, Network, Security Eng, Design, HR, Finance, Cloud Compute, AI, Data Other[Propose]
-I1: Digital; I2: Platform; I3: e-commerce, Marketplace, AdTech, Subscription, Gaming, FinTech, Web3; I4:Food Delivery, Logistics, EdTech, TravelTech,  Social Media, Chatapps, Payments, Insurtech, Exchange, Blockchain
-I1: Physical; I2: Robotics; I3: Mobility, Space, VR&AR, Smart Cities, Robots, 3D Printing; I4: Autonomus Driving/Robots/Satellites/Launch
-I1: Physical; I2: Semicon; I3: Telco, Data CenterChip Design, Fabrication, Quantum; I4: Licensing, inhouse
-I1: Physical; I2: Energy; I3: Solar, Nuclear, Hydrogen, Batteries, Charging; I4: Materials
-I1: Consulting; I2: Strategy; I3: Strategy, Management; I4: MBB, Big Consutling, Other
-I1: Consulting; I2: Corporate; I3: HR, Accounting, Marketing, Research;"
-"""
-
-    answer = call_openai_api(
-        system_prompt, pdf_text, tools=[submit_candidate_industry_labels_tool]
-    )
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
-
-
-def generate_function_labels(pdf_text):
-    submit_candidate_function_labels_tool = {
-        "type": "function",
-        "function": {
-            "name": "submit_candidate_function_labels",
-            "description": "Submit function labels for the candidate",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "F1": {
-                        "type": "string",
-                        "description": "The function label for F1",
-                    },
-                    "F2": {
-                        "type": "string",
-                        "description": "The function label for F2",
-                    },
-                    "F3": {
-                        "type": "string",
-                        "description": "The function label for F3",
-                    },
-                    "F4": {
-                        "type": "string",
-                        "description": "The function label for F4",
-                    },
-                },
-                "required": ["F1", "F2", "F3", "F4"],
-            },
-        },
-    }
-
-    system_prompt = """
-You are a helpful assistant evaluating candidate information from a resume.
-Use the function 'submit_candidate_function_labels' to provide the candidate's:
-Reference the following Function grid and select the best fit option.
-Select one at a time starting from F1, then selecting one of the options from F2, then from F3. F4 is free space for GPT to tag English keywords for better sorting.
-You cannot change rows. For example, anyone in F2 Sales must be in AE, BDM, CSM, Inside Sales, SE, Partner, Consultant, Other for F3.\n
-F1: GTM; F2: Sales; F3: AE, BDM, CSM, Inside Sales, SE, Partner, Consultant, Other
-F1: GTM; F2: Marketing; F3: Digital, Field, Community, PR, Comms, Growth, Social, Content
-F1: GTM; F2: Consulting/PS; F3: Delivery, Implementation, Customer Success, TAM, Pre-sales
-F1: GTM; F2: Operations; F3: Strategy, CS, Analytics, Product, Project, Procurement, Supply Chain
-F1: Corporate; F2: Finance & Accounting; F3: FP&A, Compensation, M&A
-F1: Corporate; F2: HR & Admin; F3: HRBP, Recruiting, Office Manager, Onboarding, Training
-F1: Corporate; F2: Legal & Compliance; F3: Legal, Compilance, GR, Policy
-F1: Corporate; F2: Internal IT; F3: IT Support, Onboarding
-F1: Product & Eng; F2: Computer Science; F3: Product, UX, SWE, QA, DevOps
-F1: Product & Eng; F2: Physics; F3: Electrical, Mechanical, Embedded etc.
 """
 
     answer = call_openai_api(
-        system_prompt, pdf_text, tools=[submit_candidate_function_labels_tool]
+        system_prompt,
+        pdf_text,
+        tools=[submit_general_info_tool],
+        tool_choice="submit_general_info",
     )
-
-    if (
-        not answer
-        or not answer.tool_calls
-        or not answer.tool_calls[0].function.arguments
-    ):
-        return None
-
-    return json.loads(answer.tool_calls[0].function.arguments)
+    return get_tool_arguments(answer)
@@ -0,0 +1,73 @@
+import config
+
+from document_store import get_document_store
+from pipeline import StagedPipeline, list_pdf_paths
+from process_resumes import process_resumes
+from process_job_descriptions import process_job_descriptions
+from progress import progress
+from score_candidates import open_resume_index, score_candidates
+
+folder_containing_resumes = "./resumes"
+folder_containing_job_descriptions = "./job_descriptions"
+
+
+def start_processing(resume_paths=None, job_description_paths=None):
+    """
+    Processes résumés and job descriptions and scores every candidate against
+    every job. The PDFs are read where they are; without paths, every PDF in
+    the default folders is processed.
+
+    Returns:
+        bool: Whether every job was scored, False if there was nothing to
+        score or the run was cancelled.
+    """
+    if resume_paths is None:
+        resume_paths = list_pdf_paths(folder_containing_resumes)
+    if job_description_paths is None:
+        job_description_paths = list_pdf_paths(folder_containing_job_descriptions)
+
+    if config.use_staged_pipeline:
+        return start_staged_processing(resume_paths, job_description_paths)
+
+    resume_ids = process_resumes(resume_paths)
+    if not resume_ids:
+        print("No resumes processed")
+        return False
+    progress.add_resume_ids(resume_ids)
+    job_description_ids = process_job_descriptions(job_description_paths)
+    if not job_description_ids:
+        print("No job descriptions processed")
+        return False
+
+    # Iterate through each job description
+    jobs = get_document_store().load_documents("job_description", job_description_ids)
+    return score_jobs(jobs, resume_ids)
+
+
+def start_staged_processing(resume_paths, job_description_paths):
+    # Job descriptions go first so each résumé can be scored as soon as it is stored
+    job_description_ids = StagedPipeline("job_description", job_description_paths).run()
+    if not job_description_ids:
+        print("No job descriptions processed")
+        return False
+
+    jobs = get_document_store().load_documents("job_description", job_description_ids)
+    resume_ids = StagedPipeline("resume", resume_paths, jobs).run()
+    if not resume_ids:
+        print("No resumes processed")
+        return False
+
+    # Prescored candidate-job pairs are reused from the store here
+    return score_jobs(jobs, resume_ids)
+
+
+def score_jobs(jobs, resume_ids):
+    # Built once for the batch's pool and dropped once every job is scored
+    resume_index = open_resume_index(resume_ids)
+    for job_data in jobs:
+        # Whatever was extracted before a cancel is stored, but left unscored
+        if progress.is_cancelled():
+            print("Processing cancelled")
+            return False
+        score_candidates(job_data, resume_ids, resume_index)
+    return True
@@ -0,0 +1,138 @@
+import threading
+import time
+
+
+class ProgressTracker:
+    """
+    Progress of the current processing run, shared by its stages and the UI.
+
+    Stages report each document they finish and each failure, and OpenAI calls
+    report the tokens they spend. A listener, if set, is called with a fresh
+    snapshot() after every change, from whichever thread made it. Cancelling
+    only sets a flag: the stages check it before starting new work, and keep
+    what they finished.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.listener = None
+        self.reset()
+        # Document IDs of the résumés stored by the current run, which the
+        # results window ranks; None until a run starts
+        self.resume_ids = None
+
+    def reset(self):
+        with self.lock:
+            self.stage = None
+            self.stage_total = 0
+            self.stage_done = 0
+            self.stage_started_at = time.monotonic()
+            self.tokens = 0
+            self.failures = 0
+            # A new list, so readers of the previous run's can tell it ended
+            self.resume_ids = []
+        self.cancelled.clear()
+
+    def start_stage(self, stage, total):
+        with self.lock:
+            self.stage = stage
+            self.stage_total = total
+            self.stage_done = 0
+            self.stage_started_at = time.monotonic()
+        self.notify()
+
+    def advance(self, count=1):
+        with self.lock:
+            self.stage_done += count
+        self.notify()
+
+    def add_tokens(self, tokens):
+        with self.lock:
+            self.tokens += tokens
+        self.notify()
+
+    def add_resume_ids(self, document_ids):
+        with self.lock:
+            if self.resume_ids is None:
+                # A run started without reset(), like the command line's
+                self.resume_ids = []
+            self.resume_ids.extend(document_ids)
+
+    def record_failure(self):
+        # A document or candidate that could not be processed, for the exit status
+        with self.lock:
+            self.failures += 1
+        self.notify()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.notify()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+    def track(self, stage, items):
+        """
+        Yields items as one stage, counting each as done once the next one is
+        requested, and stops early when the run is cancelled.
+        """
+        items = list(items)
+        self.start_stage(stage, len(items))
+        for item in items:
+            if self.is_cancelled():
+                print(f"{stage}: cancelled after {self.stage_done} of {len(items)}")
+                return
+            yield item
+            self.advance()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: The current stage, its done and total counts, its throughput
+            in documents per minute, the seconds it has left (None until
+            something is done), the tokens spent and failures seen in the run,
+            and whether it was cancelled.
+        """
+        with self.lock:
+            elapsed_minutes = max(time.monotonic() - self.stage_started_at, 1e-6) / 60
+            per_minute = self.stage_done / elapsed_minutes
+            remaining = max(self.stage_total - self.stage_done, 0)
+            return {
+                "stage": self.stage,
+                "done": self.stage_done,
+                "total": self.stage_total,
+                "per_minute": per_minute,
+                "eta_seconds": remaining / per_minute * 60 if per_minute else None,
+                "tokens": self.tokens,
+                "failures": self.failures,
+                "cancelled": self.is_cancelled(),
+            }
+
+    def notify(self):
+        listener = self.listener
+        if listener is not None:
+            listener(self.snapshot())
+
+
+def format_progress(snapshot):
+    if snapshot["stage"] is None:
+        return "Starting..."
+
+    text = (
+        f"{snapshot['stage']}: {snapshot['done']} of {snapshot['total']}"
+        f" | {snapshot['per_minute']:.1f} per minute"
+    )
+    if snapshot["eta_seconds"] is not None and snapshot["done"] < snapshot["total"]:
+        minutes, seconds = divmod(int(snapshot["eta_seconds"]), 60)
+        text += f" | about {minutes}m {seconds:02d}s left"
+    text += f" | {snapshot['tokens']:,} tokens"
+    if snapshot["failures"]:
+        text += f" | {snapshot['failures']} failed"
+    if snapshot["cancelled"]:
+        text += " | cancelling, finishing current work..."
+    return text
+
+
+# Progress of the run in this process
+progress = ProgressTracker()
@@ -0,0 +1,179 @@
+import csv
+import heapq
+import itertools
+import os
+import tempfile
+import time
+
+
+def get_sort_key(row):
+    """
+    Ranking key for a scored candidate row: final score, then lexical score.
+    Works on both in-memory rows and rows read back from CSV as strings.
+    """
+
+    def _to_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+
+    return _to_float(row.get("final_score")), _to_float(row.get("lexical_score"))
+
+
+class ScoredCandidatesSink:
+    """
+    Writes scored candidates for one job without holding them all in memory.
+
+    Every row is appended to an unsorted file as soon as it is added, so a crash
+    never loses scored candidates. An optional bounded heap keeps the best
+    shortlist_size rows for the shortlist file, which can be republished while
+    scoring is still running. finalize() produces the fully sorted output with an
+    external merge sort over runs of run_size rows.
+
+    With replaced_filenames, the rows already in the output file are kept and
+    merged with the added ones, except the rows of those files, so new
+    candidates are ranked in without rescoring the rest.
+    """
+
+    def __init__(
+        self,
+        output_file,
+        fieldnames,
+        shortlist_size=0,
+        run_size=10000,
+        replaced_filenames=None,
+    ):
+        self.output_file = output_file
+        self.fieldnames = [name for name in fieldnames if name != "resume_text"]
+        self.shortlist_size = shortlist_size
+        self.run_size = run_size
+        self.shortlist = []
+        self.row_count = 0
+        self.last_published = 0
+        # Tie breaker so the heap never compares rows themselves
+        self.counter = itertools.count()
+
+        # Filenames whose rows of the output file finalize() drops while keeping
+        # the others, or None to overwrite the file
+        self.replaced_filenames = None
+        if replaced_filenames is not None and os.path.exists(output_file):
+            self.replaced_filenames = set(replaced_filenames)
+            with open(output_file, encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), [])
+            # Columns only the kept rows have are kept too
+            self.fieldnames += [name for name in header if name not in self.fieldnames]
+
+        base_path, _ = os.path.splitext(output_file)
+        self.unsorted_file = f"{base_path}.unsorted.csv"
+        self.shortlist_file = f"{base_path}_shortlist.csv"
+
+        self.unsorted_handle = open(
+            self.unsorted_file, "w", encoding="utf-8", newline=""
+        )
+        self.unsorted_writer = self.create_writer(self.unsorted_handle)
+        self.unsorted_writer.writeheader()
+
+        # The file is sorted, so its shortlist is its first kept rows
+        if self.replaced_filenames is not None:
+            for row in itertools.islice(self.read_kept_rows(), shortlist_size):
+                self.add_to_shortlist(row)
+
+    def create_writer(self, handle):
+        return csv.DictWriter(
+            handle, fieldnames=self.fieldnames, extrasaction="ignore", restval=""
+        )
+
+    def add(self, candidate_data):
+        self.unsorted_writer.writerow(candidate_data)
+        self.unsorted_handle.flush()
+        self.row_count += 1
+        self.add_to_shortlist(candidate_data)
+
+    def add_to_shortlist(self, candidate_data):
+        if self.shortlist_size > 0:
+            row = {name: candidate_data.get(name, "") for name in self.fieldnames}
+            entry = (get_sort_key(row), next(self.counter), row)
+            if len(self.shortlist) < self.shortlist_size:
+                heapq.heappush(self.shortlist, entry)
+            else:
+                heapq.heappushpop(self.shortlist, entry)
+
+    def read_kept_rows(self):
+        """
+        Yields the rows of the output file that finalize() keeps, in order.
+        """
+        with open(self.output_file, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("filename") not in self.replaced_filenames:
+                    yield row
+
+    def publish_shortlist(self):
+        """
+        Rewrites the shortlist file with the best rows added so far.
+        """
+        self.last_published = time.monotonic()
+        if self.shortlist_size <= 0:
+            return
+
+        rows = [row for _, _, row in sorted(self.shortlist, reverse=True)]
+        self.write_rows(self.shortlist_file, rows)
+
+    def maybe_publish_shortlist(self, interval):
+        if time.monotonic() - self.last_published >= interval:
+            self.publish_shortlist()
+
+    def finalize(self):
+        """
+        Sorts everything added so far into the output file, along with the
+        rows it keeps when merging, and removes the unsorted file.
+        """
+        self.unsorted_handle.close()
+        self.publish_shortlist()
+
+        if self.row_count or self.replaced_filenames:
+            with tempfile.TemporaryDirectory(
+                dir=os.path.dirname(self.output_file) or "."
+            ) as run_dir:
+                run_files = self.write_sorted_runs(run_dir)
+                run_handles = [
+                    open(run_file, encoding="utf-8", newline="")
+                    for run_file in run_files
+                ]
+                sorted_rows = [csv.DictReader(handle) for handle in run_handles]
+                if self.replaced_filenames is not None:
+                    # Already sorted, so it is merged as one more run
+                    sorted_rows.append(self.read_kept_rows())
+                try:
+                    merged_rows = heapq.merge(
+                        *sorted_rows, key=get_sort_key, reverse=True
+                    )
+                    self.write_rows(self.output_file, merged_rows)
+                finally:
+                    for handle in run_handles:
+                        handle.close()
+
+        os.remove(self.unsorted_file)
+
+    def write_sorted_runs(self, run_dir):
+        run_files = []
+        with open(self.unsorted_file, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            while True:
+                run = list(itertools.islice(reader, self.run_size))
+                if not run:
+                    break
+                run.sort(key=get_sort_key, reverse=True)
+                run_file = os.path.join(run_dir, f"run_{len(run_files)}.csv")
+                self.write_rows(run_file, run)
+                run_files.append(run_file)
+        return run_files
+
+    def write_rows(self, path, rows):
+        # Write to a temporary file first so readers never see a half-written CSV
+        temp_file = f"{path}.tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as f:
+            writer = self.create_writer(f)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(temp_file, path)
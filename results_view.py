@@ -0,0 +1,327 @@
+import config
+
+from PyQt6.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QComboBox,
+    QSpinBox,
+    QTableView,
+    QHeaderView,
+    QAbstractItemView,
+)
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from document_store import DocumentStore
+from progress import progress
+
+column_titles = {
+    "filename": "File",
+    "name": "Name",
+    "final_I": "Industry",
+    "final_F": "Function",
+    "bucket": "Bucket",
+    "bucket_score": "Bucket Score",
+    "openai_score": "OpenAI Score",
+    "rule_based_score": "Rule Score",
+    "final_score": "Final Score",
+    "lexical_score": "Lexical Score",
+    "score_lower_bound": "Lower Bound",
+    "score_upper_bound": "Upper Bound",
+}
+
+# Columns shown in the table, in order
+result_columns = [
+    "final_score",
+    "name",
+    "filename",
+    "bucket",
+    "openai_score",
+    "rule_based_score",
+    "lexical_score",
+    "final_I",
+    "final_F",
+]
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """
+    Ranked matches of one job, read from the document store a page at a time.
+
+    Only the pages the view actually displays are loaded, and only
+    max_cached_pages of them are kept, so the model stays small however many
+    candidates a job has. Sorting and filtering are done by the store's query.
+
+    Once a run has started, only the matches of the résumés it stored are
+    shown, not the ones left in the store by earlier runs.
+    """
+
+    def __init__(self, store, page_size=200, max_cached_pages=20, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self.job_hash = None
+        self.sort_column = "final_score"
+        self.descending = True
+        self.bucket = None
+        self.min_score = None
+        self.row_count = 0
+        self.pages = {}
+        # The run's résumé IDs the store's ranking is restricted to, and how
+        # many of them it has been given
+        self.resume_ids = None
+        self.resume_id_count = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(result_columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return column_titles[result_columns[section]]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (
+            Qt.ItemDataRole.DisplayRole,
+            Qt.ItemDataRole.TextAlignmentRole,
+        ):
+            return None
+
+        value = self.get_row(index.row()).get(result_columns[index.column()])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if isinstance(value, (int, float)):
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            return None
+        if value is None:
+            return ""
+        if isinstance(value, float):
+            return f"{value:g}"
+        return str(value)
+
+    def get_row(self, row):
+        page_number = row // self.page_size
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self.store.load_ranked_matches(
+                self.job_hash,
+                page_number * self.page_size,
+                self.page_size,
+                self.sort_column,
+                self.descending,
+                self.bucket,
+                self.min_score,
+            )
+            if len(self.pages) >= self.max_cached_pages:
+                # Dicts keep insertion order, so this drops the oldest page
+                del self.pages[next(iter(self.pages))]
+            self.pages[page_number] = page
+
+        offset = row - page_number * self.page_size
+        return page[offset] if offset < len(page) else {}
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = result_columns[column]
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    def set_job(self, job_hash):
+        self.job_hash = job_hash
+        self.reload()
+
+    def set_filter(self, bucket=None, min_score=None):
+        self.bucket = bucket
+        self.min_score = min_score
+        self.reload()
+
+    def reload(self):
+        self.update_resume_ids()
+        self.beginResetModel()
+        self.pages = {}
+        self.row_count = self.count_rows()
+        self.endResetModel()
+
+    def refresh(self):
+        """
+        Picks up candidates scored since the last refresh. The view keeps its
+        scroll position: new rows are announced as inserted at the end, and
+        every row as changed, since new rows can rank anywhere.
+        """
+        if self.update_resume_ids():
+            self.reload()
+            return
+
+        row_count = self.count_rows()
+        if row_count < self.row_count:
+            self.reload()
+            return
+
+        self.pages = {}
+        if row_count > self.row_count:
+            self.beginInsertRows(QModelIndex(), self.row_count, row_count - 1)
+            self.row_count = row_count
+            self.endInsertRows()
+        if self.row_count:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self.row_count - 1, len(result_columns) - 1),
+            )
+
+    def update_resume_ids(self):
+        """
+        Restricts the store's ranking to the résumés of the current run, adding
+        the ones stored since the last call.
+
+        Returns:
+            bool: Whether a new run started, so rows already shown may be gone.
+        """
+        resume_ids = progress.resume_ids
+        if resume_ids is None:
+            return False
+        if resume_ids is not self.resume_ids:
+            self.resume_ids = resume_ids
+            self.resume_id_count = len(resume_ids)
+            self.store.restrict_ranked_matches(resume_ids[: self.resume_id_count])
+            return True
+
+        resume_id_count = len(resume_ids)
+        if resume_id_count > self.resume_id_count:
+            self.store.extend_ranked_matches(
+                resume_ids[self.resume_id_count : resume_id_count]
+            )
+            self.resume_id_count = resume_id_count
+        return False
+
+    def count_rows(self):
+        if self.job_hash is None:
+            return 0
+        return self.store.count_ranked_matches(
+            self.job_hash, self.bucket, self.min_score
+        )
+
+
+class ResultsWindow(QWidget):
+    """
+    Lists the ranked candidates of each scored job, refreshed while a run is
+    still scoring them.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setWindowTitle("Grow Match Results")
+        self.resize(1000, 600)
+
+        # Its own connection, so reads never interleave with a run's writes
+        self.store = DocumentStore(
+            config.document_store_path, config.document_text_blob_path
+        )
+        self.model = ResultsTableModel(self.store, parent=self)
+
+        layout = QVBoxLayout(self)
+        filter_layout = QHBoxLayout()
+
+        filter_layout.addWidget(QLabel("Job:", self))
+        self.job_input = QComboBox(self)
+        self.job_input.currentIndexChanged.connect(self.change_job)
+        filter_layout.addWidget(self.job_input, 1)
+
+        filter_layout.addWidget(QLabel("Bucket:", self))
+        self.bucket_input = QComboBox(self)
+        self.bucket_input.currentIndexChanged.connect(self.change_filter)
+        filter_layout.addWidget(self.bucket_input)
+
+        filter_layout.addWidget(QLabel("Min Score:", self))
+        self.min_score_input = QSpinBox(self)
+        self.min_score_input.setRange(0, 100)
+        self.min_score_input.valueChanged.connect(self.change_filter)
+        filter_layout.addWidget(self.min_score_input)
+
+        layout.addLayout(filter_layout)
+
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(
+            result_columns.index("final_score"), Qt.SortOrder.DescendingOrder
+        )
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        # Fixed row heights, so the view never measures rows it does not show
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeMode.Interactive
+        )
+        layout.addWidget(self.table)
+
+        self.count_label = QLabel("", self)
+        layout.addWidget(self.count_label)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.load_jobs()
+
+    def showEvent(self, event):
+        self.refresh_timer.start(config.results_refresh_interval_ms)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def load_jobs(self):
+        current_job = self.job_input.currentData()
+        self.job_input.blockSignals(True)
+        self.job_input.clear()
+        for job_hash, company, position in self.store.list_matched_jobs():
+            self.job_input.addItem(
+                f"{position or 'Unknown position'} - {company or 'Unknown company'}",
+                job_hash,
+            )
+        index = self.job_input.findData(current_job) if current_job else 0
+        self.job_input.setCurrentIndex(max(index, 0))
+        self.job_input.blockSignals(False)
+
+        if self.job_input.currentData() != current_job:
+            self.change_job()
+
+    def load_buckets(self):
+        # Buckets show up as candidates are scored, so keep the current choice
+        current_bucket = self.bucket_input.currentData()
+        job_hash = self.job_input.currentData()
+        self.bucket_input.blockSignals(True)
+        self.bucket_input.clear()
+        self.bucket_input.addItem("All", None)
+        if job_hash:
+            for bucket in self.store.list_match_buckets(job_hash):
+                self.bucket_input.addItem(bucket, bucket)
+        self.bucket_input.setCurrentIndex(
+            max(self.bucket_input.findData(current_bucket), 0)
+        )
+        self.bucket_input.blockSignals(False)
+
+    def change_job(self):
+        self.load_buckets()
+        # The bucket choice falls back to "All" when the new job lacks it
+        self.model.bucket = self.bucket_input.currentData()
+        self.model.set_job(self.job_input.currentData())
+        self.update_count()
+
+    def change_filter(self):
+        self.model.set_filter(
+            self.bucket_input.currentData(), self.min_score_input.value() or None
+        )
+        self.update_count()
+
+    def refresh(self):
+        self.load_jobs()
+        self.load_buckets()
+        self.model.refresh()
+        self.update_count()
+
+    def update_count(self):
+        self.count_label.setText(f"{self.model.rowCount():,} candidates")
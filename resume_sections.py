@@ -0,0 +1,187 @@
+import re
+
+from token_budget import estimate_tokens, truncate_to_tokens
+
+# Headings that start each section, in English and Japanese
+section_headings = {
+    "summary": [
+        "summary",
+        "professional summary",
+        "profile",
+        "professional profile",
+        "about me",
+        "objective",
+        "career objective",
+        "職務要約",
+        "自己pr",
+    ],
+    "experience": [
+        "experience",
+        "work experience",
+        "professional experience",
+        "employment",
+        "employment history",
+        "work history",
+        "career history",
+        "career summary",
+        "職務経歴",
+        "職歴",
+    ],
+    "skills": [
+        "skills",
+        "technical skills",
+        "key skills",
+        "core competencies",
+        "competencies",
+        "expertise",
+        "スキル",
+        "活かせる経験・知識・技術",
+    ],
+    "languages": ["languages", "language skills", "language", "語学", "語学力"],
+    "education": [
+        "education",
+        "academic background",
+        "education and training",
+        "学歴",
+    ],
+    "certifications": [
+        "certifications",
+        "certificates",
+        "licenses",
+        "licenses and certifications",
+        "資格",
+        "免許・資格",
+    ],
+    "references": ["references", "referees", "references available upon request"],
+    "other": [
+        "interests",
+        "hobbies",
+        "personal interests",
+        "volunteering",
+        "publications",
+        "趣味",
+    ],
+}
+
+# Sections sent to the scoring prompt, most important first. Anything before the
+# first heading (name, current role) counts as the "header" section.
+scoring_sections = [
+    "header",
+    "summary",
+    "experience",
+    "skills",
+    "languages",
+    "education",
+    "certifications",
+]
+
+heading_lookup = {
+    heading: section
+    for section, headings in section_headings.items()
+    for heading in headings
+}
+
+
+def clean_resume_lines(resume_text):
+    """
+    Collapses whitespace and drops long lines repeated between the OCR and
+    direct text extraction.
+    """
+    seen_lines = set()
+    lines = []
+    for line in resume_text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        # Short lines such as dates legitimately repeat, so only drop long ones
+        if len(line) >= 20:
+            if line in seen_lines:
+                continue
+            seen_lines.add(line)
+        lines.append(line)
+    return lines
+
+
+def get_heading_section(line):
+    if len(line) > 40:
+        return None
+    # Headings are often decorated, e.g. "WORK EXPERIENCE:" or "■ 職務経歴"
+    heading = re.sub(r"[^\w\s&・]", " ", line.lower())
+    return heading_lookup.get(" ".join(heading.split()))
+
+
+def segment_resume(resume_text):
+    """
+    Splits a résumé into its sections by their headings.
+
+    Returns:
+        list: (section name, lines) pairs in document order. Text before the
+        first heading is the "header" section.
+    """
+    sections = [("header", [])]
+    for line in clean_resume_lines(resume_text):
+        section = get_heading_section(line)
+        if section:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(section, lines) for section, lines in sections if lines]
+
+
+def compact_resume_sections(resume_text, max_tokens):
+    """
+    Shrinks a résumé for a scoring prompt to the sections that matter for
+    scoring, within max_tokens.
+
+    Every kept section first gets an equal share of the budget, so a long
+    experience section cannot crowd out skills or languages. Budget left over
+    by short sections then goes to the long ones in scoring_sections order.
+    Sections are sent in document order; references, hobbies and similar are
+    dropped. Résumés with no recognizable headings are only cleaned and
+    truncated.
+    """
+    if not isinstance(resume_text, str):
+        return ""
+
+    sections = segment_resume(resume_text)
+    if len(sections) <= 1:
+        return truncate_to_tokens(
+            "\n".join(clean_resume_lines(resume_text)), max_tokens
+        )
+
+    section_texts = {
+        position: "\n".join(lines)
+        for position, (section, lines) in enumerate(sections)
+        if section in scoring_sections
+    }
+    if not section_texts:
+        return ""
+
+    needed_tokens = {}
+    for position, section_text in section_texts.items():
+        needed_tokens[position] = estimate_tokens(section_text) + 1
+        if sections[position][0] == "header":
+            # Contact details and the like never take more than a quarter
+            needed_tokens[position] = min(needed_tokens[position], max_tokens // 4)
+
+    share = max_tokens // len(section_texts)
+    budgets = {
+        position: min(needed, share) for position, needed in needed_tokens.items()
+    }
+    remaining_tokens = max_tokens - sum(budgets.values())
+    by_priority = sorted(
+        section_texts,
+        key=lambda position: scoring_sections.index(sections[position][0]),
+    )
+    for position in by_priority:
+        extra_tokens = min(
+            needed_tokens[position] - budgets[position], remaining_tokens
+        )
+        budgets[position] += extra_tokens
+        remaining_tokens -= extra_tokens
+
+    kept = [
+        truncate_to_tokens(section_texts[position], budgets[position] - 1)
+        for position in sorted(section_texts)
+    ]
+    return "\n".join(section_text for section_text in kept if section_text)
@@ -1,13 +1,27 @@
+import config
 import csv
+import hashlib
+import heapq
+import itertools
 import json
 import os
-import pandas as pd
 import re
-
-from config import candidates_to_score_count
+import sys
+
+from datetime import datetime
+from document_store import (
+    get_document_store,
+    get_fields_hash,
+    get_match_hash,
+    match_columns,
+)
+from lexical_index import BM25Index
 from math import ceil
-from openai_api import call_openai_api
-from openai.types.chat import ChatCompletionToolParam
+from openai_api import build_strict_tool, call_openai_api, get_tool_arguments
+from progress import progress
+from result_sink import ScoredCandidatesSink
+from resume_sections import compact_resume_sections
+from token_budget import estimate_tokens
 
 
 buckets_table = {
@@ -61,52 +75,676 @@ scores_table = {
 }
 
 
-def score_candidates(job_data, processed_resumes_file):
-    scored_candidates = []
-    # Read the CSV file
-    df = pd.read_csv(processed_resumes_file)
-    # Iterate through each resume data
-    for index, row in df.iterrows():
-        try:
-            candidate_data = row.to_dict()
-            print(f"Scoring candidate: {candidate_data.get('name')}")
+# Bump when the rule-based or lexical scoring code changes, so stored matches are recomputed
+rules_revision = 4
 
-            bucket = determine_bucket(candidate_data, job_data)
-            candidate_data["final_I"] = bucket.get("final_I")
-            candidate_data["final_F"] = bucket.get("final_F")
-            candidate_data["bucket"] = bucket.get("bucket")
-            candidate_data["bucket_score"] = 0
-            candidate_data["openai_score"] = 0
-            candidate_data["rule_based_score"] = 0
-            candidate_data["final_score"] = 0
+# Candidates scored, résumé tokens and prompt tokens sent, per job content hash
+prompt_savings = {}
 
-            if candidate_data["bucket"]:
-                initial_score = scores_table.get(bucket.get("bucket")).get("max")
-                i4_and_f4_points = get_I4_and_F4_points(candidate_data, job_data)
-                candidate_data["bucket_score"] = initial_score + i4_and_f4_points
 
-                if candidate_data["bucket_score"] >= 70:
-                    candidate_data["bucket"] = "Perfect Match"
+def get_rules_version(job_data):
+    """
+    Returns a fingerprint of everything the rule-based part of a match depends on,
+    apart from the candidate's fields and labels (see get_fields_hash): the rules,
+    the job's fields and labels and the OpenAI prompt variant. Stored matches with
+    a different version are recomputed, while their OpenAI scores are reused when
+    the prompt variant is the same.
+    """
+    rules = {
+        "revision": rules_revision,
+        "job_fields": get_fields_hash(job_data),
+        "prompt_variant": get_prompt_variant(),
+        "buckets_table": sorted(
+            [f"{f_label}/{i_label}", bucket]
+            for (f_label, i_label), bucket in buckets_table.items()
+        ),
+        "scores_table": scores_table,
+        "candidates_to_score_count": config.candidates_to_score_count,
+        "lexical_gate_threshold": config.lexical_gate_threshold,
+    }
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def open_resume_index(resume_ids):
+    """
+    Builds the BM25 index over a pool of résumés, reading every résumé text once.
+    Lexical scores are only used by the lexical gate, so no index is built
+    while the gate is off.
+
+    The index is held by the caller, for as long as it scores jobs against the
+    same pool, and dropped with it: it is only valid until the pool changes.
+
+    Args:
+        resume_ids (list): Document IDs of the pool (None for every stored résumé).
+
+    Returns:
+        tuple: The BM25Index and a map from document ID to position in it, or
+        None if config.lexical_gate_threshold is 0.
+    """
+    if config.lexical_gate_threshold <= 0:
+        return None
+
+    positions = {}
+
+    def _iter_resume_texts():
+        for document_id, resume_text in get_document_store().iter_texts(
+            "resume", resume_ids
+        ):
+            positions[document_id] = len(positions)
+            yield resume_text
+
+    return BM25Index(_iter_resume_texts()), positions
+
+
+def get_lexical_scores(resume_index, job_data):
+    """
+    Returns a map from résumé document ID to its BM25 match against the job
+    description, relative to the best match in the pool, or None without an
+    index (see open_resume_index).
+    """
+    if resume_index is None:
+        return None
+    index, positions = resume_index
+    scores = index.relative_scores(job_data.get("job_description_text"))
+    return {
+        document_id: round(float(scores[position]), 4)
+        for document_id, position in positions.items()
+    }
+
+
+def score_candidates(job_data, resume_ids=None, resume_index=None):
+    """
+    Scores a pool of résumés against a job, stores their matches and writes
+    the job's ranked results.
+
+    Args:
+        job_data (dict): The job, with its text.
+        resume_ids (list): Document IDs of the pool (None for every stored résumé).
+        resume_index (tuple): The pool's open_resume_index, when the caller
+            scores several jobs against the same pool. Built for this call
+            otherwise.
+    """
+    store = get_document_store()
+
+    if resume_index is None:
+        resume_index = open_resume_index(resume_ids)
+    # Only this job's lexical scores are kept while the candidates are scored
+    lexical_scores = get_lexical_scores(resume_index, job_data)
+    del resume_index
+
+    sink = open_result_sink(job_data, store.get_field_names("resume", resume_ids))
+    # Best final scores so far in top-N mode, carried across chunks
+    top_scores = []
+
+    # Only one chunk of candidates is in memory at a time. Résumé texts are only
+    # read for the candidates sent to OpenAI.
+    chunk_size = config.scoring_chunk_size or sys.maxsize
+    progress.start_stage(
+        f"Scoring for {job_data.get('position')}",
+        store.count_documents("resume", resume_ids),
+    )
+    for candidates in store.iter_documents(
+        "resume", resume_ids, include_text=False, chunk_size=chunk_size
+    ):
+        if progress.is_cancelled():
+            break
+        chunk_length = len(candidates)
+        score_candidate_chunk(candidates, job_data, lexical_scores, sink, top_scores)
+        progress.advance(chunk_length)
+
+    sink.finalize()
+    report_prompt_savings(job_data)
+
+
+def score_new_candidates(job_data, new_resume_ids, resume_index=None):
+    """
+    Scores new or changed résumés against a job and ranks them into the job's
+    written results, in place of the rows of earlier versions of the same
+    files, instead of rescoring the whole pool. A job without written results
+    is scored in full.
+
+    Lexical scores are relative to the pool at the time each candidate is
+    scored: the new candidates' are computed against the current pool, and the
+    rows already ranked keep theirs.
+
+    Args:
+        job_data (dict): The job, with its text.
+        new_resume_ids (list): Document IDs of the new or changed résumés.
+        resume_index (tuple): open_resume_index of every stored résumé.
+            Required with the lexical gate on.
+    """
+    if not os.path.exists(get_result_file(job_data)):
+        score_candidates(job_data, None, resume_index)
+        return
+
+    store = get_document_store()
+    lexical_scores = get_lexical_scores(resume_index, job_data)
+    candidates = store.load_documents("resume", new_resume_ids, include_text=False)
+    sink = open_result_sink(
+        job_data,
+        store.get_field_names("resume", new_resume_ids),
+        replaced_filenames={candidate["filename"] for candidate in candidates},
+    )
+    top_n = config.candidates_to_score_count
+    top_scores = []
+    if top_n > 0:
+        # New candidates only go to OpenAI if they can beat the ranked top N
+        ranked_rows = (row for row in sink.read_kept_rows() if row.get("bucket"))
+        for row in itertools.islice(ranked_rows, top_n):
+            push_top_score(top_scores, top_n, float(row["final_score"]))
+
+    progress.start_stage(f"Scoring for {job_data.get('position')}", len(candidates))
+    score_candidate_chunk(candidates, job_data, lexical_scores, sink, top_scores)
+    progress.advance(len(candidates))
+    sink.finalize()
+    report_prompt_savings(job_data)
+
+
+def score_candidate_subset(job_data, scored_resume_ids, resume_index=None):
+    """
+    Scores part of a pool of résumés against a job and stores their matches,
+    without writing the job's results. Work queue workers score the parts of a
+    pool in parallel this way, and score_candidates then finds every match
+    stored and only ranks them.
+
+    In top-N mode each part keeps its own top N, which holds every candidate of
+    the part that is in the pool's top N, so the ranking stays exact.
+
+    Args:
+        job_data (dict): The job, with its text.
+        scored_resume_ids (list): Document IDs of the résumés to score.
+        resume_index (tuple): open_resume_index of the whole pool, which the
+            lexical scores are relative to. Required with the lexical gate on.
+    """
+    store = get_document_store()
+    lexical_scores = get_lexical_scores(resume_index, job_data)
+    candidates = store.load_documents("resume", scored_resume_ids, include_text=False)
+    score_candidate_chunk(candidates, job_data, lexical_scores, None, [])
+    report_prompt_savings(job_data)
+
 
-                if candidate_data["bucket_score"] >= 71 or (
-                    candidates_to_score_count > 0 and index < candidates_to_score_count
+def score_candidate_chunk(candidates, job_data, lexical_scores, sink, top_scores):
+    """
+    Scores one chunk of the candidate pool, stores its matches and adds it to
+    the job's result sink (if any). OpenAI priority ordering applies within the
+    chunk; in top-N mode top_scores carries the N best scores over from earlier
+    chunks, so pruning stays exact. lexical_scores is None with the lexical
+    gate off, and the matches get no lexical score.
+    """
+    store = get_document_store()
+    top_n = config.candidates_to_score_count
+    job_hash = job_data.get("content_hash")
+    rules_version = get_rules_version(job_data)
+    stored_matches = store.load_matches(
+        job_hash,
+        {
+            get_match_hash(candidate): get_fields_hash(candidate)
+            for candidate in candidates
+        },
+        rules_version,
+    )
+
+    settled_candidates = []
+    openai_queue = []
+    # Iterate through each resume data
+    for candidate_data in candidates:
+        stored_match = stored_matches.get(get_match_hash(candidate_data))
+        if stored_match:
+            # Unchanged candidate-job pair, nothing to recompute
+            candidate_data.update(stored_match)
+            if candidate_data["lexical_score"] is None and lexical_scores:
+                # Prescored when the résumé was stored, before the pool was known
+                candidate_data["lexical_score"] = lexical_scores[
+                    candidate_data["document_id"]
+                ]
+                settled_candidates.append(candidate_data)
+            if sink is not None:
+                sink.add(candidate_data)
+            if top_n > 0 and candidate_data["bucket"]:
+                push_top_score(top_scores, top_n, candidate_data["final_score"])
+            continue
+
+        try:
+            apply_bucket(candidate_data, job_data)
+            # Candidates whose text barely overlaps the job description skip OpenAI
+            passes_lexical_gate = True
+            if lexical_scores is not None:
+                lexical_score = lexical_scores[candidate_data["document_id"]]
+                candidate_data["lexical_score"] = lexical_score
+                passes_lexical_gate = lexical_score >= config.lexical_gate_threshold
+
+            if candidate_data["bucket"]:
+                rule_based_score = get_rule_based_score(candidate_data, job_data)
+                candidate_data["rule_based_score"] = rule_based_score
+                candidate_data["final_score"] = rule_based_score
+                # Top-N mode sends every bucketed candidate that can still reach
+                # the top N, the default mode only the ones scoring 71 or more
+                if passes_lexical_gate and (
+                    top_n > 0 or candidate_data["bucket_score"] >= 71
                 ):
-                    openai_score = get_openai_score(
-                        candidate_data.get("resume_text"), job_data
-                    )
+                    if top_n > 0:
+                        lower, upper = get_score_bounds(candidate_data, job_data)
+                        candidate_data["score_lower_bound"] = lower
+                        candidate_data["score_upper_bound"] = upper
+                    # Stays None unless OpenAI scores it
+                    candidate_data["openai_score"] = None
+                    openai_queue.append(candidate_data)
+                    continue
+
+            if sink is not None:
+                sink.add(candidate_data)
+            settled_candidates.append(candidate_data)
+        except Exception as e:
+            print(f"Error scoring {candidate_data.get('name')}: {e}")
+            progress.record_failure()
+
+    store.save_matches(job_hash, rules_version, settled_candidates)
+    del candidates, settled_candidates, stored_matches
+
+    # Strongest candidates go to OpenAI first so they show up in the partial results early
+    openai_queue.sort(
+        key=lambda x: (
+            x.get("score_upper_bound", 0),
+            get_scoring_priority(x, job_data),
+        ),
+        reverse=True,
+    )
+
+    if sink is not None:
+        sink.publish_shortlist()
+
+    def _on_finished(candidates, pruned=False):
+        # Failed OpenAI calls are not stored, so the next run retries them. Pruned
+        # candidates can't reach the top N, so their rule-based score is final.
+        store.save_matches(
+            job_hash,
+            rules_version,
+            [c for c in candidates if pruned or c.get("openai_score") is not None],
+        )
+        if sink is not None:
+            for candidate_data in candidates:
+                sink.add(candidate_data)
+            sink.maybe_publish_shortlist(config.partial_results_interval)
+
+    if top_n > 0:
+        score_top_candidates(openai_queue, job_data, top_n, top_scores, _on_finished)
+    else:
+        batch_size = max(config.openai_batch_size, 1)
+        for start in range(0, len(openai_queue), batch_size):
+            if progress.is_cancelled():
+                # Keep the candidates without an OpenAI score, like failed calls
+                _on_finished(openai_queue[start:])
+                break
+            batch = openai_queue[start : start + batch_size]
+            try:
+                for candidate_data in batch:
+                    print(f"Scoring candidate: {candidate_data.get('name')}")
+                openai_scores = get_stored_or_new_openai_scores(batch, job_data)
+                for candidate_data, openai_score in zip(batch, openai_scores):
                     candidate_data["openai_score"] = openai_score
-                    candidate_data["final_score"] = openai_score
-                else:
-                    rule_based_score = get_rule_based_score(candidate_data, job_data)
-                    candidate_data["rule_based_score"] = rule_based_score
-                    candidate_data["final_score"] = rule_based_score
-
-            candidate_data.pop("resume_text")
-            scored_candidates.append(candidate_data)
+                    candidate_data["final_score"] = get_final_score(
+                        candidate_data, openai_score
+                    )
+            except Exception as e:
+                print(f"Error calling OpenAI API for {job_data.get('name')}: {e}")
+                progress.record_failure()
+            _on_finished(batch)
+
+
+def get_stored_or_new_openai_scores(candidates, job_data):
+    """
+    Returns the OpenAI scores of a batch of candidates, only calling OpenAI for
+    candidate-job pairs that were never scored before.
+    """
+    store = get_document_store()
+    job_hash = job_data.get("content_hash")
+    prompt_variant = get_prompt_variant()
+    openai_scores = store.load_openai_scores(
+        job_hash,
+        [get_match_hash(candidate) for candidate in candidates],
+        prompt_variant,
+    )
+
+    # Near-duplicates of a candidate in the same batch are only scored once
+    new_candidates = list(
+        {
+            get_match_hash(candidate): candidate
+            for candidate in candidates
+            if openai_scores.get(get_match_hash(candidate)) is None
+        }.values()
+    )
+    if new_candidates:
+        resume_texts = [
+            store.get_text(candidate["document_id"]) for candidate in new_candidates
+        ]
+        prompt_texts = [prepare_resume_for_prompt(text) for text in resume_texts]
+        new_scores = get_openai_scores(prompt_texts, job_data)
+        record_prompt_savings(
+            job_data, new_candidates, resume_texts, prompt_texts, new_scores
+        )
+        new_scores = {
+            get_match_hash(candidate): score
+            for candidate, score in zip(new_candidates, new_scores)
+        }
+        store.save_openai_scores(job_hash, prompt_variant, new_scores)
+        openai_scores.update(new_scores)
+
+    return [openai_scores.get(get_match_hash(candidate)) for candidate in candidates]
+
+
+def get_prompt_variant(listwise=None):
+    """
+    Returns the prompt settings OpenAI scores are requested with. Scores are
+    stored under them, so a run with other settings scores the candidates
+    again, and scores with and without compaction or batching can be compared.
+
+    Args:
+        listwise (bool): Whether several résumés are scored per request.
+            Defaults to config.openai_batch_size > 1.
+
+    Returns:
+        str: e.g. "single/cap=0" or "listwise/budget=12000/cap=3000".
+    """
+    if listwise is None:
+        listwise = config.openai_batch_size > 1
+    prompt = (
+        f"listwise/budget={config.scoring_batch_token_budget}" if listwise else "single"
+    )
+    return f"{prompt}/cap={config.scoring_resume_token_cap}"
+
+
+def prepare_resume_for_prompt(resume_text):
+    if config.scoring_resume_token_cap <= 0:
+        return resume_text
+    return compact_resume_sections(resume_text, config.scoring_resume_token_cap)
+
+
+def record_prompt_savings(job_data, candidates, resume_texts, prompt_texts, scores):
+    """
+    Appends the résumé tokens sent for each scored candidate, next to its full
+    résumé tokens, score and prompt variant, to config.prompt_savings_report_path.
+    Comparing scores across prompt variants shows whether they stay stable.
+    """
+    job_hash = job_data.get("content_hash")
+    totals = prompt_savings.setdefault(job_hash, [0, 0, 0])
+
+    report_path = config.prompt_savings_report_path
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    write_header = not os.path.exists(report_path)
+    with open(report_path, "a", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(
+                [
+                    "scored_at",
+                    "company",
+                    "position",
+                    "filename",
+                    "resume_hash",
+                    "resume_tokens",
+                    "prompt_tokens",
+                    "openai_score",
+                    "prompt_variant",
+                ]
+            )
+        for candidate, resume_text, prompt_text, score in zip(
+            candidates, resume_texts, prompt_texts, scores
+        ):
+            resume_tokens = estimate_tokens(resume_text)
+            prompt_tokens = estimate_tokens(prompt_text)
+            totals[0] += 1
+            totals[1] += resume_tokens
+            totals[2] += prompt_tokens
+            writer.writerow(
+                [
+                    datetime.now().isoformat(),
+                    job_data.get("company"),
+                    job_data.get("position"),
+                    candidate.get("filename"),
+                    candidate.get("content_hash"),
+                    resume_tokens,
+                    prompt_tokens,
+                    score,
+                    get_prompt_variant(),
+                ]
+            )
+
+
+def report_prompt_savings(job_data):
+    candidate_count, resume_tokens, prompt_tokens = prompt_savings.pop(
+        job_data.get("content_hash"), [0, 0, 0]
+    )
+    if candidate_count and resume_tokens:
+        print(
+            f"Résumé tokens sent to OpenAI for {job_data.get('position')}: "
+            f"{prompt_tokens} of {resume_tokens} over {candidate_count} candidates "
+            f"({1 - prompt_tokens / resume_tokens:.0%} saved)"
+        )
+
+
+def prescore_candidate(candidate_data, jobs):
+    """
+    Scores a newly stored candidate against every job and stores the matches
+    that don't depend on the rest of the pool, so the per-job scoring pass
+    finds them already stored: the unbucketed ones, and in the default mode
+    the rule-based ones and (without the lexical gate) the ones sent to OpenAI.
+    Top-N mode ranks bucketed candidates against the whole pool, so those are
+    left to the per-job pass. The lexical score is relative to the pool too,
+    so it is left empty and filled in by the per-job pass.
+
+    Args:
+        candidate_data (dict): The stored candidate, without its résumé text.
+        jobs (list): The jobs to score it against.
+
+    Returns:
+        int: How many matches were stored.
+    """
+    store = get_document_store()
+    stored_matches = 0
+    for job_data in jobs:
+        match = apply_bucket(dict(candidate_data), job_data)
+        match["lexical_score"] = None
+        if match["bucket"]:
+            if config.candidates_to_score_count > 0:
+                continue
+            rule_based_score = get_rule_based_score(match, job_data)
+            match["rule_based_score"] = rule_based_score
+            match["final_score"] = rule_based_score
+            if match["bucket_score"] >= 71:
+                if config.lexical_gate_threshold > 0:
+                    continue
+                openai_score = get_stored_or_new_openai_scores([match], job_data)[0]
+                if openai_score is None:
+                    continue
+                match["openai_score"] = openai_score
+                match["final_score"] = get_final_score(match, openai_score)
+
+        store.save_matches(
+            job_data.get("content_hash"), get_rules_version(job_data), [match]
+        )
+        stored_matches += 1
+    return stored_matches
+
+
+def push_top_score(top_scores, top_n, score):
+    if len(top_scores) < top_n:
+        heapq.heappush(top_scores, score)
+    else:
+        heapq.heappushpop(top_scores, score)
+
+
+def score_top_candidates(openai_queue, job_data, top_n, top_scores, on_finished=None):
+    """
+    Scores only as many candidates with OpenAI as needed to rank the top N.
+
+    Every queued candidate already has its rule-based score, which is also the
+    upper bound of what OpenAI can give it (see get_score_bounds). Candidates are
+    sent to OpenAI in descending upper-bound order, and the loop stops as soon as
+    no remaining candidate can beat the N-th best score found so far. Candidates
+    that were never sent keep their rule-based score, which is guaranteed to be
+    no higher than that N-th score, unless the loop stopped because the run
+    was cancelled.
+
+    Args:
+        openai_queue (list): Bucketed candidates, sorted by descending upper bound.
+        job_data (dict): The job to score the candidates against.
+        top_n (int): How many candidates the ranked head must contain.
+        top_scores (list): Min-heap of the best top_n final scores found so far,
+            updated in place.
+        on_finished (callable): Called with each batch of candidates sent to
+            OpenAI, then with the candidates never sent and whether they were
+            pruned (True) or left unscored by a cancel (False).
+    """
+    batch_size = max(config.openai_batch_size, 1)
+    position = 0
+    pruned = False
+    while position < len(openai_queue) and not progress.is_cancelled():
+        # Take the next candidates that can still enter the top N
+        batch = []
+        while position < len(openai_queue) and len(batch) < batch_size:
+            upper = openai_queue[position]["score_upper_bound"]
+            if len(top_scores) >= top_n and upper <= top_scores[0]:
+                break
+            batch.append(openai_queue[position])
+            position += 1
+        if not batch:
+            pruned = True
+            break
+
+        for candidate_data in batch:
+            print(f"Scoring candidate: {candidate_data.get('name')}")
+        try:
+            openai_scores = get_stored_or_new_openai_scores(batch, job_data)
         except Exception as e:
             print(f"Error calling OpenAI API for {job_data.get('name')}: {e}")
+            progress.record_failure()
+            openai_scores = [None] * len(batch)
+
+        for candidate_data, openai_score in zip(batch, openai_scores):
+            candidate_data["openai_score"] = openai_score
+            candidate_data["final_score"] = get_final_score(
+                candidate_data, openai_score, clamp=True
+            )
+            push_top_score(top_scores, top_n, candidate_data["final_score"])
+
+        if on_finished:
+            on_finished(batch)
+
+    if on_finished:
+        on_finished(openai_queue[position:], pruned)
+
+    print(
+        f"Top {top_n} for {job_data.get('position')}: "
+        f"{position} of {len(openai_queue)} candidates sent to OpenAI"
+    )
+
+
+def apply_bucket(candidate_data, job_data):
+    """
+    Fills in the bucket columns of a candidate and resets its scores.
+    """
+    bucket = determine_bucket(candidate_data, job_data)
+    candidate_data["final_I"] = bucket.get("final_I")
+    candidate_data["final_F"] = bucket.get("final_F")
+    candidate_data["bucket"] = bucket.get("bucket")
+    candidate_data["bucket_score"] = 0
+    candidate_data["openai_score"] = 0
+    candidate_data["rule_based_score"] = 0
+    candidate_data["final_score"] = 0
+
+    if candidate_data["bucket"]:
+        initial_score = scores_table.get(bucket.get("bucket")).get("max")
+        i4_and_f4_points = get_I4_and_F4_points(candidate_data, job_data)
+        candidate_data["bucket_score"] = initial_score + i4_and_f4_points
+
+        if candidate_data["bucket_score"] >= 70:
+            candidate_data["bucket"] = "Perfect Match"
+
+    return candidate_data
+
+
+def get_score_bounds(candidate_data, job_data):
+    """
+    Returns the range of final scores a bucketed candidate can reach.
+
+    The upper bound is the rule-based score, which starts from the bucket's max.
+    The lower bound is that score minus the width of the bucket's min/max band,
+    so an OpenAI score is only allowed to move a candidate within its bucket.
+    Only top-N mode clamps OpenAI scores to these bounds (see get_final_score),
+    which is what lets it stop before scoring every candidate; the default mode
+    keeps the OpenAI score as it is.
+
+    Args:
+        candidate_data (dict): Candidate with bucket columns filled in by apply_bucket.
+        job_data (dict): The job the candidate is scored against.
+
+    Returns:
+        tuple: (lower, upper) bounds, both between 0 and 100.
+    """
+    if not candidate_data.get("bucket"):
+        return 0, 0
+
+    label_bucket = buckets_table.get(
+        (candidate_data.get("final_F"), candidate_data.get("final_I"))
+    )
+    band = scores_table[label_bucket]["max"] - scores_table[label_bucket]["min"]
+    upper = min(get_rule_based_score(candidate_data, job_data), 100)
+    lower = max(upper - band, 0)
+
+    return lower, upper
+
+
+def get_final_score(candidate_data, openai_score, clamp=False):
+    """
+    Returns the final score of a candidate sent to OpenAI: its OpenAI score, or
+    its rule-based score when OpenAI gave none.
+
+    Args:
+        candidate_data (dict): The scored candidate.
+        openai_score (float): The OpenAI score, or None.
+        clamp (bool): Whether to clamp the OpenAI score to the candidate's
+            score_lower_bound and score_upper_bound, as top-N mode does.
+    """
+    if openai_score is None:
+        return candidate_data["rule_based_score"]
+    if not clamp:
+        return openai_score
+    return min(
+        max(openai_score, candidate_data["score_lower_bound"]),
+        candidate_data["score_upper_bound"],
+    )
+
+
+def get_scoring_priority(candidate_data, job_data):
+    """
+    Returns the sort key used to order candidates for OpenAI scoring:
+    bucket first (by the bucket's max score), then I4/F4 tags shared with the
+    job, then lexical score.
+    """
+    bucket_max = scores_table.get(candidate_data.get("bucket"), {}).get("max", 0)
+    return (
+        bucket_max,
+        get_shared_tag_count(candidate_data, job_data),
+        candidate_data.get("lexical_score") or 0,
+    )
 
-    save_scored_candidates(scored_candidates, job_data)
+
+def get_shared_tag_count(candidate_data, job_data):
+    """
+    Returns how many of the job's I4 and F4 tags the candidate also has.
+
+    get_I4_and_F4_points only awards points to candidates matching down to I4
+    and F4, which determine_bucket never reports (it compares levels 1 to 3),
+    so it is always 0. The shared tags count at every level instead.
+    """
+    shared_tags = 0
+    for category in ["i4", "f4"]:
+        job_tags = {tag.strip() for tag in (job_data.get(category) or "").split(",")}
+        candidate_tags = {
+            tag.strip() for tag in (candidate_data.get(category) or "").split(",")
+        }
+        shared_tags += len((job_tags & candidate_tags) - {""})
+    return shared_tags
 
 
 def determine_bucket(candidate_data, job_data):
@@ -216,6 +854,8 @@ def get_I4_and_F4_points(candidate_data, job_data):
     return f4_points + i4_points
 
 
+# job_index.JobIndex computes the same buckets and scores for all jobs at once;
+# keep it in step with apply_bucket and this function
 def get_rule_based_score(candidate_data, job_data):
     rule_based_score = candidate_data.get("bucket_score")
 
@@ -281,25 +921,29 @@ def get_rule_based_score(candidate_data, job_data):
 
 
 def get_openai_score(resume_text, job_data):
-    score_candidate_tool: ChatCompletionToolParam = {
-        "type": "function",
-        "function": {
-            "name": "score_candidate",
-            "description": "Score the candidate based on the provided algorithm",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "score": {
-                        "type": "number",
-                        "description": "Number between 0 and 100",
-                    },
-                },
-                "required": ["score"],
+    score_candidate_tool = build_strict_tool(
+        "score_candidate",
+        "Score the candidate based on the provided algorithm",
+        {
+            "score": {
+                "type": "number",
+                "description": "Number between 0 and 100",
             },
         },
-    }
+    )
+
+    system_prompt = f"""{build_scoring_context(job_data)}
+**Instructions:**
+1. **Analyze the candidate's résumé in detail**, considering each of the above categories.
+2. **Ensure that the candidate receives a score that accurately reflects their suitability for the role.**
+3. **Always call the function tool: `score_candidate(<your_total_score>)`**
+"""
 
-    system_prompt = f"""
+    return generate_score(system_prompt, resume_text, score_candidate_tool)
+
+
+def build_scoring_context(job_data):
+    return f"""
 You are a highly skilled assistant tasked with evaluating and scoring candidates for the {job_data.get("position")} position at {job_data.get("company")} in {job_data.get("country")}.
 
 **Job Information:**
@@ -321,100 +965,164 @@ Evaluate the candidate's résumé based on the following criteria, assigning poi
 4. **Cultural Fit:**
 5. **Achievements:**
 6. **Additional Factors:**
+"""
+
+
+def get_openai_scores(resume_texts, job_data):
+    """
+    Scores a batch of résumés against a job. More than one résumé is sent as a
+    single request, each compacted to its share of config.scoring_batch_token_budget.
+
+    Args:
+        resume_texts (list): The résumés to score.
+        job_data (dict): The job to score them against.
+
+    Returns:
+        list: One score per résumé, in the same order (None where scoring failed).
+    """
+    if len(resume_texts) <= 1:
+        return [get_openai_score(resume_text, job_data) for resume_text in resume_texts]
+
+    max_tokens_per_resume = config.scoring_batch_token_budget // len(resume_texts)
+    batch_scores = get_openai_batch_scores(
+        {
+            f"C{number}": compact_resume_text(resume_text, max_tokens_per_resume)
+            for number, resume_text in enumerate(resume_texts, start=1)
+        },
+        job_data,
+    )
+
+    scores = []
+    for number, resume_text in enumerate(resume_texts, start=1):
+        score = batch_scores.get(f"C{number}")
+        if score is None:
+            # The model skipped this candidate, so score it on its own
+            score = get_openai_score(resume_text, job_data)
+        scores.append(score)
+
+    return scores
+
+
+def get_openai_batch_scores(resumes_by_id, job_data):
+    """
+    Scores several résumés in a single OpenAI request. The job context is sent
+    once and the model submits one score per candidate ID in a single call.
+
+    Args:
+        resumes_by_id (dict): Candidate ID to compacted résumé text.
+        job_data (dict): The job to score the candidates against.
+
+    Returns:
+        dict: Candidate ID to score, for the candidates the model actually scored.
+    """
+    submit_scores_tool = build_strict_tool(
+        "submit_scores",
+        "Submit the score of every candidate based on the provided algorithm",
+        {
+            "scores": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "candidate_id": {
+                            "type": "string",
+                            "enum": list(resumes_by_id.keys()),
+                            "description": "The ID of the candidate being scored",
+                        },
+                        "score": {
+                            "type": "number",
+                            "description": "Number between 0 and 100",
+                        },
+                    },
+                    "required": ["candidate_id", "score"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+    )
 
+    system_prompt = f"""{build_scoring_context(job_data)}
 **Instructions:**
-1. **Analyze the candidate's résumé in detail**, considering each of the above categories.
-2. **Ensure that the candidate receives a score that accurately reflects their suitability for the role.**
-3. **Always call the function tool: `score_candidate(<your_total_score>)`**
+1. You will receive {len(resumes_by_id)} résumés. Each one starts with a line `### Candidate <candidate_id>`.
+2. **Analyze each candidate's résumé in detail on its own**, considering each of the above categories. Do not rank candidates against each other.
+3. **Ensure that each candidate receives a score that accurately reflects their suitability for the role.**
+4. **Call the function tool `submit_scores` once, with one `candidate_id` and `score` entry for every candidate.**
 """
 
-    return generate_score(system_prompt, resume_text, score_candidate_tool)
+    user_prompt = "\n\n".join(
+        f"### Candidate {candidate_id}\n{resume_text}"
+        for candidate_id, resume_text in resumes_by_id.items()
+    )
 
+    answer = call_openai_api(
+        system_prompt,
+        user_prompt,
+        tools=[submit_scores_tool],
+        tool_choice="submit_scores",
+    )
 
-def generate_score(system_prompt, resume_text, score_candidate_tool):
-    answer = call_openai_api(system_prompt, resume_text, tools=[score_candidate_tool])
+    scores = {}
+    arguments = get_tool_arguments(answer) or {}
+    for entry in arguments.get("scores") or []:
+        candidate_id = entry.get("candidate_id")
+        score = parse_score(entry)
+        if candidate_id in resumes_by_id and score is not None:
+            scores[candidate_id] = score
 
-    if not answer:
-        return None
+    missing_ids = resumes_by_id.keys() - scores.keys()
+    if missing_ids:
+        print(f"Batch scoring missed candidates: {', '.join(sorted(missing_ids))}")
 
-    if not answer.tool_calls:
-        textual_answer = answer.content
-        score = extract_score(textual_answer)
-        return score
+    return scores
 
-    return json.loads(answer.tool_calls[0].function.arguments).get("score")
 
+def compact_resume_text(resume_text, max_tokens):
+    """
+    Shrinks a résumé to fit a token budget, keeping its scoring-relevant
+    sections first (see resume_sections.compact_resume_sections).
+    """
+    return compact_resume_sections(resume_text, max_tokens)
 
-def extract_score(text):
-    def _extract_score_from_json(text):
-        # Regex to find JSON code blocks
-        json_block_pattern = r"```json\s*(\{.*?\})\s*```"
-        matches = re.findall(json_block_pattern, text, re.DOTALL | re.IGNORECASE)
 
-        for json_str in matches:
-            try:
-                data = json.loads(json_str)
-                # Navigate through the JSON structure to find 'score'
-                # This path may vary; adjust accordingly
-                score = data
-                keys = ["parameters", "score"]
-                for key in keys:
-                    score = score.get(key, {})
-                if isinstance(score, int):
-                    return score
-            except json.JSONDecodeError:
-                continue  # If JSON is invalid, skip to the next match
-            except AttributeError:
-                continue  # If path does not exist, skip
+def generate_score(system_prompt, resume_text, score_candidate_tool):
+    answer = call_openai_api(
+        system_prompt,
+        resume_text,
+        tools=[score_candidate_tool],
+        tool_choice=score_candidate_tool["function"]["name"],
+    )
+    return parse_score(get_tool_arguments(answer))
+
 
+def parse_score(arguments):
+    """
+    Returns the score in the arguments of a scoring tool call, or None if it is
+    missing or outside 0 to 100.
+    """
+    score = arguments.get("score") if isinstance(arguments, dict) else None
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
         return None
+    return score if 0 <= score <= 100 else None
+
 
-    # Strategy 1: Look for JSON code blocks and parse them
-    json_score = _extract_score_from_json(text)
-    if json_score is not None:
-        return json_score
-
-    # Strategy 2: Use regex to find patterns like "score of X" or '"score": X'
-    regex_patterns = [
-        r"score\s*(?:of|:)\s*(\d+)",  # e.g., "score of 40" or "score: 40"
-        r"score\s*is\s*(\d+)",  # e.g., "score is 40"
-        r"score\s*=\s*(\d+)",  # e.g., "score = 40"
-        r'"score"\s*:\s*(\d+)',  # e.g., '"score": 40'
-        r"score\s*\(\s*(\d+)\s*\)",  # e.g., 'score(40)'
-    ]
-
-    for pattern in regex_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-
-    # Strategy 3: As a last resort, find standalone numbers near the word "score"
-    fallback_pattern = r"score.*?(\d{1,3})"
-    match = re.search(fallback_pattern, text, re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-
-    # If all strategies fail, raise an error
-    raise ValueError("No numeric score found in the provided text.")
-
-
-def save_scored_candidates(scored_candidates, job_data):
-    output_dir = "output/scored_candidates"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(
-        output_dir,
+def get_result_file(job_data):
+    return os.path.join(
+        config.output_dir,
+        "scored_candidates",
         f"{sanitize_filename(job_data.get('company'))}_{sanitize_filename(job_data.get('position'))}_scored_candidates.csv",
     )
-    scored_candidates = sorted(
-        scored_candidates, key=lambda x: x.get("final_score", 0), reverse=True
-    )
-    if scored_candidates:
-        fieldnames = list(scored_candidates[0].keys())
 
-        with open(output_file, "w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(scored_candidates)
+
+def open_result_sink(job_data, fieldnames, replaced_filenames=None):
+    output_file = get_result_file(job_data)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    return ScoredCandidatesSink(
+        output_file,
+        list(dict.fromkeys([*fieldnames, *match_columns])),
+        shortlist_size=config.shortlist_size,
+        run_size=config.sort_run_size,
+        replaced_filenames=replaced_filenames,
+    )
 
 
 def sanitize_filename(filename):
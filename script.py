@@ -1,42 +1,36 @@
+import time
+
+# Measured from here by the startup report (python startup_report.py)
+started_at = time.perf_counter()
+
+import multiprocessing
 import sys
-import pandas as pd
 
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
-from process_resumes import process_resumes
-from process_job_descriptions import process_job_descriptions
-from score_candidates import score_candidates
 from display_ui import DisplayUI
-
-folder_containing_resumes = "./resumes"
-folder_containing_job_descriptions = "./job_descriptions"
+from startup_report import is_profiling_startup, record_window_shown
 
 
-def start_processing():
-    processed_resumes_file = process_resumes(folder_containing_resumes)
-    if not processed_resumes_file:
-        print("No resumes processed")
-        return
-    processed_job_descriptions_file = process_job_descriptions(
-        folder_containing_job_descriptions
-    )
-    if not processed_job_descriptions_file:
-        print("No job descriptions processed")
-        return
+def start_processing(resume_paths=None, job_description_paths=None):
+    # Imported on the first run rather than at startup: parsing, OCR, OpenAI
+    # and NumPy take seconds to load, and the window doesn't need them
+    from processing import start_processing
 
-    # Read the CSV file
-    df = pd.read_csv(processed_job_descriptions_file)
-
-    # Iterate through each job description
-    for index, row in df.iterrows():
-        job_data = row.to_dict()
-        score_candidates(job_data, processed_resumes_file)
+    return start_processing(resume_paths, job_description_paths)
 
 
 if __name__ == "__main__":
+    # The PDF parsing process pool needs this in frozen builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
 
     # Create the DisplayUI instance and pass the start_processing function
     window = DisplayUI(start_processing)
     window.show()
 
+    if is_profiling_startup():
+        # Runs once the event loop has shown the window
+        QTimer.singleShot(0, lambda: (record_window_shown(started_at), app.quit()))
+
     sys.exit(app.exec())
@@ -0,0 +1,156 @@
+import argparse
+import config
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Modules only needed once processing starts, which must not slow down the window
+deferred_modules = [
+    "numpy",
+    "pandas",
+    "openai",
+    "pdfminer",
+    "pdf2image",
+    "pytesseract",
+    "PIL",
+]
+
+# Environment variable naming the file a profiled start writes its timings to
+report_path_variable = "AUTOMATCH_STARTUP_REPORT"
+
+
+def is_profiling_startup():
+    return bool(os.environ.get(report_path_variable))
+
+
+def record_window_shown(started_at):
+    """
+    Writes the time the window took to show, and the deferred modules already
+    loaded by then, to the file named by AUTOMATCH_STARTUP_REPORT.
+
+    Args:
+        started_at (float): time.perf_counter() when the application started.
+    """
+    report = {
+        "shown_at": time.time(),
+        "seconds_to_show": time.perf_counter() - started_at,
+        "loaded_deferred_modules": [
+            name for name in deferred_modules if name in sys.modules
+        ],
+    }
+    with open(os.environ[report_path_variable], "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+def summarize_import_times(importtime_output):
+    """
+    Adds up the output of python -X importtime by top-level package.
+
+    Returns:
+        dict: Package -> seconds spent importing its modules.
+    """
+    package_seconds = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        package = module.strip().split(".")[0]
+        package_seconds[package] = package_seconds.get(package, 0) + int(self_us) / 1e6
+    return package_seconds
+
+
+def profile_startup(command, timeout):
+    """
+    Starts the application, which quits as soon as its window has shown.
+
+    Returns:
+        tuple: The report the application wrote (with "launch_to_show", the
+        seconds from launching the process to the window showing, added) and
+        the seconds spent importing each top-level package.
+    """
+    with tempfile.TemporaryDirectory() as report_dir:
+        report_path = os.path.join(report_dir, "startup.json")
+        env = dict(os.environ, **{report_path_variable: report_path})
+        launched_at = time.time()
+        completed = subprocess.run(
+            command,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+        if not os.path.exists(report_path):
+            raise RuntimeError(
+                f"The application exited with status {completed.returncode} "
+                f"before its window showed:\n{completed.stderr[-2000:]}"
+            )
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+
+    report["launch_to_show"] = report["shown_at"] - launched_at
+    return report, summarize_import_times(completed.stderr)
+
+
+def main(argv=None):
+    """
+    Prints how long the window takes to show and where the import time goes,
+    and fails when startup is over budget or loads a deferred module.
+
+    Returns:
+        int: The exit status: 0 within budget, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(
+        description="Time the window's startup and check it against its budget."
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=config.startup_time_budget,
+        help="Most seconds from launch to the window showing (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=15,
+        help="Packages listed in the import time breakdown (default: %(default)s)",
+    )
+    parser.add_argument("--timeout", type=float, default=120, help=argparse.SUPPRESS)
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="How to start the application, e.g. dist/script.exe for the "
+        "packaged build, which reports no import times "
+        "(default: python -X importtime script.py)",
+    )
+    args = parser.parse_args(argv)
+
+    command = args.command or [sys.executable, "-X", "importtime", "script.py"]
+    report, package_seconds = profile_startup(command, args.timeout)
+
+    if package_seconds:
+        print(f"Import time: {sum(package_seconds.values()):.3f}s")
+        ranked = sorted(package_seconds.items(), key=lambda x: x[1], reverse=True)
+        for package, seconds in ranked[: args.top]:
+            print(f"  {seconds:8.3f}s  {package}")
+    print(f"Process launch to window shown: {report['launch_to_show']:.3f}s")
+    print(f"Python start to window shown: {report['seconds_to_show']:.3f}s")
+
+    within_budget = True
+    if report["launch_to_show"] > args.budget:
+        print(f"Over the startup budget of {args.budget:.3f}s")
+        within_budget = False
+    if report["loaded_deferred_modules"]:
+        print(
+            "Loaded before the window showed: "
+            + ", ".join(report["loaded_deferred_modules"])
+        )
+        within_budget = False
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
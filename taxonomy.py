@@ -0,0 +1,673 @@
+from openai_api import build_strict_tool, call_openai_api, get_tool_arguments
+
+# Industry grid: I1 -> I2 -> I3 options
+industry_grid = {
+    "Digital": {
+        "Cloud": ["SaaS", "XaaS", "Security", "Consulting"],
+        "Platform": [
+            "e-commerce",
+            "Marketplace",
+            "AdTech",
+            "Subscription",
+            "Gaming",
+            "FinTech",
+            "Web3",
+        ],
+    },
+    "Physical": {
+        "Robotics": [
+            "Mobility",
+            "Space",
+            "VR&AR",
+            "Smart Cities",
+            "Robots",
+            "3D Printing",
+        ],
+        "Semicon": ["Telco", "Data Center", "Chip Design", "Fabrication", "Quantum"],
+        "Energy": ["Solar", "Nuclear", "Hydrogen", "Batteries", "Charging"],
+    },
+    "Consulting": {
+        "Strategy": ["Strategy", "Management"],
+        "Corporate": ["HR", "Accounting", "Marketing", "Research"],
+    },
+}
+
+# Suggested I4 keywords of each industry grid row
+industry_tags = {
+    ("Digital", "Cloud"): [
+        "Sales",
+        "Marketing",
+        "Analytics",
+        "Network",
+        "Security Eng",
+        "Design",
+        "HR",
+        "Finance",
+        "Cloud Compute",
+        "AI",
+        "Data",
+        "Other",
+    ],
+    ("Digital", "Platform"): [
+        "Food Delivery",
+        "Logistics",
+        "EdTech",
+        "TravelTech",
+        "Social Media",
+        "Chatapps",
+        "Payments",
+        "Insurtech",
+        "Exchange",
+        "Blockchain",
+    ],
+    ("Physical", "Robotics"): [
+        "Autonomus Driving",
+        "Robots",
+        "Satellites",
+        "Launch",
+    ],
+    ("Physical", "Semicon"): ["Licensing", "inhouse"],
+    ("Physical", "Energy"): ["Materials"],
+    ("Consulting", "Strategy"): ["MBB", "Big Consutling", "Other"],
+    ("Consulting", "Corporate"): [],
+}
+
+# Function grid: F1 -> F2 -> F3 options
+function_grid = {
+    "GTM": {
+        "Sales": [
+            "AE",
+            "BDM",
+            "CSM",
+            "Inside Sales",
+            "SE",
+            "Partner",
+            "Consultant",
+            "Other",
+        ],
+        "Marketing": [
+            "Digital",
+            "Field",
+            "Community",
+            "PR",
+            "Comms",
+            "Growth",
+            "Social",
+            "Content",
+        ],
+        "Consulting/PS": [
+            "Delivery",
+            "Implementation",
+            "Customer Success",
+            "TAM",
+            "Pre-sales",
+        ],
+        "Operations": [
+            "Strategy",
+            "CS",
+            "Analytics",
+            "Product",
+            "Project",
+            "Procurement",
+            "Supply Chain",
+        ],
+    },
+    "Corporate": {
+        "Finance & Accounting": ["FP&A", "Compensation", "M&A"],
+        "HR & Admin": [
+            "HRBP",
+            "Recruiting",
+            "Office Manager",
+            "Onboarding",
+            "Training",
+        ],
+        "Legal & Compliance": ["Legal", "Compilance", "GR", "Policy"],
+        "Internal IT": ["IT Support", "Onboarding"],
+    },
+    "Product & Eng": {
+        "Computer Science": ["Product", "UX", "SWE", "QA", "DevOps"],
+        "Physics": ["Electrical", "Mechanical", "Embedded"],
+    },
+}
+
+# Phrases that point at a grid leaf, matched as whole words in lowercase text.
+# Leaves without phrases (e.g. "Other") are only ever assigned by OpenAI.
+industry_keywords = {
+    ("Digital", "Cloud", "SaaS"): [
+        "saas",
+        "software as a service",
+        "b2b software",
+        "subscription software",
+    ],
+    ("Digital", "Cloud", "XaaS"): [
+        "iaas",
+        "paas",
+        "infrastructure as a service",
+        "platform as a service",
+        "aws",
+        "azure",
+        "google cloud",
+        "gcp",
+        "cloud infrastructure",
+    ],
+    ("Digital", "Cloud", "Security"): [
+        "cybersecurity",
+        "cyber security",
+        "information security",
+        "endpoint security",
+        "zero trust",
+        "siem",
+    ],
+    ("Digital", "Cloud", "Consulting"): [
+        "cloud consulting",
+        "cloud migration",
+        "systems integrator",
+        "system integrator",
+    ],
+    ("Digital", "Platform", "e-commerce"): [
+        "e-commerce",
+        "ecommerce",
+        "online retail",
+        "shopify",
+    ],
+    ("Digital", "Platform", "Marketplace"): [
+        "marketplace",
+        "two-sided",
+        "gig economy",
+    ],
+    ("Digital", "Platform", "AdTech"): [
+        "adtech",
+        "ad tech",
+        "programmatic",
+        "ad network",
+        "advertising technology",
+    ],
+    ("Digital", "Platform", "Subscription"): [
+        "subscription service",
+        "streaming service",
+        "subscription platform",
+    ],
+    ("Digital", "Platform", "Gaming"): [
+        "gaming",
+        "game studio",
+        "video game",
+        "mobile games",
+        "esports",
+    ],
+    ("Digital", "Platform", "FinTech"): [
+        "fintech",
+        "neobank",
+        "digital banking",
+        "payment platform",
+        "lending platform",
+    ],
+    ("Digital", "Platform", "Web3"): [
+        "web3",
+        "blockchain",
+        "crypto",
+        "cryptocurrency",
+        "defi",
+        "nft",
+    ],
+    ("Physical", "Robotics", "Mobility"): [
+        "autonomous driving",
+        "electric vehicle",
+        "automotive",
+        "adas",
+    ],
+    ("Physical", "Robotics", "Space"): [
+        "satellite",
+        "spacecraft",
+        "launch vehicle",
+        "aerospace",
+    ],
+    ("Physical", "Robotics", "VR&AR"): [
+        "virtual reality",
+        "augmented reality",
+        "mixed reality",
+        "ar/vr",
+        "vr/ar",
+    ],
+    ("Physical", "Robotics", "Smart Cities"): [
+        "smart city",
+        "smart cities",
+        "urban tech",
+    ],
+    ("Physical", "Robotics", "Robots"): [
+        "robotics",
+        "robot",
+        "robots",
+        "industrial automation",
+        "cobot",
+    ],
+    ("Physical", "Robotics", "3D Printing"): [
+        "3d printing",
+        "additive manufacturing",
+    ],
+    ("Physical", "Semicon", "Telco"): [
+        "telecom",
+        "telecommunications",
+        "telco",
+        "5g",
+        "mobile network operator",
+    ],
+    ("Physical", "Semicon", "Data Center"): [
+        "data center",
+        "data centre",
+        "colocation",
+        "hyperscale",
+    ],
+    ("Physical", "Semicon", "Chip Design"): [
+        "chip design",
+        "asic",
+        "fpga",
+        "vlsi",
+        "eda",
+    ],
+    ("Physical", "Semicon", "Fabrication"): [
+        "wafer",
+        "semiconductor manufacturing",
+        "lithography",
+        "foundry",
+    ],
+    ("Physical", "Semicon", "Quantum"): [
+        "quantum computing",
+        "qubit",
+        "qubits",
+    ],
+    ("Physical", "Energy", "Solar"): ["solar", "photovoltaic"],
+    ("Physical", "Energy", "Nuclear"): ["nuclear", "fission", "fusion energy"],
+    ("Physical", "Energy", "Hydrogen"): ["hydrogen", "fuel cell", "electrolyzer"],
+    ("Physical", "Energy", "Batteries"): [
+        "battery",
+        "batteries",
+        "lithium-ion",
+        "energy storage",
+    ],
+    ("Physical", "Energy", "Charging"): [
+        "ev charging",
+        "charging station",
+        "charging infrastructure",
+    ],
+    ("Consulting", "Strategy", "Strategy"): [
+        "strategy consulting",
+        "strategy consultant",
+        "mckinsey",
+        "bcg",
+        "bain",
+    ],
+    ("Consulting", "Strategy", "Management"): [
+        "management consulting",
+        "management consultant",
+        "accenture",
+        "deloitte",
+        "pwc",
+        "kpmg",
+    ],
+    ("Consulting", "Corporate", "HR"): [
+        "hr consulting",
+        "human resources consulting",
+        "people advisory",
+    ],
+    ("Consulting", "Corporate", "Accounting"): [
+        "audit firm",
+        "accounting firm",
+        "tax advisory",
+    ],
+    ("Consulting", "Corporate", "Marketing"): [
+        "marketing agency",
+        "advertising agency",
+        "brand consultancy",
+    ],
+    ("Consulting", "Corporate", "Research"): [
+        "market research",
+        "research firm",
+    ],
+}
+
+function_keywords = {
+    ("GTM", "Sales", "AE"): [
+        "account executive",
+        "enterprise sales",
+        "quota",
+    ],
+    ("GTM", "Sales", "BDM"): [
+        "business development manager",
+        "business development",
+        "bdm",
+    ],
+    ("GTM", "Sales", "CSM"): ["customer success manager", "csm"],
+    ("GTM", "Sales", "Inside Sales"): [
+        "inside sales",
+        "sales development",
+        "sdr",
+        "bdr",
+    ],
+    ("GTM", "Sales", "SE"): [
+        "sales engineer",
+        "solutions engineer",
+        "solution engineer",
+    ],
+    ("GTM", "Sales", "Partner"): [
+        "channel sales",
+        "partner manager",
+        "alliances",
+        "channel partner",
+    ],
+    ("GTM", "Sales", "Consultant"): ["sales consultant"],
+    ("GTM", "Marketing", "Digital"): [
+        "digital marketing",
+        "performance marketing",
+        "paid media",
+        "seo",
+        "sem",
+    ],
+    ("GTM", "Marketing", "Field"): ["field marketing", "event marketing"],
+    ("GTM", "Marketing", "Community"): [
+        "community manager",
+        "community management",
+        "developer relations",
+        "devrel",
+    ],
+    ("GTM", "Marketing", "PR"): ["public relations", "media relations"],
+    ("GTM", "Marketing", "Comms"): [
+        "corporate communications",
+        "internal communications",
+    ],
+    ("GTM", "Marketing", "Growth"): [
+        "growth marketing",
+        "growth hacking",
+        "user acquisition",
+    ],
+    ("GTM", "Marketing", "Social"): ["social media marketing", "social media manager"],
+    ("GTM", "Marketing", "Content"): [
+        "content marketing",
+        "content strategy",
+        "copywriting",
+    ],
+    ("GTM", "Consulting/PS", "Delivery"): ["delivery manager", "service delivery"],
+    ("GTM", "Consulting/PS", "Implementation"): [
+        "implementation consultant",
+        "implementation manager",
+        "implementation specialist",
+    ],
+    ("GTM", "Consulting/PS", "Customer Success"): ["customer success"],
+    ("GTM", "Consulting/PS", "TAM"): ["technical account manager"],
+    ("GTM", "Consulting/PS", "Pre-sales"): ["pre-sales", "presales"],
+    ("GTM", "Operations", "Strategy"): [
+        "strategy and operations",
+        "bizops",
+        "business operations",
+    ],
+    ("GTM", "Operations", "CS"): [
+        "customer support",
+        "customer service",
+        "support operations",
+    ],
+    ("GTM", "Operations", "Analytics"): [
+        "data analyst",
+        "business analyst",
+        "business intelligence",
+    ],
+    ("GTM", "Operations", "Product"): ["product operations"],
+    ("GTM", "Operations", "Project"): [
+        "project manager",
+        "project management",
+        "pmo",
+    ],
+    ("GTM", "Operations", "Procurement"): ["procurement", "purchasing"],
+    ("GTM", "Operations", "Supply Chain"): ["supply chain", "demand planning"],
+    ("Corporate", "Finance & Accounting", "FP&A"): [
+        "fp&a",
+        "financial planning",
+        "budgeting",
+    ],
+    ("Corporate", "Finance & Accounting", "Compensation"): [
+        "payroll",
+        "total rewards",
+    ],
+    ("Corporate", "Finance & Accounting", "M&A"): [
+        "m&a",
+        "mergers and acquisitions",
+        "corporate development",
+    ],
+    ("Corporate", "HR & Admin", "HRBP"): [
+        "hrbp",
+        "hr business partner",
+        "human resources business partner",
+    ],
+    ("Corporate", "HR & Admin", "Recruiting"): [
+        "recruiter",
+        "recruiting",
+        "talent acquisition",
+    ],
+    ("Corporate", "HR & Admin", "Office Manager"): [
+        "office manager",
+        "office administration",
+    ],
+    ("Corporate", "HR & Admin", "Onboarding"): ["employee onboarding"],
+    ("Corporate", "HR & Admin", "Training"): [
+        "learning and development",
+        "l&d",
+        "training manager",
+    ],
+    ("Corporate", "Legal & Compliance", "Legal"): [
+        "legal counsel",
+        "general counsel",
+        "lawyer",
+        "attorney",
+    ],
+    ("Corporate", "Legal & Compliance", "Compilance"): [
+        "compliance officer",
+        "regulatory compliance",
+        "aml",
+        "kyc",
+    ],
+    ("Corporate", "Legal & Compliance", "GR"): [
+        "government relations",
+        "public affairs",
+    ],
+    ("Corporate", "Legal & Compliance", "Policy"): ["public policy", "policy manager"],
+    ("Corporate", "Internal IT", "IT Support"): [
+        "it support",
+        "helpdesk",
+        "help desk",
+        "service desk",
+    ],
+    ("Corporate", "Internal IT", "Onboarding"): [
+        "it onboarding",
+        "device provisioning",
+    ],
+    ("Product & Eng", "Computer Science", "Product"): [
+        "product manager",
+        "product management",
+        "product owner",
+    ],
+    ("Product & Eng", "Computer Science", "UX"): [
+        "ux",
+        "user experience",
+        "product designer",
+    ],
+    ("Product & Eng", "Computer Science", "SWE"): [
+        "software engineer",
+        "software developer",
+        "backend engineer",
+        "frontend engineer",
+        "full stack",
+    ],
+    ("Product & Eng", "Computer Science", "QA"): [
+        "qa engineer",
+        "quality assurance",
+        "test automation",
+    ],
+    ("Product & Eng", "Computer Science", "DevOps"): [
+        "devops",
+        "site reliability",
+        "sre",
+        "kubernetes",
+    ],
+    ("Product & Eng", "Physics", "Electrical"): [
+        "electrical engineer",
+        "circuit design",
+        "pcb",
+    ],
+    ("Product & Eng", "Physics", "Mechanical"): [
+        "mechanical engineer",
+        "solidworks",
+    ],
+    ("Product & Eng", "Physics", "Embedded"): [
+        "embedded",
+        "firmware",
+        "rtos",
+    ],
+}
+
+# Language levels, from strongest to weakest
+language_levels = ["Native", "Fluent", "Business", "Reading/Writing", "None"]
+
+# Everything the prompts, tool schemas and local labeler need to know about each grid
+grids = {
+    "industry": {
+        "name": "Industry",
+        "prefix": "I",
+        "grid": industry_grid,
+        "keywords": industry_keywords,
+        "tags": industry_tags,
+    },
+    "function": {
+        "name": "Function",
+        "prefix": "F",
+        "grid": function_grid,
+        "keywords": function_keywords,
+    },
+}
+
+# How each kind of document is described in the label prompts
+document_subjects = {
+    "resume": ("candidate information from a resume", "candidate"),
+    "job_description": ("information from a job description", "job"),
+}
+
+# Separates the levels of a grid path in the label tool, e.g. "Digital > Cloud > SaaS"
+path_separator = " > "
+
+
+def iter_grid_leaves(grid):
+    """
+    Yields every (level 1, level 2, level 3) path of a grid.
+    """
+    for level_1, level_2_options in grid.items():
+        for level_2, level_3_options in level_2_options.items():
+            for level_3 in level_3_options:
+                yield level_1, level_2, level_3
+
+
+def format_grid(grid_name):
+    """
+    Returns the grid as prompt lines, e.g.
+    "I1: Digital; I2: Cloud; I3: SaaS, XaaS, Security, Consulting; I4: Sales, ...".
+    """
+    grid = grids[grid_name]
+    prefix = grid["prefix"]
+    lines = []
+    for level_1, level_2_options in grid["grid"].items():
+        for level_2, level_3_options in level_2_options.items():
+            line = (
+                f"{prefix}1: {level_1}; {prefix}2: {level_2}; "
+                f"{prefix}3: {', '.join(level_3_options)}"
+            )
+            tags = grid.get("tags", {}).get((level_1, level_2))
+            if tags:
+                line += f"; {prefix}4: {', '.join(tags)}"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def build_grid_labels_tool(grid_name, document_kind):
+    """
+    Builds the strict tool for labeling a document with a grid. The row and
+    option are a single enum of every valid grid path, so the model cannot
+    return a label outside the grid or mix options from different rows.
+    """
+    grid = grids[grid_name]
+    prefix = grid["prefix"]
+    _, subject = document_subjects[document_kind]
+    return build_strict_tool(
+        f"submit_{subject}_{grid_name}_labels",
+        f"Submit {grid_name} labels for the {subject}",
+        {
+            "path": {
+                "type": "string",
+                "enum": [
+                    path_separator.join(leaf) for leaf in iter_grid_leaves(grid["grid"])
+                ],
+                "description": f"The {prefix}1{path_separator}{prefix}2"
+                f"{path_separator}{prefix}3 labels that fit best",
+            },
+            f"{prefix}4": {
+                "type": "string",
+                "description": "Comma-separated English keywords for better sorting",
+            },
+        },
+    )
+
+
+def build_grid_labels_prompt(grid_name, document_kind):
+    grid = grids[grid_name]
+    prefix = grid["prefix"]
+    description, subject = document_subjects[document_kind]
+    tool_name = build_grid_labels_tool(grid_name, document_kind)["function"]["name"]
+    level_2, level_3_options = next(iter(next(iter(grid["grid"].values())).items()))
+    return f"""
+You are a helpful assistant evaluating {description}.
+Use the function '{tool_name}' to provide the {subject}'s {grid_name} labels.
+Reference the following {grid["name"]} grid and select the best fit option.
+Select one at a time starting from {prefix}1, then selecting one of the options from {prefix}2, then from {prefix}3. {prefix}4 is free space for GPT to tag English keywords for better sorting.
+You cannot change rows. For example, anyone in {prefix}2 {level_2} must be in {", ".join(level_3_options)} for {prefix}3.
+Submit the chosen row and option as a single path, e.g. "{path_separator.join(next(iter_grid_leaves(grid["grid"])))}".
+{format_grid(grid_name)}
+"""
+
+
+def parse_grid_labels(grid_name, arguments):
+    """
+    Validates the arguments of a grid labels tool call against the grid.
+
+    Returns:
+        dict: The four grid labels (e.g. I1 to I4), or None if the path is not
+        in the grid.
+    """
+    grid = grids[grid_name]
+    prefix = grid["prefix"]
+    if not isinstance(arguments, dict) or not isinstance(arguments.get("path"), str):
+        return None
+
+    leaf = tuple(arguments["path"].split(path_separator))
+    if leaf not in set(iter_grid_leaves(grid["grid"])):
+        return None
+
+    labels = {f"{prefix}{level}": label for level, label in enumerate(leaf, 1)}
+    labels[f"{prefix}4"] = str(arguments.get(f"{prefix}4") or "")
+    return labels
+
+
+def generate_grid_labels(grid_name, text, document_kind):
+    """
+    Labels a résumé or job description with a grid through OpenAI.
+
+    Args:
+        grid_name (str): "industry" or "function".
+        text (str): The document text.
+        document_kind (str): "resume" or "job_description".
+
+    Returns:
+        dict: The four grid labels, or None if OpenAI returned no valid labels.
+    """
+    tool = build_grid_labels_tool(grid_name, document_kind)
+    answer = call_openai_api(
+        system_prompt=build_grid_labels_prompt(grid_name, document_kind),
+        user_prompt=text,
+        tools=[tool],
+        tool_choice=tool["function"]["name"],
+    )
+    return parse_grid_labels(grid_name, get_tool_arguments(answer))
@@ -0,0 +1,29 @@
+from lexical_index import BM25Index, tokenize
+
+japanese_resumes = [
+    "株式会社サンプルで法人営業を担当。新規開拓とSaaSの提案営業で売上目標を達成。",
+    "経理部にて月次決算、年次決算、税務申告を担当。連結決算の経験あり。",
+    "ソフトウェアエンジニアとしてクラウド基盤の設計と運用を担当。",
+]
+
+
+def test_tokenize_splits_japanese_into_bigrams():
+    tokens = tokenize("株式会社サンプルで法人営業を担当")
+
+    assert "法人" in tokens
+    assert "営業" in tokens
+    assert "担当" in tokens
+    assert "株式会社サンプルで法人営業を担当" not in tokens
+
+
+def test_tokenize_keeps_latin_words_next_to_japanese():
+    assert tokenize("SaaS営業とＣ＋＋開発") == ["saas", "営業", "業と", "c++", "開発"]
+
+
+def test_bm25_ranks_japanese_resumes():
+    index = BM25Index(japanese_resumes)
+
+    scores = index.relative_scores("法人営業（SaaS）の経験者を募集")
+
+    assert scores[0] == 1.0
+    assert scores[0] > scores[1] > scores[2] == 0
@@ -0,0 +1,28 @@
+from near_duplicates import NearDuplicateIndex, get_shingles
+
+japanese_resume = (
+    "職務経歴書 山田太郎。株式会社サンプルにて法人営業を担当し、新規開拓と既存顧客の"
+    "深耕を行う。SaaS製品の提案営業で三年連続売上目標を達成。チームリーダーとして"
+    "五名の部下を育成し、営業プロセスの改善に取り組んだ。英語でのビジネス会話が可能。"
+)
+
+
+def test_get_shingles_uses_characters_for_japanese():
+    shingles = get_shingles(japanese_resume)
+
+    assert len(shingles) > 100
+    assert "法 人 営 業 を" in shingles
+
+
+def test_finds_updated_japanese_resume():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("original", index.hasher.signature(japanese_resume))
+
+    updated = japanese_resume.replace("三年連続", "四年連続")
+    other = (
+        "職務経歴書 佐藤花子。経理部にて月次決算と年次決算、税務申告を担当。連結決算や"
+        "監査対応の経験があり、会計システムの導入プロジェクトにも参加した。簿記一級。"
+    )
+
+    assert index.find(index.hasher.signature(updated))[0] == "original"
+    assert index.find(index.hasher.signature(other)) is None
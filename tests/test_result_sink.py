@@ -0,0 +1,32 @@
+import csv
+
+from result_sink import ScoredCandidatesSink
+
+
+def write_results(output_file, scores, **sink_options):
+    sink = ScoredCandidatesSink(
+        str(output_file), ["filename", "final_score"], **sink_options
+    )
+    for filename, final_score in scores.items():
+        sink.add({"filename": filename, "final_score": final_score})
+    sink.finalize()
+    with open(output_file, encoding="utf-8", newline="") as f:
+        return [
+            (row["filename"], float(row["final_score"])) for row in csv.DictReader(f)
+        ]
+
+
+def test_merges_new_rows_into_written_results(tmp_path):
+    output_file = tmp_path / "job_scored_candidates.csv"
+    write_results(output_file, {"a.pdf": 80, "b.pdf": 50, "c.pdf": 20})
+
+    rows = write_results(
+        output_file,
+        {"d.pdf": 60, "b.pdf": 10},
+        shortlist_size=2,
+        replaced_filenames={"d.pdf", "b.pdf"},
+    )
+
+    assert rows == [("a.pdf", 80), ("d.pdf", 60), ("c.pdf", 20), ("b.pdf", 10)]
+    with open(tmp_path / "job_scored_candidates_shortlist.csv", encoding="utf-8") as f:
+        assert [row["filename"] for row in csv.DictReader(f)] == ["a.pdf", "d.pdf"]
@@ -0,0 +1,42 @@
+import mmap
+import os
+
+
+class TextBlob:
+    """
+    Append-only file holding document texts back to back as UTF-8.
+
+    append() returns the (offset, length) of a text in bytes, which the caller
+    keeps as its index. read() serves texts through a read-only memory map, so
+    only the pages of the texts actually read are loaded into memory.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path, "a+b")
+        self.map = None
+
+    def append(self, text):
+        data = (text or "").encode("utf-8")
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.flush()
+        return offset, len(data)
+
+    def read(self, offset, length):
+        if length == 0:
+            return ""
+        if self.map is None or offset + length > len(self.map):
+            # The file grew since it was mapped, so map it again
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.map[offset : offset + length].decode("utf-8")
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
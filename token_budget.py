@@ -0,0 +1,66 @@
+import re
+
+# Japanese and other CJK characters, which take about one token each
+cjk_pattern = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """
+    Estimates the OpenAI token count of text without a tokenizer: about one
+    token per CJK character and one per 4 characters of anything else.
+    """
+    if not isinstance(text, str):
+        return 0
+    cjk_count = len(cjk_pattern.findall(text))
+    return cjk_count + (len(text) - cjk_count) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Cuts text down to about max_tokens, keeping its beginning.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Shrink proportionally, then trim until the estimate fits
+    end = max(len(text) * max_tokens // max(estimate_tokens(text), 1), 0)
+    while end > 0 and estimate_tokens(text[:end]) > max_tokens:
+        end -= max(1, (end // 20))
+    return text[:end]
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Splits text into consecutive chunks of at most about max_tokens each.
+
+    Chunks break between paragraphs where possible, then between lines, and
+    only cut through a line that is longer than a whole chunk on its own.
+    The same text always produces the same chunks.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            while estimate_tokens(line) > max_tokens:
+                head = truncate_to_tokens(line, max_tokens) or line[:1]
+                pieces.append(head)
+                line = line[len(head) :]
+            pieces.append(line)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece) + 1
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return [chunk for chunk in chunks if chunk.strip()]
@@ -0,0 +1,142 @@
+import config
+import os
+import time
+
+from document_store import get_document_store
+from process_job_descriptions import process_job_descriptions
+from process_resumes import process_resumes
+from processing import folder_containing_job_descriptions, folder_containing_resumes
+from score_candidates import (
+    apply_bucket,
+    open_resume_index,
+    score_candidates,
+    score_new_candidates,
+)
+
+
+class FolderWatcher:
+    """
+    Polls a folder for new or modified PDFs.
+
+    A file is reported once its size and modification time have stayed the
+    same for a whole poll, so a PDF still being copied into the folder is never
+    read half-written. PDFs already in the folder are reported by the second
+    poll, like any new file.
+    """
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        # Path -> (modification time, size) of the versions already reported
+        self.reported = {}
+        # Path -> (modification time, size) seen by the last poll
+        self.last_seen = {}
+
+    def poll(self):
+        """
+        Returns:
+            list: Paths of the PDFs that are new or changed since they were
+            last reported, and stable since the last poll.
+        """
+        seen = {}
+        with os.scandir(self.folder_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    seen[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        changed = []
+        for path, state in seen.items():
+            if self.reported.get(path) != state and self.last_seen.get(path) == state:
+                changed.append(path)
+                self.reported[path] = state
+
+        # Deleted files are reported again if they come back
+        self.reported = {
+            path: self.reported[path] for path in seen if path in self.reported
+        }
+        self.last_seen = seen
+        return sorted(changed)
+
+
+def ingest_changes(resume_paths, job_description_paths):
+    """
+    Adds new and modified PDFs to the stored pool and scores only what they
+    change: new or modified jobs against every stored résumé, and the new
+    résumés against the other jobs they fall into a bucket of, ranked into
+    those jobs' results. A modified PDF replaces the document stored for its
+    earlier version, so a replaced résumé is ranked into every job's results
+    in place of its earlier version.
+
+    Lexical scores are relative to the pool at the time each candidate is
+    scored, so the ones already ranked are not recomputed as the pool grows.
+    """
+    store = get_document_store()
+    started_at = time.monotonic()
+
+    job_description_ids = []
+    if job_description_paths:
+        job_description_ids = process_job_descriptions(job_description_paths)
+        store.delete_replaced_documents("job_description", job_description_ids)
+
+    resume_ids = []
+    replaced_resumes = 0
+    if resume_paths:
+        resume_ids = process_resumes(resume_paths)
+        replaced_resumes = store.delete_replaced_documents("resume", resume_ids)
+
+    new_candidates = store.load_documents("resume", resume_ids, include_text=False)
+    scored_jobs = 0
+    # Built over the pool as it is now, for the affected jobs only
+    resume_index = None
+    for job_data in store.load_documents("job_description"):
+        is_new_job = job_data["document_id"] in job_description_ids
+        is_affected = (
+            is_new_job
+            or replaced_resumes > 0
+            or any(
+                apply_bucket(dict(candidate_data), job_data)["bucket"]
+                for candidate_data in new_candidates
+            )
+        )
+        if not is_affected:
+            continue
+
+        if scored_jobs == 0:
+            resume_index = open_resume_index(None)
+        if is_new_job:
+            score_candidates(job_data, None, resume_index)
+        else:
+            score_new_candidates(job_data, resume_ids, resume_index)
+        scored_jobs += 1
+
+    print(
+        f"Ingested {len(resume_ids)} resumes and {len(job_description_ids)} job "
+        f"descriptions in {time.monotonic() - started_at:.1f}s, "
+        f"updated the results of {scored_jobs} jobs"
+    )
+
+
+def watch_folders(resume_folder, job_description_folder):
+    """
+    Keeps ingesting the PDFs dropped into the résumé and job description
+    folders until interrupted with Ctrl+C.
+    """
+    os.makedirs(resume_folder, exist_ok=True)
+    os.makedirs(job_description_folder, exist_ok=True)
+    resume_watcher = FolderWatcher(resume_folder)
+    job_description_watcher = FolderWatcher(job_description_folder)
+    print(f"Watching {resume_folder} and {job_description_folder} for new PDFs")
+
+    try:
+        while True:
+            resume_paths = resume_watcher.poll()
+            job_description_paths = job_description_watcher.poll()
+            if resume_paths or job_description_paths:
+                ingest_changes(resume_paths, job_description_paths)
+            time.sleep(config.watch_poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+
+if __name__ == "__main__":
+    watch_folders(folder_containing_resumes, folder_containing_job_descriptions)
@@ -0,0 +1,655 @@
+import config
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import types
+import uuid
+
+from datetime import datetime
+from document_store import get_document_store
+from extraction_journal import dedupe_file_paths
+from pdf_parser import parse_pdf_to_text
+from process_job_descriptions import (
+    extract_job_description,
+    open_job_description_journal,
+)
+from process_resumes import extract_candidate_profile, open_resume_journal
+from progress import progress
+from score_candidates import (
+    open_resume_index,
+    score_candidate_subset,
+    score_candidates,
+)
+
+# Stages leased first come first: later stages before earlier ones, so documents
+# finish instead of piling up half processed
+stage_priorities = {"rank": 0, "score": 1, "extract": 2, "parse": 3}
+
+schema = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    error TEXT,
+    updated_at TEXT,
+    UNIQUE (batch, stage, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (status, priority, id);
+CREATE INDEX IF NOT EXISTS tasks_leases ON tasks (status, lease_expires_at);
+CREATE INDEX IF NOT EXISTS tasks_batch ON tasks (batch, status, kind, stage);
+"""
+
+
+def get_task_priority(stage, kind):
+    # Job descriptions go first, so they are stored before the last résumés
+    return stage_priorities[stage] + (len(stage_priorities) if kind == "resume" else 0)
+
+
+class WorkQueue:
+    """
+    Lease-based queue of the tasks of submitted batches, in a SQLite file that
+    every worker process on this machine opens. The queue and the document
+    store are in WAL mode, which needs memory shared between the processes, so
+    workers on other machines can't use them, even through a shared folder.
+
+    Each PDF of a batch is a parse task (PDF to text), then an extract task
+    (text to stored document). Once every PDF is stored, each job gets a score
+    task per chunk of config.work_queue_score_chunk_size résumés, which stores
+    the chunk's matches against the job, so scoring spreads over as many
+    workers as there are chunks. Once every score task is finished each job
+    gets a rank task, which writes the job's results from the stored matches.
+
+    A worker leases one task at a time for config.work_queue_lease_seconds and
+    renews the lease with heartbeats while it works. A task whose lease runs
+    out, because its worker crashed or hung, is leased again by the next
+    worker that asks, up to config.work_queue_max_attempts times. The first
+    result of a task is written together with its follow-up tasks in one
+    transaction and later ones are dropped; what a task stores elsewhere is
+    keyed by content (documents, journal entries, matches, OpenAI scores), so
+    a task run twice stores the same thing twice.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # Heartbeats renew leases from their own thread
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(schema)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # Holds the queue's write lock from the first read, so no other worker
+        # changes the tasks in between
+        with self.lock, self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            yield
+
+    def submit(self, resume_files, job_description_files):
+        """
+        Adds a batch of PDFs to the queue.
+
+        Args:
+            resume_files (list): (file path, file hash) pairs of the résumés.
+            job_description_files (list): (file path, file hash) pairs of the
+                job descriptions.
+
+        Returns:
+            str: The batch ID.
+        """
+        batch = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        with self.transaction():
+            for kind, files in [
+                ("job_description", job_description_files),
+                ("resume", resume_files),
+            ]:
+                self.add_tasks(
+                    batch,
+                    [
+                        (
+                            "parse",
+                            kind,
+                            file_hash,
+                            # Absolute, so workers started in another folder find the file
+                            {
+                                "path": os.path.abspath(file_path),
+                                "file_hash": file_hash,
+                            },
+                        )
+                        for file_path, file_hash in files
+                    ],
+                )
+        return batch
+
+    def add_tasks(self, batch, tasks):
+        # A task already in the batch is kept as it is
+        self.connection.executemany(
+            """
+            INSERT OR IGNORE INTO tasks (batch, stage, kind, key, payload, priority)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    batch,
+                    stage,
+                    kind,
+                    key,
+                    json.dumps(payload),
+                    get_task_priority(stage, kind),
+                )
+                for stage, kind, key, payload in tasks
+            ],
+        )
+
+    def lease(self, worker):
+        """
+        Leases the next task to run: one whose lease expired, or else the
+        pending task of highest priority.
+
+        Returns:
+            dict: The task, or None if no task can be leased right now.
+        """
+        now = time.time()
+        with self.transaction():
+            self.fail_exhausted_tasks(now)
+            row = self.connection.execute(
+                """
+                SELECT * FROM tasks
+                WHERE status = 'leased' AND lease_expires_at < ?
+                ORDER BY priority, id LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                row = self.connection.execute(
+                    """
+                    SELECT * FROM tasks
+                    WHERE status = 'pending'
+                    ORDER BY priority, id LIMIT 1
+                    """
+                ).fetchone()
+            if row is None:
+                return None
+
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'leased', worker = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    worker,
+                    now + config.work_queue_lease_seconds,
+                    datetime.now().isoformat(),
+                    row["id"],
+                ),
+            )
+
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["attempts"] += 1
+        return task
+
+    def fail_exhausted_tasks(self, now):
+        # Tasks whose workers kept dying on them are not leased again
+        rows = self.connection.execute(
+            """
+            SELECT id, batch FROM tasks
+            WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+            """,
+            (now, config.work_queue_max_attempts),
+        ).fetchall()
+        for row in rows:
+            self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'failed', error = 'Lease expired on every attempt',
+                    lease_expires_at = NULL, updated_at = ?
+                WHERE id = ?
+                """,
+                (datetime.now().isoformat(), row["id"]),
+            )
+        for batch in {row["batch"] for row in rows}:
+            self.add_ready_tasks(batch)
+
+    def heartbeat(self, task, worker):
+        """
+        Extends the lease of a task the worker is still running.
+
+        Returns:
+            bool: Whether the worker still holds the lease.
+        """
+        with self.transaction():
+            return (
+                self.connection.execute(
+                    """
+                    UPDATE tasks SET lease_expires_at = ?
+                    WHERE id = ? AND status = 'leased' AND worker = ?
+                    """,
+                    (time.time() + config.work_queue_lease_seconds, task["id"], worker),
+                ).rowcount
+                > 0
+            )
+
+    def complete(self, task, worker, result=None, follow_ups=()):
+        """
+        Records the result of a task and adds its follow-up tasks, unless
+        another worker already finished it.
+
+        Args:
+            task (dict): The leased task.
+            worker (str): The worker that ran it.
+            result (dict): What later tasks need from it, e.g. a document ID.
+            follow_ups (list): (stage, kind, key, payload) of the tasks it adds.
+
+        Returns:
+            bool: Whether this was the first result of the task.
+        """
+        with self.transaction():
+            updated = self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = 'done', result = ?, worker = ?, lease_expires_at = NULL,
+                    error = NULL, updated_at = ?
+                WHERE id = ? AND status IN ('pending', 'leased')
+                """,
+                (
+                    json.dumps(result),
+                    worker,
+                    datetime.now().isoformat(),
+                    task["id"],
+                ),
+            ).rowcount
+            if not updated:
+                return False
+            self.add_tasks(task["batch"], follow_ups)
+            self.add_ready_tasks(task["batch"], task)
+        return True
+
+    def fail(self, task, worker, error):
+        # Back to pending for another attempt, or failed after the last one
+        with self.transaction():
+            updated = self.connection.execute(
+                """
+                UPDATE tasks
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    worker = NULL, lease_expires_at = NULL, error = ?, updated_at = ?
+                WHERE id = ? AND status = 'leased' AND worker = ?
+                """,
+                (
+                    config.work_queue_max_attempts,
+                    error,
+                    datetime.now().isoformat(),
+                    task["id"],
+                    worker,
+                ),
+            ).rowcount
+            if updated:
+                self.add_ready_tasks(task["batch"], task)
+
+    def add_ready_tasks(self, batch, task=None):
+        """
+        Adds the tasks of a batch that became ready after task finished (or
+        after any change, without a task): the score tasks of each stored job
+        once no PDF is left to store, and the rank task of each stored job once
+        every other task is finished.
+        """
+        open_document_tasks = self.connection.execute(
+            """
+            SELECT COUNT(*) FROM tasks
+            WHERE batch = ? AND status IN ('pending', 'leased')
+                AND stage IN ('parse', 'extract')
+            """,
+            (batch,),
+        ).fetchone()[0]
+        if open_document_tasks:
+            return
+
+        if task is None or task["stage"] in ("parse", "extract"):
+            self.add_score_tasks(batch)
+
+        open_tasks = self.connection.execute(
+            """
+            SELECT COUNT(*) FROM tasks
+            WHERE batch = ? AND status IN ('pending', 'leased') AND stage != 'rank'
+            """,
+            (batch,),
+        ).fetchone()[0]
+        if not open_tasks:
+            self.add_tasks_from_results(batch, "rank", "job_description")
+
+    def add_score_tasks(self, batch):
+        # One task per stored job and chunk of the stored résumés. The résumés
+        # are sorted by ID, so adding them again gives the same tasks.
+        job_ids = self.load_document_ids(batch, "job_description")
+        resume_ids = self.load_document_ids(batch, "resume")
+        chunk_size = max(config.work_queue_score_chunk_size, 1)
+        self.add_tasks(
+            batch,
+            [
+                (
+                    "score",
+                    "job_description",
+                    f"{job_id}:{start}",
+                    {
+                        "document_id": job_id,
+                        "resume_ids": resume_ids[start : start + chunk_size],
+                    },
+                )
+                for job_id in job_ids
+                for start in range(0, len(resume_ids), chunk_size)
+            ],
+        )
+
+    def add_tasks_from_results(self, batch, stage, kind):
+        # One task per stored document of the kind, with the extract result
+        # (the document ID) as its payload
+        self.connection.execute(
+            """
+            INSERT OR IGNORE INTO tasks (batch, stage, kind, key, payload, priority)
+            SELECT batch, ?, kind, key, result, ?
+            FROM tasks
+            WHERE batch = ? AND stage = 'extract' AND kind = ? AND status = 'done'
+            """,
+            (stage, get_task_priority(stage, kind), batch, kind),
+        )
+
+    def load_document_ids(self, batch, kind):
+        """
+        Returns the IDs of the documents of a kind stored for a batch.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT result FROM tasks
+            WHERE batch = ? AND stage = 'extract' AND kind = ? AND status = 'done'
+            """,
+            (batch, kind),
+        )
+        # Two PDFs with the same text are stored as one document
+        return sorted({json.loads(row["result"])["document_id"] for row in rows})
+
+    def count_failed_candidates(self):
+        """
+        Returns:
+            int: The candidates the finished rank tasks could not score.
+        """
+        return self.connection.execute(
+            """
+            SELECT COALESCE(SUM(json_extract(result, '$.failed_candidates')), 0)
+            FROM tasks WHERE stage = 'rank' AND status = 'done'
+            """
+        ).fetchone()[0]
+
+    def has_open_tasks(self):
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM tasks WHERE status IN ('pending', 'leased') LIMIT 1"
+            ).fetchone()
+            is not None
+        )
+
+    def count_tasks(self):
+        """
+        Returns:
+            dict: Stage -> status -> number of tasks.
+        """
+        counts = {}
+        for row in self.connection.execute(
+            "SELECT stage, status, COUNT(*) FROM tasks GROUP BY stage, status"
+        ):
+            counts.setdefault(row[0], {})[row[1]] = row[2]
+        return counts
+
+
+class LeaseHeartbeat:
+    """
+    Renews a task's lease in the background while the worker runs it.
+    """
+
+    def __init__(self, work_queue, task, worker):
+        self.work_queue = work_queue
+        self.task = task
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(config.work_queue_lease_seconds / 3):
+            if not self.work_queue.heartbeat(self.task, self.worker):
+                # Another worker may be running it too; the first result is kept
+                print(f"Lost the lease of {self.task['stage']} task {self.task['id']}")
+                return
+
+
+class QueueWorker:
+    """
+    Runs the tasks of a work queue one at a time until none is left.
+
+    Near-duplicate résumés are not detected in queue mode: the index of
+    already processed résumés would have to be shared by every worker.
+    """
+
+    def __init__(self, work_queue, name=None):
+        self.work_queue = work_queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.store = get_document_store()
+        self.journals = {
+            "resume": open_resume_journal(),
+            "job_description": open_job_description_journal(),
+        }
+        self.extractors = {
+            "resume": extract_candidate_profile,
+            "job_description": extract_job_description,
+        }
+        # The BM25 index of the last batch scored, as (batch, index), which the
+        # batch's other score tasks reuse
+        self.resume_index = None
+
+    def run(self):
+        """
+        Returns:
+            int: The number of tasks this worker ran.
+        """
+        tasks_run = 0
+        while True:
+            task = self.work_queue.lease(self.name)
+            if task is None:
+                if not self.work_queue.has_open_tasks():
+                    break
+                # Tasks are still leased by other workers, which may add more
+                time.sleep(config.work_queue_poll_interval)
+                continue
+            self.run_task(task)
+            tasks_run += 1
+
+        print(f"Worker {self.name} finished after {tasks_run} tasks")
+        return tasks_run
+
+    def run_task(self, task):
+        started_at = time.monotonic()
+        description = (
+            f"{task['stage']} task for {task['payload'].get('path') or task['key']}"
+        )
+        try:
+            with LeaseHeartbeat(self.work_queue, task, self.name):
+                result, follow_ups = getattr(self, f"run_{task['stage']}")(task)
+        except Exception as e:
+            print(f"Error in {description} (attempt {task['attempts']}): {e}")
+            progress.record_failure()
+            self.work_queue.fail(task, self.name, str(e))
+            return
+
+        if self.work_queue.complete(task, self.name, result, follow_ups):
+            print(f"Finished {description} in {time.monotonic() - started_at:.1f}s")
+        else:
+            print(f"Dropped result of {description}: another worker finished it first")
+
+    def run_parse(self, task):
+        payload = task["payload"]
+        if self.journals[task["kind"]].get(payload["file_hash"]) is not None:
+            # Extracted in an earlier run, so the extract task needs no text
+            text = None
+        else:
+            text = parse_pdf_to_text(payload["path"])
+        return None, [("extract", task["kind"], task["key"], {**payload, "text": text})]
+
+    def run_extract(self, task):
+        payload = task["payload"]
+        journal = self.journals[task["kind"]]
+        profile = journal.get(payload["file_hash"])
+        if profile is None:
+            text = payload["text"]
+            if text is None:
+                # Only the worker that ran the parse task had it in its journal
+                text = parse_pdf_to_text(payload["path"])
+            profile = self.extractors[task["kind"]](payload["path"], text)
+            journal.record(payload["file_hash"], profile)
+
+        document_id = self.store.add_documents(
+            task["kind"], [{**profile, "filename": payload["path"]}]
+        )[0]
+        journal.commit({payload["file_hash"]: document_id})
+        return {"document_id": document_id}, []
+
+    def run_score(self, task):
+        job_data = self.store.load_documents(
+            "job_description", [task["payload"]["document_id"]]
+        )[0]
+        # Like an in-process run, a candidate that fails to score is counted as a
+        # failure and left without a stored match, and the task still finishes
+        score_candidate_subset(
+            job_data,
+            task["payload"]["resume_ids"],
+            self.get_resume_index(task["batch"]),
+        )
+        return None, []
+
+    def run_rank(self, task):
+        # Every match was stored by the score tasks, so this only ranks them. The
+        # candidates whose scoring failed are tried once more, and the ones that
+        # fail again are written with their rule-based score and no OpenAI score
+        job_data = self.store.load_documents(
+            "job_description", [task["payload"]["document_id"]]
+        )[0]
+        resume_ids = self.work_queue.load_document_ids(task["batch"], "resume")
+        failures = progress.snapshot()["failures"]
+        score_candidates(job_data, resume_ids, self.get_resume_index(task["batch"]))
+        # Kept with the task, for run_workers' exit status
+        return {"failed_candidates": progress.snapshot()["failures"] - failures}, []
+
+    def get_resume_index(self, batch):
+        # Only one batch's index is kept, so a worker's memory doesn't grow
+        # with the batches it has scored
+        if self.resume_index is None or self.resume_index[0] != batch:
+            self.resume_index = None
+            resume_ids = self.work_queue.load_document_ids(batch, "resume")
+            self.resume_index = batch, open_resume_index(resume_ids)
+        return self.resume_index[1]
+
+
+def format_task_counts(counts):
+    return "\n".join(
+        f"  {stage}: "
+        + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items()))
+        for stage, statuses in sorted(
+            counts.items(), key=lambda x: stage_priorities[x[0]], reverse=True
+        )
+    )
+
+
+def submit_batch(resume_paths, job_description_paths):
+    """
+    Adds résumés and job descriptions to the work queue as one batch, for any
+    number of workers to process.
+
+    Returns:
+        str: The batch ID, or None if there was nothing to match.
+    """
+    resume_files = dedupe_file_paths(resume_paths)
+    job_description_files = dedupe_file_paths(job_description_paths)
+    if not resume_files or not job_description_files:
+        print("A batch needs at least one resume and one job description")
+        return None
+
+    batch = WorkQueue(config.work_queue_path).submit(
+        resume_files, job_description_files
+    )
+    print(
+        f"Submitted batch {batch}: {len(resume_files)} resumes and "
+        f"{len(job_description_files)} job descriptions"
+    )
+    return batch
+
+
+def run_worker_process(settings):
+    # Worker processes don't inherit settings changed at runtime where processes
+    # are spawned rather than forked
+    vars(config).update(settings)
+    QueueWorker(WorkQueue(config.work_queue_path)).run()
+
+
+def run_workers(count):
+    """
+    Runs count worker processes on the work queue until no task is left.
+    Other workers on this machine, e.g. of another --workers run, can work on
+    the same queue at the same time.
+
+    Returns:
+        bool: Whether every task in the queue finished without failing, and
+        every candidate was scored.
+    """
+    settings = {
+        name: value
+        for name, value in vars(config).items()
+        if not name.startswith("_") and not isinstance(value, types.ModuleType)
+    }
+    processes = [
+        multiprocessing.Process(target=run_worker_process, args=(settings,))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    work_queue = WorkQueue(config.work_queue_path)
+    counts = work_queue.count_tasks()
+    print(f"Work queue:\n{format_task_counts(counts)}")
+    failed_candidates = work_queue.count_failed_candidates()
+    if failed_candidates:
+        print(f"{failed_candidates} candidates failed to score")
+    return (
+        not any(statuses.get("failed") for statuses in counts.values())
+        and not failed_candidates
+        and all(process.exitcode == 0 for process in processes)
+    )
+
+
+if __name__ == "__main__":
+    counts = WorkQueue(config.work_queue_path).count_tasks()
+    print(f"Work queue:\n{format_task_counts(counts)}")